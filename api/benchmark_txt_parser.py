@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark script comparing the single-pass TXT metadata tokenizer with the
+previous three-strategy parser on a corpus of metadata .txt files, reporting
+files/sec for both and how many files parse differently.
+
+Pass a folder of book folders (e.g. a copy of the library) to use real files;
+without one a synthetic corpus in the formats seen in the library is generated.
+
+Usage: python benchmark_txt_parser.py [corpus_directory] [repeat]
+"""
+
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+from txt_ingestion import TxtMetadataParser
+
+
+class LegacyTxtMetadataParser(TxtMetadataParser):
+    """The key/value, structured-text and JSON passes as they were before the tokenizer"""
+
+    def parse_txt_file(self, txt_path: str) -> dict:
+        with open(txt_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+
+        metadata = {}
+        metadata.update(self._parse_key_value_pairs(content))
+        metadata.update(self._parse_structured_text(content))
+        metadata.update(self._parse_json_like(content))
+        return self._legacy_normalize(metadata)
+
+    def _parse_key_value_pairs(self, content: str) -> dict:
+        metadata = {}
+        for line in content.split('\n'):
+            line = line.strip()
+            if ':' in line:
+                key, value = line.split(':', 1)
+                key = key.strip().lower()
+                for standard_field, variations in self.field_mappings.items():
+                    if key in variations:
+                        metadata[standard_field] = value.strip()
+                        break
+                else:
+                    metadata[key] = value.strip()
+        return metadata
+
+    def _parse_structured_text(self, content: str) -> dict:
+        patterns = {
+            'title': [r'title[:\s]+(.+?)(?:\n|$)', r'book title[:\s]+(.+?)(?:\n|$)', r'^(.+?)(?:\n|\r\n)'],
+            'author': [r'author[:\s]+(.+?)(?:\n|$)', r'by[:\s]+(.+?)(?:\n|$)', r'written by[:\s]+(.+?)(?:\n|$)'],
+            'description': [r'description[:\s]+(.+?)(?:\n\n|\r\n\r\n|$)', r'summary[:\s]+(.+?)(?:\n\n|\r\n\r\n|$)',
+                            r'about[:\s]+(.+?)(?:\n\n|\r\n\r\n|$)'],
+            'isbn': [r'isbn[:\s]*(\d{10}|\d{13}|\d{1,5}-\d{1,7}-\d{1,7}-[\dX])'],
+            'year': [r'(?:published|year)[:\s]*(\d{4})'],
+        }
+        metadata = {}
+        for field, field_patterns in patterns.items():
+            for pattern in field_patterns:
+                match = re.search(pattern, content, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+                if match:
+                    metadata[field] = match.group(1).strip()
+                    break
+        return metadata
+
+    def _parse_json_like(self, content: str) -> dict:
+        metadata = {}
+        for match in re.findall(r'\{[^{}]*\}', content, re.DOTALL):
+            try:
+                data = json.loads(match)
+                if isinstance(data, dict):
+                    metadata.update(data)
+            except json.JSONDecodeError:
+                continue
+        return metadata
+
+    def _legacy_normalize(self, metadata: dict) -> dict:
+        normalized = {}
+        for key, value in metadata.items():
+            if not value or not isinstance(value, str):
+                continue
+            value = re.sub(r'\s+', ' ', value.strip())
+            if not value:
+                continue
+            key = key.lower().strip()
+            for standard_field, variations in self.field_mappings.items():
+                if key in variations:
+                    normalized[standard_field] = value
+                    break
+            else:
+                normalized[key] = value
+        return normalized
+
+
+SAMPLE_FORMATS = [
+    "Title: {title}\nAuthor: {author}\nGenre: Animals\nPages: 32\nReading Level: Grade 2\n"
+    "Lexile: 450L\nISBN: 978054{n:07d}\nPublished: 2015\nSummary: A story about {title}.\n",
+
+    "{title}\nby {author}\n\nDescription:\n{title} goes on an adventure with friends.\n"
+    "Year 2009\nType: Fiction\n",
+
+    "Book Title: {title}\nWritten by: {author}\nCategory: Science\nAge Group: 5-7\n"
+    "Notes: scanned copy\n{{\"series\": \"Reading Adventures\", \"pages\": \"24\", \"language\": \"English\"}}\n",
+
+    "{{\n  \"title\": \"{title}\",\n  \"author\": \"{author}\",\n  \"genre\": \"History\",\n"
+    "  \"grade level\": \"Grade 4\"\n}}\n",
+]
+
+
+def create_sample_corpus(root: str, files: int):
+    """Book folders each holding one metadata.txt in one of the formats above"""
+    for n in range(files):
+        folder = os.path.join(root, f"Shelf {n % 20}", f"Book {n}")
+        os.makedirs(folder)
+        content = SAMPLE_FORMATS[n % len(SAMPLE_FORMATS)].format(
+            title=f"The Little Fox {n}", author=f"Author {n % 97}", n=n
+        )
+        with open(os.path.join(folder, "metadata.txt"), "w", encoding="utf-8") as f:
+            f.write(content * (1 + n % 3))
+
+
+def collect_txt_files(root: str) -> list:
+    parser = TxtMetadataParser()
+    return [
+        os.path.join(folder, name)
+        for folder, files in parser.walk_book_folders(root)
+        for name in files if name.lower().endswith('.txt')
+    ]
+
+
+def time_parser(parser, paths: list, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [parser.parse_txt_file(path) for path in paths]
+    elapsed = time.perf_counter() - start
+    return results, len(paths) * repeat / elapsed if elapsed else 0
+
+
+def main():
+    corpus = sys.argv[1] if len(sys.argv) > 1 else None
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    temp_dir = None
+    if not corpus:
+        temp_dir = tempfile.mkdtemp(prefix="txt_parser_bench_")
+        create_sample_corpus(temp_dir, 2000)
+        corpus = temp_dir
+
+    try:
+        paths = collect_txt_files(corpus)
+        if not paths:
+            print(f"No .txt files found under {corpus}")
+            return
+
+        print(f"Parsing {len(paths)} .txt files x{repeat}")
+        legacy_results, legacy_rate = time_parser(LegacyTxtMetadataParser(), paths, repeat)
+        results, rate = time_parser(TxtMetadataParser(), paths, repeat)
+
+        print(f"  three-pass parser   {legacy_rate:9.0f} files/s")
+        print(f"  single-pass parser  {rate:9.0f} files/s  ({rate / legacy_rate if legacy_rate else 0:.1f}x)")
+
+        # Per field: how many files changed, and one example
+        differences = {}
+        for path, old, new in zip(paths, legacy_results, results):
+            for key in set(old) | set(new):
+                if old.get(key) != new.get(key):
+                    count, example = differences.get(key, (0, (path, old.get(key), new.get(key))))
+                    differences[key] = (count + 1, example)
+
+        changed_files = sum(1 for old, new in zip(legacy_results, results) if old != new)
+        print(f"  {changed_files} of {len(paths)} files parse differently")
+        for key, (count, (path, old_value, new_value)) in sorted(differences.items(), key=lambda item: -item[1][0]):
+            print(f"    {key!r:<16} {count:6d} files, e.g. {old_value!r} -> {new_value!r} ({path})")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
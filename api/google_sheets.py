@@ -1,10 +1,29 @@
 import gspread
 from google.oauth2.service_account import Credentials
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import os
 import json
+import threading
 from datetime import datetime
 
+from gspread.utils import rowcol_to_a1, a1_to_rowcol
+
+from sheet_mirror import SheetMirror, SheetKeyIndex, book_key, SHEETS_MIRROR_TTL_SECONDS
+from sheets_client import SheetsApiClient, SheetsCallCancelled, ThrottledProxy
+from sheet_duplicates import DuplicateIndex
+
+# Ranges sent per values:batchUpdate request when writing cell changes
+SHEETS_BATCH_MAX_RANGES = 500
+
+# Rows per append_rows request in bulk_add_books
+SHEETS_APPEND_CHUNK_ROWS = int(os.environ.get("SHUSPOT_SHEETS_APPEND_CHUNK_ROWS", 500))
+
+# Columns the catalog can be sharded by; each value gets its own "<worksheet> - <value>" tab
+SHARD_FIELDS = ("Media", "Category")
+
+# Shard for rows whose shard column is empty
+DEFAULT_SHARD = "Other"
+
 # Optional pandas dependency
 try:
     import pandas as pd
@@ -14,8 +33,13 @@ except ImportError:
     pd = None
 
 class GoogleSheetsManager:
-    def __init__(self, credentials_path: str, spreadsheet_name: str = "ShuSpot Books Master", worksheet_name: str = None):
+    def __init__(self, credentials_path: str, spreadsheet_name: str = "ShuSpot Books Master", worksheet_name: str = None,
+                 mirror_ttl_seconds: int = SHEETS_MIRROR_TTL_SECONDS, api: Optional[SheetsApiClient] = None,
+                 shard_by: Optional[str] = None):
         """Initialize Google Sheets connection"""
+        if shard_by and shard_by not in SHARD_FIELDS:
+            raise ValueError(f"shard_by must be one of {', '.join(SHARD_FIELDS)}")
+        
         self.credentials_path = credentials_path
         self.spreadsheet_name = spreadsheet_name
         self.worksheet_name = worksheet_name  # Specific sheet name within the document
@@ -23,6 +47,24 @@ class GoogleSheetsManager:
         self.sheet = None
         self.worksheet = None
         
+        # Every API call goes through the rate limiter / retry layer
+        self.api = api or SheetsApiClient()
+        
+        # Local copy of the worksheet rows; reads are served from here
+        self.mirror = SheetMirror(mirror_ttl_seconds)
+        
+        # Name/Author keys of every row for duplicate checks, read from just those two columns
+        self.key_index = SheetKeyIndex(mirror_ttl_seconds)
+        
+        # Normalized title/author and Epic ID index used by the duplicate finder
+        self.duplicate_index = DuplicateIndex(mirror_ttl_seconds)
+        self.header: List[str] = []  # Worksheet header row as last seen
+        
+        # Optional sharding: one worksheet per Media type or Category, each with its own manager
+        self.shard_by = shard_by
+        self.shards: Dict[str, "GoogleSheetsManager"] = {}  # lowercased shard value -> manager
+        self._shard_lock = threading.Lock()
+        
         # Define the schema for our master sheet - ShuSpot specific fields
         self.schema = [
             "Name",
@@ -57,19 +99,19 @@ class GoogleSheetsManager:
                 scopes=scope
             )
             
-            self.client = gspread.authorize(creds)
+            self.client = self._throttled(gspread.authorize(creds))
             
             # Try to open existing spreadsheet or create new one
             try:
-                self.sheet = self.client.open(self.spreadsheet_name)
+                self.sheet = self._throttled(self.client.open(self.spreadsheet_name))
                 
                 # Use specific worksheet if specified, otherwise use first sheet
                 if self.worksheet_name:
                     try:
-                        self.worksheet = self.sheet.worksheet(self.worksheet_name)
+                        self.worksheet = self._throttled(self.sheet.worksheet(self.worksheet_name))
                     except gspread.WorksheetNotFound:
                         # Create the worksheet if it doesn't exist
-                        self.worksheet = self.sheet.add_worksheet(title=self.worksheet_name, rows="1000", cols="20")
+                        self.worksheet = self._throttled(self.sheet.add_worksheet(title=self.worksheet_name, rows="1000", cols="20"))
                         # Set up headers
                         self.worksheet.append_row(self.schema)
                         # Format headers
@@ -78,12 +120,12 @@ class GoogleSheetsManager:
                             "textFormat": {"bold": True, "foregroundColor": {"red": 1, "green": 1, "blue": 1}}
                         })
                 else:
-                    self.worksheet = self.sheet.sheet1
+                    self.worksheet = self._throttled(self.api.call('sheet1', lambda: self.sheet.unwrapped.sheet1))
                     
             except gspread.SpreadsheetNotFound:
                 # Create new spreadsheet
-                self.sheet = self.client.create(self.spreadsheet_name)
-                self.worksheet = self.sheet.sheet1
+                self.sheet = self._throttled(self.client.create(self.spreadsheet_name))
+                self.worksheet = self._throttled(self.api.call('sheet1', lambda: self.sheet.unwrapped.sheet1))
                 
                 # Set up headers
                 self.worksheet.append_row(self.schema)
@@ -94,6 +136,11 @@ class GoogleSheetsManager:
                     "textFormat": {"bold": True, "foregroundColor": {"red": 1, "green": 1, "blue": 1}}
                 })
                 
+            self.mirror.invalidate()
+            self.key_index.invalidate()
+            self.duplicate_index.invalidate()
+            if self.shard_by:
+                self._discover_shards()
             print(f"Connected to Google Sheet: {self.spreadsheet_name}")
             return True
             
@@ -101,34 +148,285 @@ class GoogleSheetsManager:
             print(f"Error connecting to Google Sheets: {e}")
             return False
     
-    def get_all_books(self) -> List[Dict]:
+    def _throttled(self, target):
+        """Route a gspread client/spreadsheet/worksheet through the API client"""
+        return target if isinstance(target, ThrottledProxy) else ThrottledProxy(target, self.api)
+    
+    def attach(self, sheet, worksheet):
+        """Use an already opened spreadsheet and worksheet (e.g. the offline fake backend)"""
+        self.sheet = self._throttled(sheet)
+        self.worksheet = self._throttled(worksheet)
+        self.mirror.invalidate()
+        self.key_index.invalidate()
+        self.duplicate_index.invalidate()
+        if self.shard_by:
+            self._discover_shards()
+    
+    @property
+    def worksheet_title(self) -> Optional[str]:
+        return self.worksheet.title if self.worksheet else None
+    
+    @property
+    def shard_prefix(self) -> str:
+        return f"{self.worksheet_name or 'Books'} - "
+    
+    def shard_value(self, record: Dict) -> str:
+        """Shard a record belongs to: its Media/Category value, or DEFAULT_SHARD when empty"""
+        return str(record.get(self.shard_by) or '').strip() or DEFAULT_SHARD
+    
+    def _discover_shards(self):
+        """Pick up the shard worksheets that already exist in the spreadsheet"""
+        self.shards = {}
+        for worksheet in self.sheet.worksheets():
+            if worksheet.title.startswith(self.shard_prefix):
+                value = worksheet.title[len(self.shard_prefix):]
+                self.shards[value.lower()] = self._shard_manager(worksheet)
+    
+    def _shard_manager(self, worksheet) -> "GoogleSheetsManager":
+        """Unsharded manager bound to one shard worksheet, sharing this manager's client and rate limits"""
+        shard = GoogleSheetsManager(
+            self.credentials_path, self.spreadsheet_name, worksheet.title,
+            self.mirror.ttl_seconds, api=self.api
+        )
+        shard.client = self.client
+        shard.schema = self.schema
+        shard.attach(self.sheet, worksheet)
+        return shard
+    
+    def route(self, record: Dict, create: bool = True) -> Optional["GoogleSheetsManager"]:
+        """Manager for the worksheet a record belongs in (self when unsharded), creating the shard if needed"""
+        if not self.shard_by:
+            return self
+        
+        value = self.shard_value(record)
+        shard = self.shards.get(value.lower())
+        if shard is None and create:
+            with self._shard_lock:
+                shard = self.shards.get(value.lower())
+                if shard is None:
+                    # Both calls go through the rate limiter like every other Sheets request
+                    worksheet = self._throttled(
+                        self.sheet.add_worksheet(title=f"{self.shard_prefix}{value}", rows="1000", cols="20")
+                    )
+                    worksheet.append_row(self.schema)
+                    shard = self._shard_manager(worksheet)
+                    self.shards[value.lower()] = shard
+        return shard
+    
+    def shard_managers(self) -> List["GoogleSheetsManager"]:
+        """Managers of every worksheet holding catalog rows, in a stable order for paging"""
+        if not self.shard_by:
+            return [self]
+        return [self.shards[value] for value in sorted(self.shards)]
+    
+    def manager_for_worksheet(self, title: Optional[str]) -> Optional["GoogleSheetsManager"]:
+        """Manager of the catalog worksheet with this title (None if it isn't one)"""
+        return next((m for m in self.shard_managers() if m.worksheet_title == title), None)
+    
+    def _remote_revision(self) -> Optional[str]:
+        """Last modification time of the spreadsheet according to Drive (one small request)"""
+        try:
+            return self.sheet.get_lastUpdateTime()
+        except Exception as e:
+            print(f"Error checking sheet revision: {e}")
+            return None
+    
+    def _is_current(self, snapshot, force: bool, check_remote: bool = False) -> Tuple[bool, Optional[str]]:
+        """
+        Whether a cache still matches the sheet (checking Drive's revision once its TTL ran out, or
+        always with check_remote), and the revision seen
+        """
+        if not force and not check_remote and snapshot.is_fresh():
+            return True, snapshot.remote_modified
+        
+        remote_modified = self._remote_revision()
+        if not force and snapshot.loaded and remote_modified and remote_modified == snapshot.remote_modified:
+            snapshot.touch()
+            return True, remote_modified
+        return False, remote_modified
+    
+    def _record_own_write(self, verified: Optional[str]):
+        """
+        After a write made right after a revision check, move the caches that were current at
+        that revision to the sheet's new one, so the next check doesn't take our own write for
+        someone else's edit and download the sheet again
+        """
+        if not verified:
+            return
+        remote_modified = self._remote_revision()
+        if not remote_modified:
+            return
+        for snapshot in (self.mirror, self.key_index, self.duplicate_index):
+            if snapshot.loaded and snapshot.remote_modified == verified:
+                snapshot.touch(remote_modified)
+    
+    def _mirror_matches(self, remote_modified: Optional[str], force: bool) -> bool:
+        """Full rows for this revision are already in memory"""
+        return not force and remote_modified is not None and self.mirror.loaded and remote_modified == self.mirror.remote_modified
+    
+    def refresh_mirror(self, force: bool = False, check_remote: bool = False):
+        """
+        Make sure the mirror is current, downloading the sheet only when it changed.
+        check_remote asks Drive for the revision even within the TTL; writes that address
+        rows by position use it so they never go to rows that moved since the last read.
+        """
+        if not self.worksheet:
+            return
+        
+        current, remote_modified = self._is_current(self.mirror, force, check_remote)
+        if current:
+            return
+        
+        records = self.worksheet.get_all_records()
+        header = list(records[0].keys()) if records else list(self.header or self.schema)
+        self.mirror.load(header, records, remote_modified)
+        self.header = header
+        self._load_keys_from_mirror()
+        if self.duplicate_index.loaded:
+            self.duplicate_index.load(self.mirror.records, remote_modified)
+    
+    def _load_keys_from_mirror(self):
+        self.key_index.load(
+            [book_key(r.get('Name'), r.get('Author')) for r in self.mirror.records],
+            self.mirror.remote_modified
+        )
+    
+    def refresh_keys(self, force: bool = False, check_remote: bool = False):
+        """Make sure the duplicate-key index is current, reading only the Name/Author columns when it changed"""
+        if not self.worksheet:
+            return
+        
+        current, remote_modified = self._is_current(self.key_index, force, check_remote)
+        if current:
+            return
+        
+        if self._mirror_matches(remote_modified, force):
+            self.mirror.touch()
+            self._load_keys_from_mirror()
+            return
+        
+        self.key_index.load(self._read_key_rows(), remote_modified)
+        # The row mirror is from an older revision, so its row positions can't be trusted
+        self.mirror.invalidate()
+    
+    def refresh_duplicate_index(self, force: bool = False):
+        """Make sure the duplicate index is current, reading only the columns it needs when it changed"""
+        if not self.worksheet:
+            return
+        
+        current, remote_modified = self._is_current(self.duplicate_index, force)
+        if current:
+            return
+        
+        if self._mirror_matches(remote_modified, force):
+            self.duplicate_index.load(self.mirror.records, remote_modified)
+            return
+        
+        self.duplicate_index.load(self.read_columns(DuplicateIndex.FIELDS), remote_modified)
+    
+    def _read_key_rows(self) -> List[str]:
+        """Duplicate key of every data row from one batch_get of the Name and Author columns"""
+        return [book_key(row['Name'], row['Author']) for row in self.read_columns(['Name', 'Author'])]
+    
+    def read_columns(self, fields: List[str]) -> List[Dict]:
+        """Every data row restricted to fields, fetched with a single batch_get of just those columns"""
+        if self.shard_by:
+            return [row for shard in self.shard_managers() for row in shard.read_columns(fields)]
+        
+        for _ in range(2):
+            columns = self._column_numbers()
+            if all(field in columns for field in fields):
+                letters = [self._column_letter(columns[field]) for field in fields]
+                value_ranges = self.worksheet.batch_get([f"{letter}:{letter}" for letter in letters])
+                values = [[row[0] if row else '' for row in value_range] for value_range in value_ranges]
+                
+                if all(column[:1] == [field] for field, column in zip(fields, values)):
+                    row_count = max(len(column) for column in values) - 1
+                    padded = [column[1:] + [''] * (row_count - len(column) + 1) for column in values]
+                    return [dict(zip(fields, row)) for row in zip(*padded)]
+            
+            # Columns aren't where we expected (sheet edited by hand); read the header and try again
+            self.header = self.worksheet.row_values(1)
+        
+        missing = [field for field in fields if field not in self._column_numbers()]
+        raise ValueError(f"Could not find columns {missing or fields} in the sheet header")
+    
+    @staticmethod
+    def _column_letter(column: int) -> str:
+        return rowcol_to_a1(1, column)[:-1]
+    
+    def get_all_books(self, force_refresh: bool = False) -> List[Dict]:
         """Get all books from the sheet"""
+        if self.shard_by:
+            return [book for shard in self.shard_managers() for book in shard.get_all_books(force_refresh)]
+        
         if not self.worksheet:
             return []
             
         try:
-            records = self.worksheet.get_all_records()
-            return records
+            self.refresh_mirror(force_refresh)
+            return self.mirror.snapshot()
         except Exception as e:
             print(f"Error getting books: {e}")
             return []
     
+    def get_books_page(self, offset: int = 0, limit: int = 100, force_refresh: bool = False) -> Dict:
+        """Get one page of books plus the total count, served from the mirror"""
+        if self.shard_by:
+            return self._sharded_page(offset, limit, force_refresh)
+        
+        books = self.get_all_books(force_refresh)
+        return {
+            "books": books[offset:offset + limit],
+            "total": len(books),
+            "revision": self.mirror.revision
+        }
+    
+    def _sharded_page(self, offset: int, limit: int, force_refresh: bool) -> Dict:
+        """
+        Page across shards in shard order. Row counts come from each shard's key index
+        (two columns), so only the shards the page overlaps are downloaded in full.
+        """
+        books, total, revision = [], 0, 0
+        for shard in self.shard_managers():
+            try:
+                shard.refresh_keys(force_refresh)
+            except SheetsCallCancelled:
+                raise
+            except Exception as e:
+                print(f"Error counting rows in {shard.worksheet_title}: {e}")
+                continue
+            
+            count = len(shard.key_index.row_keys)
+            if count and len(books) < limit and total + count > offset:
+                start = max(0, offset - total)
+                books.extend(shard.get_all_books(force_refresh)[start:start + limit - len(books)])
+            total += count
+            revision += shard.key_index.revision + shard.mirror.revision
+        
+        return {"books": books, "total": total, "revision": revision}
+    
     def add_book(self, book_data: Dict) -> bool:
         """Add a single book to the sheet"""
+        if self.shard_by:
+            try:
+                return self.route(book_data).add_book(book_data)
+            except Exception as e:
+                print(f"Error adding book: {e}")
+                return False
+        
         if not self.worksheet:
             return False
             
         try:
             # Generate duplicate check key - use 'Name' field for ShuSpot schema
-            duplicate_key = f"{book_data.get('Name', '').lower()}_{book_data.get('Author', '').lower()}"
+            duplicate_key = book_key(book_data.get('Name', ''), book_data.get('Author', ''))
             
-            # Check for duplicates
-            existing_books = self.get_all_books()
-            for existing in existing_books:
-                existing_key = f"{existing.get('Name', '').lower()}_{existing.get('Author', '').lower()}"
-                if existing_key == duplicate_key:
-                    print(f"Duplicate found: {book_data.get('Name')} by {book_data.get('Author')}")
-                    return False
+            # Check for duplicates against the key index (reads the Name/Author columns at most once per TTL)
+            self.refresh_keys()
+            if self.key_index.has_key(duplicate_key):
+                print(f"Duplicate found: {book_data.get('Name')} by {book_data.get('Author')}")
+                return False
             
             # Prepare row data for ShuSpot schema
             row_data = [
@@ -151,108 +449,228 @@ class GoogleSheetsManager:
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             ]
             
-            self.worksheet.append_row(row_data)
+            response = self.worksheet.append_row(row_data)
+            self._rows_appended([dict(zip(self.schema, row_data))], response)
             return True
             
         except Exception as e:
             print(f"Error adding book: {e}")
             return False
     
-    def bulk_add_books(self, books_data: List[Dict]) -> Dict:
-        """Add multiple books to the sheet"""
-        if not self.worksheet:
-            return {"success": 0, "errors": 0, "duplicates": 0}
+    def _record_to_row(self, record: Dict) -> List:
+        """Lay out a book dict in the worksheet's column order"""
+        defaults = {'Fiction Type': 'Fiction', 'Status': 'Active'}
+        return [record.get(column, defaults.get(column, '')) for column in (self.header or self.schema)]
+    
+    def append_records(self, records: List[Dict]):
+        """Append rows in a single request (no duplicate check) and add them to the mirror"""
+        if not records:
+            return
+        
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        stamped = [{**record, 'Date Added': record.get('Date Added') or now, 'Date Modified': now} for record in records]
+        rows = [self._record_to_row(record) for record in stamped]
+        
+        response = self.worksheet.append_rows(rows, value_input_option='RAW')
+        header = self.header or self.schema
+        self._rows_appended([dict(zip(header, row)) for row in rows], response)
+    
+    def _rows_appended(self, records: List[Dict], response):
+        """Add just-appended rows to the mirror and key index at the position Sheets reported"""
+        start = None
+        try:
+            updated_range = response['updates']['updatedRange']
+            start = a1_to_rowcol(updated_range.split('!')[-1].split(':')[0])[0] - 2
+        except (TypeError, KeyError, IndexError, ValueError):
+            pass
+        
+        if self.mirror.loaded:
+            if start is None or start == len(self.mirror.records):
+                self.mirror.append(records)
+            else:
+                self.mirror.invalidate()
+        self.key_index.append([book_key(r.get('Name'), r.get('Author')) for r in records], start)
+        if self.duplicate_index.loaded:
+            if start is None:
+                self.duplicate_index.invalidate()
+            else:
+                self.duplicate_index.add(start, records)
+    
+    def _rows_updated(self, row_updates: List[Tuple[int, Dict]]):
+        """Apply written cell changes to the mirror and key index"""
+        for i, fields in row_updates:
+            if self.mirror.loaded:
+                self.mirror.update_row(i, fields)
+            if 'Name' in fields or 'Author' in fields:
+                source = self.mirror.records[i] if self.mirror.loaded else fields
+                if 'Name' in source and 'Author' in source:
+                    self.key_index.update_row(i, book_key(source.get('Name'), source.get('Author')))
+                else:
+                    self.key_index.invalidate()
+            if self.duplicate_index.loaded:
+                self.duplicate_index.update_row(i, fields)
+    
+    def update_records(self, row_updates: List[Tuple[int, Dict]], verified: Optional[str] = None):
+        """
+        Write field changes for (mirror index, fields) pairs and apply them to the mirror.
+        verified: the revision the row positions were just checked against, if any
+        """
+        prepared = [(i, self._prepare_updates(fields)) for i, fields in row_updates]
+        self._write_row_updates([(self.mirror.row_number(i), fields) for i, fields in prepared])
+        self._rows_updated(prepared)
+        self._record_own_write(verified)
+    
+    def bulk_add_books(self, books_data: List[Dict], chunk_size: int = SHEETS_APPEND_CHUNK_ROWS) -> Dict:
+        """Add multiple books to the sheet, appending new rows in chunks as the dedupe pass goes"""
+        if self.shard_by:
+            return self._bulk_add_sharded(books_data, chunk_size)
         
-        results = {"success": 0, "errors": 0, "duplicates": 0}
+        if not self.worksheet:
+            return {"success": 0, "errors": 0, "duplicates": 0, "chunks": []}
         
-        # Get existing books for duplicate checking
-        existing_books = self.get_all_books()
-        existing_keys = set()
-        for book in existing_books:
-            key = f"{book.get('Name', '').lower()}_{book.get('Author', '').lower()}"
-            existing_keys.add(key)
+        results = {"success": 0, "errors": 0, "duplicates": 0, "chunks": []}
         
-        # Prepare batch data
-        batch_data = []
+        # Get existing keys for duplicate checking
+        try:
+            self.refresh_keys()
+        except SheetsCallCancelled:
+            raise
+        except Exception as e:
+            # Without the current rows we can't dedupe, and appending blind risks duplicate rows
+            print(f"Error loading sheet for duplicate check: {e}")
+            results["errors"] = len(books_data)
+            return results
+        existing_keys = self.key_index.keys()
         
+        pending = []
         for book_data in books_data:
             try:
-                duplicate_key = f"{book_data.get('Name', '').lower()}_{book_data.get('Author', '').lower()}"
+                duplicate_key = book_key(book_data.get('Name', ''), book_data.get('Author', ''))
                 
                 if duplicate_key in existing_keys:
                     results["duplicates"] += 1
                     continue
                 
-                row_data = [
-                    book_data.get('Name', ''),
-                    book_data.get('Category', ''),
-                    book_data.get('Media', ''),
-                    book_data.get('URL', ''),
-                    book_data.get('Author', ''),
-                    book_data.get('Age', ''),
-                    book_data.get('Read time', ''),
-                    book_data.get('AR Level', ''),
-                    book_data.get('Lexile', ''),
-                    book_data.get('GRL', ''),
-                    book_data.get('Pages', ''),
-                    book_data.get('Audiobook Length', ''),
-                    book_data.get('Video Length', ''),
-                    book_data.get('Status', 'Active'),
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ]
-                
-                batch_data.append(row_data)
+                pending.append(book_data)
                 existing_keys.add(duplicate_key)
                 
             except Exception as e:
                 print(f"Error preparing book data: {e}")
                 results["errors"] += 1
+            
+            # Send each full chunk right away instead of building one huge request
+            if len(pending) >= chunk_size:
+                self._append_chunk(pending, results)
+                pending = []
+        
+        if pending:
+            self._append_chunk(pending, results)
+        
+        return results
+    
+    def _bulk_add_sharded(self, books_data: List[Dict], chunk_size: int) -> Dict:
+        """bulk_add_books per shard (duplicates are checked within a shard), with the results merged"""
+        results = {"success": 0, "errors": 0, "duplicates": 0, "chunks": []}
+        
+        by_shard: Dict[str, List[Dict]] = {}
+        for book_data in books_data:
+            by_shard.setdefault(self.shard_value(book_data), []).append(book_data)
         
-        # Batch insert
-        if batch_data:
+        for value, books in by_shard.items():
             try:
-                # Find the next empty row
-                next_row = len(self.worksheet.get_all_values()) + 1
-                
-                # Insert all rows at once
-                range_name = f'A{next_row}:R{next_row + len(batch_data) - 1}'
-                self.worksheet.update(range_name, batch_data)
-                
-                results["success"] = len(batch_data)
-                
+                shard = self.route(books[0])
+            except SheetsCallCancelled:
+                raise
             except Exception as e:
-                print(f"Error batch inserting: {e}")
-                results["errors"] += len(batch_data)
+                print(f"Error creating shard {value}: {e}")
+                results["errors"] += len(books)
+                results["chunks"].append({"shard": value, "chunk": 1, "rows": len(books), "success": 0, "error": str(e)})
+                continue
+            
+            shard_results = shard.bulk_add_books(books, chunk_size)
+            for field in ("success", "errors", "duplicates"):
+                results[field] += shard_results[field]
+            results["chunks"].extend({"shard": value, **chunk} for chunk in shard_results["chunks"])
         
         return results
     
+    def _append_chunk(self, records: List[Dict], results: Dict):
+        """Append one chunk and record its outcome; a failed chunk doesn't stop the others"""
+        chunk = {"chunk": len(results["chunks"]) + 1, "rows": len(records), "success": 0, "error": None}
+        try:
+            self.append_records(records)
+            chunk["success"] = len(records)
+            results["success"] += len(records)
+        except SheetsCallCancelled:
+            raise
+        except Exception as e:
+            print(f"Error appending chunk {chunk['chunk']}: {e}")
+            chunk["error"] = str(e)
+            results["errors"] += len(records)
+        results["chunks"].append(chunk)
+    
+    def _column_numbers(self) -> Dict[str, int]:
+        """1-indexed column for each header name"""
+        header = self.header or self.schema
+        return {name: i + 1 for i, name in enumerate(header)}
+    
+    def _write_row_updates(self, row_updates: List[Tuple[int, Dict]]) -> int:
+        """Write {field: value} changes for many rows as range-grouped batch_update calls; returns request count"""
+        columns = self._column_numbers()
+        data = []
+        
+        for row_num, fields in row_updates:
+            cells = sorted((columns[field], value) for field, value in fields.items() if field in columns)
+            
+            # Merge neighbouring columns into a single range like "C5:E5"
+            run = []
+            for col, value in cells + [(None, None)]:
+                if run and col is not None and col == run[-1][0] + 1:
+                    run.append((col, value))
+                    continue
+                if run:
+                    data.append({
+                        "range": f"{rowcol_to_a1(row_num, run[0][0])}:{rowcol_to_a1(row_num, run[-1][0])}",
+                        "values": [[v for _, v in run]]
+                    })
+                run = [(col, value)] if col is not None else []
+        
+        requests = 0
+        for start in range(0, len(data), SHEETS_BATCH_MAX_RANGES):
+            self.worksheet.batch_update(data[start:start + SHEETS_BATCH_MAX_RANGES], value_input_option='RAW')
+            requests += 1
+        return requests
+    
+    def _prepare_updates(self, updates: Dict) -> Dict:
+        """Keep schema fields only and stamp Date Modified"""
+        fields = {field: value for field, value in updates.items() if field in self.schema}
+        fields['Date Modified'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return fields
+    
     def update_book(self, book_id: int, updates: Dict) -> bool:
         """Update a specific book by ID"""
+        if self.shard_by:
+            # The ID doesn't say which shard the row is in
+            return any(shard.update_book(book_id, updates) for shard in self.shard_managers())
+        
         if not self.worksheet:
             return False
             
         try:
-            # Find the row with the matching ID
-            all_records = self.worksheet.get_all_records()
+            # Find the row with the matching ID through the mirror's index; the row number is
+            # written to, so the mirror is checked against the sheet's revision first
+            self.refresh_mirror(check_remote=True)
+            verified = self.mirror.remote_modified
+            matches = self.mirror.find_rows('ID', book_id)
+            if not matches:
+                return False
             
-            for i, record in enumerate(all_records):
-                if record.get('ID') == book_id:
-                    row_num = i + 2  # +2 because sheets are 1-indexed and we have headers
-                    
-                    # Update specific cells
-                    for field, value in updates.items():
-                        if field in self.schema:
-                            col_index = self.schema.index(field) + 1  # +1 for 1-indexed
-                            self.worksheet.update_cell(row_num, col_index, value)
-                    
-                    # Update modified date
-                    modified_col = self.schema.index('Date Modified') + 1
-                    self.worksheet.update_cell(row_num, modified_col, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                    
-                    return True
-            
-            return False
+            i = matches[0]
+            fields = self._prepare_updates(updates)
+            self._write_row_updates([(self.mirror.row_number(i), fields)])
+            self._rows_updated([(i, fields)])
+            self._record_own_write(verified)
+            return True
             
         except Exception as e:
             print(f"Error updating book: {e}")
@@ -260,37 +678,42 @@ class GoogleSheetsManager:
     
     def bulk_update_books(self, filter_criteria: Dict, updates: Dict) -> int:
         """Bulk update books matching criteria"""
+        if self.shard_by:
+            if self.shard_by in filter_criteria:
+                shard = self.route(filter_criteria, create=False)
+                return shard.bulk_update_books(filter_criteria, updates) if shard else 0
+            return sum(shard.bulk_update_books(filter_criteria, updates) for shard in self.shard_managers())
+        
         if not self.worksheet:
             return 0
             
         try:
-            all_records = self.worksheet.get_all_records()
-            updated_count = 0
-            
-            for i, record in enumerate(all_records):
-                # Check if record matches filter criteria
-                matches = True
-                for field, value in filter_criteria.items():
-                    if record.get(field) != value:
-                        matches = False
-                        break
-                
-                if matches:
-                    row_num = i + 2  # +2 for 1-indexed and headers
-                    
-                    # Apply updates
-                    for field, value in updates.items():
-                        if field in self.schema:
-                            col_index = self.schema.index(field) + 1
-                            self.worksheet.update_cell(row_num, col_index, value)
-                    
-                    # Update modified date
-                    modified_col = self.schema.index('Date Modified') + 1
-                    self.worksheet.update_cell(row_num, modified_col, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                    
-                    updated_count += 1
+            self.refresh_mirror(check_remote=True)
+            verified = self.mirror.remote_modified
+            
+            # Narrow down with the index on the first criterion, then check the rest
+            criteria = list(filter_criteria.items())
+            if criteria:
+                first_field, first_value = criteria[0]
+                candidates = self.mirror.find_rows(first_field, first_value)
+            else:
+                candidates = list(range(len(self.mirror.records)))
+            
+            matching = [
+                i for i in candidates
+                if all(self.mirror.records[i].get(field) == value for field, value in criteria[1:])
+            ]
+            if not matching:
+                return 0
+            
+            # One set of changes for every row, sent in as few requests as possible
+            fields = self._prepare_updates(updates)
+            self._write_row_updates([(self.mirror.row_number(i), fields) for i in matching])
+            
+            self._rows_updated([(i, fields) for i in matching])
+            self._record_own_write(verified)
             
-            return updated_count
+            return len(matching)
             
         except Exception as e:
             print(f"Error bulk updating: {e}")
@@ -301,30 +724,47 @@ class GoogleSheetsManager:
         return self.update_book(book_id, {"Status": "Deleted"})
     
     def get_duplicates(self) -> List[Dict]:
-        """Find potential duplicates"""
+        """Find potential duplicates as (original, duplicate) pairs"""
+        return self.find_duplicates()["duplicates"]
+    
+    def find_duplicates(self, include_near: bool = False) -> Dict:
+        """Duplicate groups by normalized title/author or Epic read ID, optionally with likely typos"""
+        result = {"duplicates": [], "groups": [], "near_duplicates": []}
+        if self.shard_by:
+            # Row numbers are per worksheet, so every entry is tagged with its shard
+            for shard in self.shard_managers():
+                shard_result = shard.find_duplicates(include_near)
+                for field, entries in shard_result.items():
+                    result[field].extend({"worksheet": shard.worksheet_title, **entry} for entry in entries)
+            return result
+        
         if not self.worksheet:
-            return []
+            return result
             
         try:
-            all_records = self.worksheet.get_all_records()
-            duplicate_keys = {}
-            duplicates = []
-            
-            for record in all_records:
-                key = record.get('Duplicate Check', '')
-                if key in duplicate_keys:
-                    duplicates.append({
-                        'original': duplicate_keys[key],
-                        'duplicate': record
+            self.refresh_duplicate_index()
+            result["groups"] = self.duplicate_index.groups()
+            
+            # First row of each group is treated as the original
+            for group in result["groups"]:
+                original, *others = group["rows"]
+                for duplicate in others:
+                    result["duplicates"].append({
+                        'original': original,
+                        'duplicate': duplicate,
+                        'reasons': group["reasons"]
                     })
-                else:
-                    duplicate_keys[key] = record
             
-            return duplicates
+            if include_near:
+                result["near_duplicates"] = self.duplicate_index.near_duplicates()
+            
+            return result
             
+        except SheetsCallCancelled:
+            raise
         except Exception as e:
             print(f"Error finding duplicates: {e}")
-            return []
+            return result
     
     def export_to_csv(self) -> str:
         """Export sheet data to CSV"""
@@ -332,7 +772,7 @@ class GoogleSheetsManager:
             return ""
             
         try:
-            all_records = self.worksheet.get_all_records()
+            all_records = self.get_all_books()
             df = pd.DataFrame(all_records)
             
             filename = f"shuspot_books_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -1,16 +1,18 @@
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Form, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 import shutil
 import asyncio
 from datetime import datetime
 from io import BytesIO
+from itertools import islice
 import logging
 import json
+import re
 
 # Optional heavy dependencies
 try:
@@ -20,11 +22,24 @@ except ImportError:
     PANDAS_AVAILABLE = False
     pd = None
 
-from database import get_db, Book, UPLOAD_DIR
+from database import get_db, SessionLocal, Book, UPLOAD_DIR
 from parsers import MetadataParser
 from google_sheets import GoogleSheetsManager
+from sheets_sync import DbToSheetsSync, SheetsToDbImport, import_merge_rules
+from sheets_async import AsyncSheetsManager, SheetsExecutor, SheetsBusy
 from txt_ingestion import TxtIngestionPipeline, TxtMetadataParser
-from custom_parsers import get_custom_parsers, parse_with_custom_parsers, add_custom_parser, create_regex_parser
+from custom_parsers import (
+    get_custom_parsers, parse_with_custom_parsers, save_regex_parser,
+    DYNAMIC_PARSERS, PARSER_PROFILER, walk_files, parse_file_batch, BatchParseStats
+)
+from static_files import CustomStaticFiles, resolve_static_path
+from media_files import RangeFileResponse
+from script_sandbox import ScriptWorkerPool, ScriptPoolBusy, SCRIPT_PREVIEW_MAX_ROWS
+from page_cache import PageByteCache, PREWARM_PAGES
+from book_manifest import build_book_manifest, manifest_etag, MANIFEST_VERSION
+from image_derivatives import (
+    DerivativeCache, OUTPUT_FORMATS, PIL_AVAILABLE, UnsupportedImage, snap_width, source_version, media_type_for
+)
 
 app = FastAPI(title="Book Admin API", version="1.0.0")
 
@@ -42,42 +57,11 @@ SHUSPOT_FOLDERS = [
     "../uploads/CROP-ShuSpot"
 ]
 
-# Create a custom static files handler that handles multiple folders and spaces in filenames
-class CustomStaticFiles(StaticFiles):
-    async def get_response(self, path: str, scope):
-        try:
-            # First try with URL-decoded path (handle spaces and special characters)
-            from urllib.parse import unquote
-            decoded_path = unquote(path)
-            print(f"[StaticFiles] Requested path: {path}")
-            print(f"[StaticFiles] Decoded path: {decoded_path}")
-            print(f"[StaticFiles] Full directory: {self.directory}")
-            
-            # Replace backslashes with forward slashes for consistency
-            decoded_path = decoded_path.replace('\\', '/')
-            
-            # Clean up double slashes
-            while '//' in decoded_path:
-                decoded_path = decoded_path.replace('//', '/')
-            
-            # Remove any leading slash
-            if decoded_path.startswith('/'):
-                decoded_path = decoded_path[1:]
-            
-            # Build the full path using os.path.join for platform-specific path handling
-            full_path = os.path.join(str(self.directory), decoded_path)
-            print(f"[StaticFiles] Full file path: {full_path}")
-            print(f"[StaticFiles] File exists: {os.path.exists(full_path)}")
-            
-            if not os.path.exists(full_path):
-                print(f"[StaticFiles] Looking for file in folder: {os.listdir(os.path.dirname(full_path))}")
-                
-            response = await super().get_response(decoded_path, scope)
-            print(f"[StaticFiles] Response status: {response.status_code}")
-            return response
-        except Exception as e:
-            print(f"[StaticFiles] Error serving {path}: {str(e)}")
-            raise
+# Set SHUSPOT_STATIC_MODE=debug to log every static file lookup
+STATIC_PRODUCTION_MODE = os.environ.get("SHUSPOT_STATIC_MODE", "production").lower() != "debug"
+
+# Hot page images are kept in memory (size set by SHUSPOT_PAGE_CACHE_MB)
+page_cache = PageByteCache()
 
 # Mount each folder that exists
 for folder in SHUSPOT_FOLDERS:
@@ -85,15 +69,80 @@ for folder in SHUSPOT_FOLDERS:
         print(f"Checking ShuSpot folder: {folder}")
         folder_name = os.path.basename(folder)
         # Mount directly at the folder name since proxy strips /shuspot-images prefix
-        app.mount(f"/{folder_name}", CustomStaticFiles(directory=folder), name=f"shuspot-{folder_name}")
+        app.mount(f"/{folder_name}", CustomStaticFiles(directory=folder, production=STATIC_PRODUCTION_MODE, page_cache=page_cache), name=f"shuspot-{folder_name}")
         print(f"Static files mounted successfully for {folder} at /{folder_name}")
     else:
         print(f"ShuSpot folder not found - static files not mounted for {folder}")
 
+def resolve_shuspot_path(path: str) -> Optional[str]:
+    """
+    Map "<folder name>/<relative path>" onto a file inside one of SHUSPOT_FOLDERS, resolved
+    exactly like the static mount for that folder resolves the same request
+    """
+    from urllib.parse import unquote
+    
+    parts = path.replace('\\', '/').strip('/').split('/', 1)
+    if len(parts) != 2:
+        return None
+    
+    folder_name, relative_path = unquote(parts[0]), parts[1]
+    for folder in SHUSPOT_FOLDERS:
+        if os.path.basename(folder) != folder_name:
+            continue
+        
+        # Refuses anything that escapes the mounted folder (e.g. "../")
+        full_path = resolve_static_path(os.path.realpath(folder), relative_path)
+        return full_path if full_path and os.path.isfile(full_path) else None
+    
+    return None
+
+def prewarm_pages(image_urls: List[str]):
+    """Load page images into the page cache by their manifest URLs (runs as a background task)"""
+    from urllib.parse import unquote
+    
+    paths = [resolve_shuspot_path(unquote(url.split('?', 1)[0])) for url in image_urls]
+    page_cache.prewarm([path for path in paths if path])
+
+# Resized page images are created lazily on first request
+derivative_cache = DerivativeCache()
+
 # Global Google Sheets manager (will be initialized when credentials are provided)
 sheets_manager = None
 txt_pipeline = None
 
+# Sheets I/O runs on its own bounded thread pool; handlers await it through sheets_async
+sheets_executor = SheetsExecutor()
+sheets_async = None
+
+# Curator scripts run in separate worker processes (CPU, memory and wall-clock limits)
+script_pool = ScriptWorkerPool()
+
+@app.on_event("startup")
+def load_custom_parsers():
+    # Compile the persisted regex parsers before the first request
+    DYNAMIC_PARSERS.refresh(force=True)
+
+@app.on_event("startup")
+def start_script_pool():
+    try:
+        script_pool.start()
+    except Exception as e:
+        logging.warning(f"Script workers not started, will retry on first script: {e}")
+
+@app.on_event("shutdown")
+def shutdown_sheets_executor():
+    sheets_executor.shutdown()
+
+@app.on_event("shutdown")
+def shutdown_script_pool():
+    script_pool.shutdown()
+
+def sheets_unavailable(e: Exception) -> HTTPException:
+    """HTTP error for a Sheets call that was rejected or timed out"""
+    if isinstance(e, SheetsBusy):
+        return HTTPException(status_code=503, detail=str(e))
+    return HTTPException(status_code=504, detail="Timed out waiting for Google Sheets")
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 
@@ -126,6 +175,77 @@ async def test_static():
         "sample_files": files
     }
 
+@app.get("/img/{path:path}")
+async def get_resized_image(
+    path: str,
+    request: Request,
+    w: int = 0,
+    fmt: str = "webp",
+    v: str = ""
+):
+    """
+    Serve a ShuSpot image resized to the requested width, e.g. /img/CROP-ShuSpot/Art/Book/resized/crop-1.png?w=600&fmt=webp.
+    URLs carrying the source's current version (v, as in manifest thumbnail URLs) are cacheable forever.
+    """
+    
+    if not PIL_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Image resizing not available - Pillow not installed")
+    
+    fmt = fmt.lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    
+    source_path = resolve_shuspot_path(path)
+    if not source_path:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    try:
+        derivative_path, etag = await derivative_cache.get(source_path, snap_width(w), fmt)
+    except UnsupportedImage:
+        raise HTTPException(status_code=415, detail="Not an image that can be resized")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image resize failed: {str(e)}")
+    
+    # The URL only names a fixed derivative when it carries the source version; otherwise
+    # clients revalidate with the ETag (which changes whenever the source changes)
+    versioned = bool(v) and v == source_version(os.stat(source_path))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable" if versioned else "no-cache"
+    }
+    
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    
+    return FileResponse(derivative_path, media_type=media_type_for(derivative_path), headers=headers)
+
+@app.api_route("/media/{path:path}", methods=["GET", "HEAD"])
+async def get_media_file(path: str, request: Request):
+    """Serve audio/video from the ShuSpot folders with Range support, e.g. /media/CROP-ShuSpot/Video Books/A Boy Like You/A Boy Like You.mp4"""
+    
+    source_path = resolve_shuspot_path(path)
+    if not source_path:
+        raise HTTPException(status_code=404, detail="Media file not found")
+    
+    stat_result = os.stat(source_path)
+    return RangeFileResponse(source_path, stat_result, request.headers, method=request.method)
+
+@app.get("/page-cache/stats")
+async def get_page_cache_stats():
+    """Get in-memory page image cache hit-rate metrics"""
+    return page_cache.get_stats()
+
+@app.post("/page-cache/clear")
+async def clear_page_cache():
+    """Drop all cached page images"""
+    page_cache.clear()
+    return {"message": "Page cache cleared"}
+
+@app.get("/img-cache/stats")
+async def get_image_cache_stats():
+    """Get resized image cache statistics"""
+    return derivative_cache.get_stats()
+
 @app.post("/upload-books")
 async def upload_books(
     files: List[UploadFile] = File(...),
@@ -251,6 +371,59 @@ async def get_books(
         "limit": limit
     }
 
+@app.get("/books/{book_id}/manifest")
+async def get_book_manifest(
+    book_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Get the reader manifest (page sizes, hashes, thumbnails and page audio) for a book"""
+    
+    book = db.query(Book).filter(Book.id == book_id).first()
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    
+    try:
+        notes_data = json.loads(book.notes) if book.notes else {}
+    except json.JSONDecodeError:
+        notes_data = {}
+    if not isinstance(notes_data, dict):
+        notes_data = {}
+    
+    manifest = notes_data.get('manifest')
+    if not manifest or manifest.get('version') != MANIFEST_VERSION:
+        page_sequence = notes_data.get('page_sequence')
+        if not page_sequence:
+            raise HTTPException(status_code=404, detail="Book has no pages")
+        
+        # Books imported before manifests existed (or with an older manifest layout) get one
+        # built and saved on first request (stats and hashes every page, so off the event loop)
+        manifest = await run_in_threadpool(
+            build_book_manifest,
+            notes_data.get('folder_path', book.file_path or ''),
+            page_sequence,
+            notes_data.get('files', {}).get('audio', []),
+            SHUSPOT_FOLDERS
+        )
+        notes_data['manifest'] = manifest
+        book.notes = json.dumps(notes_data)
+        db.commit()
+    
+    # The reader fetches the manifest when a book is launched, so load its first pages into memory,
+    # under the same resolved paths the static mounts look them up by
+    if page_cache.enabled:
+        image_urls = [page['image_url'] for page in manifest.get('pages', [])[:PREWARM_PAGES] if page.get('image_url')]
+        background_tasks.add_task(prewarm_pages, image_urls)
+    
+    etag = manifest_etag(manifest)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse(content={"book_id": book.id, "title": book.title, **manifest}, headers=headers)
+
 @app.post("/books/{book_id}/update")
 async def update_book(
     book_id: int,
@@ -409,10 +582,11 @@ async def export_csv(db: Session = Depends(get_db)):
 async def setup_google_sheets(
     credentials_file: UploadFile = File(...),
     spreadsheet_name: str = Form("ShuSpot Books Master"),
-    worksheet_name: str = Form(None)
+    worksheet_name: str = Form(None),
+    shard_by: str = Form(None)
 ):
-    """Setup Google Sheets integration with service account credentials"""
-    global sheets_manager, txt_pipeline
+    """Setup Google Sheets integration with service account credentials (optionally sharded by Media or Category)"""
+    global sheets_manager, sheets_async, txt_pipeline
     
     try:
         # Save credentials file
@@ -421,18 +595,22 @@ async def setup_google_sheets(
             shutil.copyfileobj(credentials_file.file, buffer)
         
         # Initialize Google Sheets manager
-        sheets_manager = GoogleSheetsManager(credentials_path, spreadsheet_name, worksheet_name)
+        sheets_manager = GoogleSheetsManager(credentials_path, spreadsheet_name, worksheet_name, shard_by=shard_by or None)
+        sheets_async = AsyncSheetsManager(sheets_manager, sheets_executor)
         
-        if sheets_manager.connect():
+        if await sheets_async.connect():
             txt_pipeline = TxtIngestionPipeline(sheets_manager)
             return {
                 "message": "Google Sheets connected successfully", 
                 "spreadsheet": spreadsheet_name,
-                "worksheet": worksheet_name or "First sheet"
+                "worksheet": worksheet_name or "First sheet",
+                "shard_by": sheets_manager.shard_by
             }
         else:
             return {"error": "Failed to connect to Google Sheets"}
             
+    except (SheetsBusy, asyncio.TimeoutError) as e:
+        return {"error": f"Setup failed: {sheets_unavailable(e).detail}"}
     except Exception as e:
         return {"error": f"Setup failed: {str(e)}"}
 
@@ -445,20 +623,27 @@ async def google_sheets_status():
         return {"connected": False, "message": "Google Sheets not configured"}
     
     try:
-        # Test connection by getting sheet info
-        books = sheets_manager.get_all_books()
+        # Test connection by getting sheet info (served from the local mirror when fresh)
+        books = await sheets_async.get_all_books()
         return {
             "connected": True, 
             "spreadsheet": sheets_manager.spreadsheet_name,
-            "total_books": len(books)
+            "total_books": len(books),
+            "revision": sheets_manager.mirror.revision,
+            "shards": [shard.worksheet_title for shard in sheets_manager.shard_managers()] if sheets_manager.shard_by else None,
+            "api": sheets_manager.api.get_stats(),
+            "executor": sheets_executor.get_stats()
         }
+    except (SheetsBusy, asyncio.TimeoutError) as e:
+        return {"connected": False, "error": sheets_unavailable(e).detail}
     except Exception as e:
         return {"connected": False, "error": str(e)}
 
 @app.get("/google-sheets/books")
 async def get_google_sheets_books(
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    refresh: bool = False
 ):
     """Get books from Google Sheets"""
     global sheets_manager
@@ -467,23 +652,24 @@ async def get_google_sheets_books(
         raise HTTPException(status_code=400, detail="Google Sheets not configured")
     
     try:
-        all_books = sheets_manager.get_all_books()
-        
-        # Apply pagination
-        paginated_books = all_books[offset:offset + limit]
+        # Pagination is served from the local mirror; refresh=true forces a new download
+        page = await sheets_async.get_books_page(offset, limit, force_refresh=refresh)
         
         return {
-            "books": paginated_books,
-            "total": len(all_books),
+            "books": page["books"],
+            "total": page["total"],
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "revision": page["revision"]
         }
         
+    except (SheetsBusy, asyncio.TimeoutError) as e:
+        raise sheets_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching books: {str(e)}")
 
 @app.post("/google-sheets/sync-from-db")
-async def sync_db_to_sheets(db: Session = Depends(get_db)):
+async def sync_db_to_sheets():
     """Sync local database books to Google Sheets"""
     global sheets_manager
     
@@ -491,82 +677,65 @@ async def sync_db_to_sheets(db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Google Sheets not configured")
     
     try:
-        # Get all books from local DB
-        books = db.query(Book).all()
-        
-        if not books:
-            return {
-                "message": "No books found in local database",
-                "results": {"success": 0, "errors": 0, "duplicates": 0}
-            }
-        
-        # Convert to ShuSpot Google Sheets format
-        sheets_data = []
-        for book in books:
-            # Determine media type based on file extension and book_type
-            media_type = 'Book'  # Default
-            if book.file_type:
-                file_ext = book.file_type.upper()
-                if file_ext in ['MP4', 'MOV', 'AVI', 'MKV', 'WEBM']:
-                    media_type = 'Video'
-                elif file_ext in ['MP3', 'M4A', 'WAV', 'AAC']:
-                    media_type = 'Audio'
-                elif file_ext == 'PDF':
-                    media_type = 'PDF'
-                elif book.book_type == 'Audiobooks':
-                    media_type = 'Audio'
-                elif book.book_type == 'Video Books':
-                    media_type = 'Video'
-            
-            # Convert reading level to age range
-            age_range = ''
-            if book.reading_level and book.reading_level != 'Unknown':
-                reading_level = book.reading_level.lower()
-                if 'pre-k' in reading_level or 'kindergarten' in reading_level or 'grade 1' in reading_level or 'grade 2' in reading_level:
-                    age_range = '4-7'
-                elif 'grade 3' in reading_level or 'grade 4' in reading_level or 'grade 5' in reading_level:
-                    age_range = '8-10'
-                elif 'grade 6' in reading_level or 'grade 7' in reading_level or 'grade 8' in reading_level:
-                    age_range = '11-13'
-                elif 'grade 9' in reading_level or 'high school' in reading_level:
-                    age_range = '14-18'
-            
-            # Create the data row for Google Sheets
-            book_data = {
-                'Name': book.title or '',
-                'Category': book.genre if book.genre != 'Unknown' else '',
-                'Media': media_type,
-                'URL': book.file_path or '',
-                'Author': book.author or '',
-                'Age': age_range,
-                'Read time': '',  # Not available in local DB
-                'AR Level': '',   # Not available in local DB
-                'Lexile': '',     # Not available in local DB
-                'GRL': '',        # Not available in local DB
-                'Pages': '',      # Not available in local DB
-                'Audiobook Length': '',  # Not available in local DB
-                'Video Length': '',      # Not available in local DB
-                'Status': 'Active',
-                'Notes': book.notes or ''
-            }
-            
-            sheets_data.append(book_data)
-        
-        print(f"Prepared {len(sheets_data)} books for sync to Google Sheets")
-        
-        # Bulk upload to sheets
-        results = sheets_manager.bulk_add_books(sheets_data)
-        
+        # Only books that were added, changed or removed since the last sync are written
+        manager = sheets_manager
+        summary = await sheets_async.run_db_job(lambda db: DbToSheetsSync(db, manager).run())
+
+        message = (f"Database synced to Google Sheets: {summary['inserted']} added, {summary['updated']} updated, "
+                   f"{summary['deleted']} removed, {summary['unchanged']} unchanged")
+        if not summary["completed"]:
+            message += f" ({summary['pending']} pending, run the sync again to resume)"
+
         return {
-            "message": f"Database synced to Google Sheets: {results['success']} added, {results['duplicates']} duplicates, {results['errors']} errors",
-            "results": results,
-            "total_processed": len(sheets_data)
+            "message": message,
+            "results": summary,
+            "total_processed": summary["inserted"] + summary["updated"] + summary["deleted"]
         }
         
+    except (SheetsBusy, asyncio.TimeoutError) as e:
+        raise sheets_unavailable(e)
     except Exception as e:
         print(f"Sync error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
 
+@app.post("/google-sheets/sync-to-db")
+async def sync_sheets_to_db(
+    strategy: str = Form("last_writer_wins"),
+    merge_rules: str = Form(None),
+    dry_run: bool = Form(False)
+):
+    """Import curator edits from Google Sheets into the local database"""
+    global sheets_manager
+    
+    if not sheets_manager:
+        raise HTTPException(status_code=400, detail="Google Sheets not configured")
+    
+    try:
+        rules = json.loads(merge_rules) if merge_rules else None
+        import_merge_rules(strategy, rules)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        manager = sheets_manager
+        summary = await sheets_async.run_db_job(
+            lambda db: SheetsToDbImport(db, manager, strategy=strategy, rules=rules).run(dry_run)
+        )
+        
+        verb = "would update" if dry_run else "updated"
+        return {
+            "message": (f"Sheets import {verb} {summary['updated']} books: {summary['matched']} matched, "
+                        f"{summary['unchanged']} unchanged, {summary['kept_db']} kept local values, "
+                        f"{summary['unmatched']} rows without a local book"),
+            "results": summary
+        }
+        
+    except (SheetsBusy, asyncio.TimeoutError) as e:
+        raise sheets_unavailable(e)
+    except Exception as e:
+        print(f"Sheets import error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+
 @app.put("/google-sheets/books/{book_id}")
 async def update_google_sheets_book(
     book_id: int,
@@ -579,28 +748,37 @@ async def update_google_sheets_book(
         raise HTTPException(status_code=400, detail="Google Sheets not configured")
     
     try:
-        success = sheets_manager.update_book(book_id, updates)
+        success = await sheets_async.update_book(book_id, updates)
         
         if success:
             return {"message": "Book updated successfully"}
         else:
             raise HTTPException(status_code=404, detail="Book not found")
             
+    except (SheetsBusy, asyncio.TimeoutError) as e:
+        raise sheets_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
 
 @app.get("/google-sheets/duplicates")
-async def find_duplicates():
-    """Find duplicate books in Google Sheets"""
+async def find_duplicates(near: bool = False):
+    """Find duplicate books in Google Sheets (near=true also lists likely typos)"""
     global sheets_manager
     
     if not sheets_manager:
         raise HTTPException(status_code=400, detail="Google Sheets not configured")
     
     try:
-        duplicates = sheets_manager.get_duplicates()
-        return {"duplicates": duplicates, "count": len(duplicates)}
+        found = await sheets_async.find_duplicates(include_near=near)
+        return {
+            "duplicates": found["duplicates"],
+            "count": len(found["duplicates"]),
+            "groups": found["groups"],
+            "near_duplicates": found["near_duplicates"]
+        }
         
+    except (SheetsBusy, asyncio.TimeoutError) as e:
+        raise sheets_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error finding duplicates: {str(e)}")
 
@@ -614,7 +792,7 @@ async def parse_txt_folder(
     
     try:
         parser = TxtMetadataParser()
-        metadata = parser.parse_folder(folder_path)
+        metadata = await run_in_threadpool(parser.parse_folder, folder_path)
         
         if metadata:
             # Convert to Google Sheets format
@@ -633,17 +811,28 @@ async def batch_parse_txt_folders(
 ):
     """Parse TXT files from multiple folders"""
     
+    def parse_preview():
+        # Only the preview is kept; the rest of the folders are just counted
+        preview = []
+        total_folders = 0
+        for metadata in parser.iter_parsed_folders(root_directory, max_folders):
+            if len(preview) < 10:
+                preview.append(metadata)
+            total_folders += 1
+        return preview, total_folders
+    
     try:
         parser = TxtMetadataParser()
-        metadata_list = parser.batch_parse_folders(root_directory, max_folders)
+        # Walking and reading the folders is blocking file I/O, so it runs off the event loop
+        preview, total_folders = await run_in_threadpool(parse_preview)
         
         # Convert to Google Sheets format
-        sheets_data = parser.export_to_google_sheets_format(metadata_list)
+        sheets_data = parser.export_to_google_sheets_format(preview)
         
         return {
-            "total_folders": len(metadata_list),
-            "metadata": metadata_list[:10],  # Return first 10 for preview
-            "sheets_format": sheets_data[:10]  # Return first 10 for preview
+            "total_folders": total_folders,
+            "metadata": preview,  # Return first 10 for preview
+            "sheets_format": sheets_data  # Return first 10 for preview
         }
         
     except Exception as e:
@@ -661,9 +850,12 @@ async def ingest_txt_to_sheets(
         raise HTTPException(status_code=400, detail="Google Sheets not configured")
     
     try:
-        results = txt_pipeline.ingest_from_directory(root_directory, max_folders)
+        # Parsing and the bulk upload both run on the Sheets executor
+        results = await sheets_async.run_job(txt_pipeline.ingest_from_directory, root_directory, max_folders)
         return results
         
+    except (SheetsBusy, asyncio.TimeoutError) as e:
+        raise sheets_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
 
@@ -678,7 +870,7 @@ async def parse_shuspot_folder(
         from shuspot_folder_parser import ShuSpotFolderParser
         
         parser = ShuSpotFolderParser(folder_path)
-        books = parser.parse_all_books()
+        books = await run_in_threadpool(parser.parse_all_books)
         stats = parser.get_summary_stats()
         
         return {
@@ -705,9 +897,9 @@ async def parse_and_upload_to_sheets(
     try:
         from shuspot_folder_parser import ShuSpotFolderParser
         
-        # Parse the folder structure
+        # Parse the folder structure (blocking file I/O, so off the event loop)
         parser = ShuSpotFolderParser(folder_path)
-        books = parser.parse_all_books()
+        books = await run_in_threadpool(parser.parse_all_books)
         
         if not books:
             return {"message": "No books found in folder structure", "results": {"success": 0, "errors": 0, "duplicates": 0}}
@@ -716,7 +908,7 @@ async def parse_and_upload_to_sheets(
         sheets_data = parser.export_to_google_sheets_format()
         
         # Upload to Google Sheets
-        results = sheets_manager.bulk_add_books(sheets_data)
+        results = await sheets_async.bulk_add_books(sheets_data)
         stats = parser.get_summary_stats()
         
         return {
@@ -727,6 +919,8 @@ async def parse_and_upload_to_sheets(
             "sample_books": sheets_data[:3]  # Show first 3 for preview
         }
         
+    except (SheetsBusy, asyncio.TimeoutError) as e:
+        raise sheets_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Parse and upload failed: {str(e)}")
 
@@ -739,9 +933,9 @@ async def parse_and_import_to_db(
     try:
         from shuspot_folder_parser import ShuSpotFolderParser
         
-        # Parse the folder structure
+        # Parse the folder structure (blocking file I/O, so off the event loop)
         parser = ShuSpotFolderParser(folder_path)
-        books = parser.parse_all_books()
+        books = await run_in_threadpool(parser.parse_all_books)
         
         if not books:
             return {"message": "No books found in folder structure", "imported_count": 0, "errors": []}
@@ -760,6 +954,15 @@ async def parse_and_import_to_db(
                 if existing_book:
                     continue
                 
+                # Page sizes, hashes and audio for the reader, computed once here (off the event loop)
+                manifest = await run_in_threadpool(
+                    build_book_manifest,
+                    book_data.get('_folder_path', ''),
+                    book_data.get('_page_sequence', []),
+                    book_data.get('_files', {}).get('audio', []),
+                    SHUSPOT_FOLDERS
+                ) if book_data.get('_page_sequence') else None
+                
                 # Determine file type based on media type
                 file_type_mapping = {
                     'Read to Me': 'AUDIO',
@@ -798,7 +1001,8 @@ async def parse_and_import_to_db(
                         'description': book_data.get('Notes', ''),
                         # Preserve page sequence data for Launch Book feature
                         'page_sequence': book_data.get('_page_sequence', []),
-                        'total_pages': book_data.get('_total_pages', 0)
+                        'total_pages': book_data.get('_total_pages', 0),
+                        'manifest': manifest
                     })
                 )
                 
@@ -875,57 +1079,24 @@ async def execute_python_script(
     """Execute custom Python script for data processing"""
     
     try:
-        # Create a safe execution environment
-        safe_globals = {
-            '__builtins__': {
-                'print': print,
-                'len': len,
-                'str': str,
-                'int': int,
-                'float': float,
-                'list': list,
-                'dict': dict,
-                'range': range,
-                'enumerate': enumerate,
-            },
-            'os': os,
-            'json': json,
-            'TxtMetadataParser': TxtMetadataParser,
-            'sheets_manager': sheets_manager,
-            'root_directory': root_directory,
-            'get_custom_parsers': get_custom_parsers,
-            'parse_with_custom_parsers': parse_with_custom_parsers,
-            'add_custom_parser': add_custom_parser,
-            'create_regex_parser': create_regex_parser
-        }
-        
-        # Capture output
-        import io
-        import sys
-        
-        old_stdout = sys.stdout
-        sys.stdout = captured_output = io.StringIO()
-        
-        try:
-            # Execute the script
-            exec(script_code, safe_globals)
-            output = captured_output.getvalue()
-            
-            return {
-                "success": True,
-                "output": output,
-                "message": "Script executed successfully"
-            }
-            
-        finally:
-            sys.stdout = old_stdout
-            
-    except Exception as e:
+        # Runs in a separate worker process, so a slow script doesn't hold up other requests
+        result = await script_pool.run_async("python", script_code, {"root_directory": root_directory})
+    except ScriptPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    if result["success"]:
         return {
-            "success": False,
-            "error": str(e),
-            "message": "Script execution failed"
+            "success": True,
+            "output": result["output"],
+            "message": "Script executed successfully"
         }
+    return {
+        "success": False,
+        "error": result["error"],
+        "output": result["output"],
+        "timed_out": result["timed_out"],
+        "message": "Script execution failed"
+    }
 
 # Custom Parser Management Endpoints
 
@@ -939,19 +1110,31 @@ async def get_custom_parsers_list():
         
         for parser in parsers:
             parser_info.append({
-                "name": parser.__class__.__name__,
+                "name": parser.get_name(),
                 "priority": parser.get_priority(),
-                "description": parser.__doc__ or "No description available"
+                "description": parser.__doc__ or "No description available",
+                "stats": PARSER_PROFILER.parser_stats(parser.get_name())
             })
         
+        profile = PARSER_PROFILER.get_stats()
+        profile.pop("parsers")  # already listed per parser
+        
         return {
             "parsers": parser_info,
-            "total": len(parser_info)
+            "total": len(parser_info),
+            "definitions_version": DYNAMIC_PARSERS.version,
+            "profile": profile
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting parsers: {str(e)}")
 
+@app.post("/custom-parsers/stats/reset")
+async def reset_custom_parser_stats():
+    """Zero the per-parser call counts, latency histograms and win rates"""
+    PARSER_PROFILER.reset()
+    return {"message": "Custom parser stats reset"}
+
 @app.post("/custom-parsers/test")
 async def test_custom_parser(
     file_path: str = Form(...),
@@ -993,11 +1176,8 @@ async def create_regex_parser_endpoint(
         # Convert string keys to integers
         field_mapping_int = {int(k): v for k, v in field_mapping_dict.items()}
         
-        # Create the parser
-        new_parser = create_regex_parser(name, pattern, field_mapping_int, priority)
-        
-        # Add to registry
-        add_custom_parser(new_parser)
+        # Create the parser and persist it; other workers load it on their next parse
+        save_regex_parser(name, pattern, field_mapping_int, priority)
         
         return {
             "message": f"Created regex parser: {name}",
@@ -1009,6 +1189,8 @@ async def create_regex_parser_endpoint(
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON in field_mapping")
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pattern: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Parser creation failed: {str(e)}")
 
@@ -1032,118 +1214,169 @@ async def parse_with_custom_parsers_endpoint(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Custom parsing failed: {str(e)}")
 
+def batch_file_paths(directory: Optional[str], file_paths: Optional[str], recursive: bool, max_files: int) -> List[str]:
+    """Files named by a batch parser request: a directory to walk and/or a JSON list of paths"""
+    paths = []
+    if file_paths:
+        try:
+            listed = json.loads(file_paths)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON in file_paths")
+        if not isinstance(listed, list) or not all(isinstance(path, str) for path in listed):
+            raise HTTPException(status_code=400, detail="file_paths must be a JSON list of paths")
+        paths.extend(listed)
+    if directory:
+        if not os.path.isdir(directory):
+            raise HTTPException(status_code=400, detail=f"Directory not found: {directory}")
+        paths.extend(islice(walk_files(directory, recursive), max(0, max_files - len(paths))))
+    if not paths:
+        raise HTTPException(status_code=400, detail="Provide a directory or a non-empty file_paths list")
+    return paths[:max_files]
+
+def stream_batch_results(paths: List[str], compare=None) -> StreamingResponse:
+    """
+    Newline-delimited JSON: one {"type": "file", ...} line per file as it's parsed, then a
+    {"type": "summary", ...} line with which parsers won, their timings and the unmatched share
+    """
+    def lines():
+        stats = BatchParseStats()
+        for result in parse_file_batch(paths, compare=compare):
+            stats.add(result)
+            yield json.dumps({"type": "file", **result}, default=str) + "\n"
+        yield json.dumps({"type": "summary", **stats.summary()}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/custom-parsers/test-batch")
+async def test_custom_parsers_batch(
+    directory: Optional[str] = Form(None),
+    file_paths: Optional[str] = Form(None),  # JSON list of paths
+    recursive: bool = Form(True),
+    max_files: int = Form(5000),
+    include_standard: bool = Form(False)
+):
+    """Test custom parsers against every file in a directory or list, streaming per-file results"""
+    
+    # Walking the directory is blocking file I/O, so it runs off the event loop
+    paths = await run_in_threadpool(batch_file_paths, directory, file_paths, recursive, max_files)
+    # The standard parser is the slow part; only run it when a comparison is asked for
+    return stream_batch_results(paths, MetadataParser.parse_file_metadata if include_standard else None)
+
+@app.post("/parse-with-custom/batch")
+async def parse_with_custom_parsers_batch(
+    directory: Optional[str] = Form(None),
+    file_paths: Optional[str] = Form(None),  # JSON list of paths
+    recursive: bool = Form(True),
+    max_files: int = Form(5000)
+):
+    """Parse every file in a directory or list with custom parsers, streaming per-file results"""
+    
+    paths = await run_in_threadpool(batch_file_paths, directory, file_paths, recursive, max_files)
+    return stream_batch_results(paths)
+
 # TXT Ingestion Script Editor Routes
+async def upload_script_results(results: List[Dict], upload_to_sheets: bool, upload_to_database: bool,
+                                db: Session) -> Dict:
+    """Send the books a TXT script collected to Google Sheets and/or the local database"""
+    upload = {"sheets_uploaded": False, "database_uploaded": False, "error": ""}
+    
+    if upload_to_sheets and sheets_manager:
+        try:
+            # One deduplicated, chunked append; the counts are what scripts used to print themselves
+            upload["sheets_results"] = await sheets_async.bulk_add_books(results)
+            upload["sheets_uploaded"] = True
+        except Exception as e:
+            upload["error"] += f"Sheets upload error: {str(e)}\n"
+    
+    if upload_to_database:
+        try:
+            for book_data in results:
+                # Add to local database
+                db_book = Book(
+                    title=book_data.get('title', 'Unknown'),
+                    author=book_data.get('author', 'Unknown'),
+                    genre=book_data.get('genre', 'Unknown'),
+                    book_type=book_data.get('book_type', 'Books'),
+                    fiction_type=book_data.get('fiction_type', 'Fiction'),
+                    reading_level=book_data.get('reading_level', ''),
+                    file_name=book_data.get('file_name', ''),
+                    file_path=book_data.get('file_path', ''),
+                    description=book_data.get('description', ''),
+                    series=book_data.get('series', ''),
+                    isbn=book_data.get('isbn', ''),
+                    publisher=book_data.get('publisher', ''),
+                    notes=book_data.get('notes', '')
+                )
+                db.add(db_book)
+            db.commit()
+            upload["database_uploaded"] = True
+        except Exception as e:
+            db.rollback()
+            upload["error"] += f"Database upload error: {str(e)}\n"
+    
+    return upload
+
 @app.post("/txt-ingestion/execute-script")
 async def execute_txt_script(
     script: str = Form(...),
     preview_mode: bool = Form(True),
     upload_to_sheets: bool = Form(False),
     upload_to_database: bool = Form(False),
+    max_preview_rows: int = Form(SCRIPT_PREVIEW_MAX_ROWS),
     db: Session = Depends(get_db)
 ):
     """Execute custom Python script for TXT file ingestion with preview"""
     try:
-        # Import required modules for script execution
-        import sys
-        import io
-        from contextlib import redirect_stdout, redirect_stderr
-        import traceback
-        
-        # Available variables for the script
-        script_globals = {
-            'root_directory': UPLOAD_DIR,
-            'sheets_manager': sheets_manager,
-            'TxtMetadataParser': TxtMetadataParser,
-            'parser': None,
-            'os': __import__('os'),
-            'json': __import__('json'),
-            're': __import__('re'),
-            'glob': __import__('glob'),
-            'pathlib': __import__('pathlib'),
-            'results': [],  # To collect results
-            'preview_data': [],  # To collect preview data
-        }
-        
-        # Capture stdout and stderr
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
+        # The script runs in a worker process; results/preview_data come back over its pipe
+        try:
+            script_result = await script_pool.run_async(
+                "txt", script, {"root_directory": UPLOAD_DIR}, variables=("results", "preview_data"),
+                row_variable="preview_data", max_rows=max_preview_rows
+            )
+        except ScriptPoolBusy as e:
+            raise HTTPException(status_code=503, detail=str(e))
         
         execution_result = {
             "success": False,
-            "output": "",
+            "output": script_result["output"],
             "error": "",
             "preview_data": [],
+            "preview_total": 0,
             "processed_count": 0,
             "sheets_uploaded": False,
             "database_uploaded": False
         }
         
-        try:
-            with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-                # Execute the script
-                exec(script, script_globals)
-                
-                # Get results from script
-                preview_data = script_globals.get('preview_data', [])
-                results = script_globals.get('results', [])
-                
-                execution_result.update({
-                    "success": True,
-                    "output": stdout_capture.getvalue(),
-                    "preview_data": preview_data,
-                    "processed_count": len(results)
-                })
-                
-                # If not in preview mode, upload to destinations
-                if not preview_mode and results:
-                    if upload_to_sheets and sheets_manager:
-                        try:
-                            for book_data in results:
-                                await sheets_manager.add_book(book_data)
-                            execution_result["sheets_uploaded"] = True
-                        except Exception as e:
-                            execution_result["error"] += f"Sheets upload error: {str(e)}\n"
-                    
-                    if upload_to_database:
-                        try:
-                            for book_data in results:
-                                # Add to local database
-                                db_book = Book(
-                                    title=book_data.get('title', 'Unknown'),
-                                    author=book_data.get('author', 'Unknown'),
-                                    genre=book_data.get('genre', 'Unknown'),
-                                    book_type=book_data.get('book_type', 'Books'),
-                                    fiction_type=book_data.get('fiction_type', 'Fiction'),
-                                    reading_level=book_data.get('reading_level', ''),
-                                    file_name=book_data.get('file_name', ''),
-                                    file_path=book_data.get('file_path', ''),
-                                    description=book_data.get('description', ''),
-                                    series=book_data.get('series', ''),
-                                    isbn=book_data.get('isbn', ''),
-                                    publisher=book_data.get('publisher', ''),
-                                    notes=book_data.get('notes', '')
-                                )
-                                db.add(db_book)
-                            db.commit()
-                            execution_result["database_uploaded"] = True
-                        except Exception as e:
-                            db.rollback()
-                            execution_result["error"] += f"Database upload error: {str(e)}\n"
-                
-        except Exception as e:
+        if script_result["success"]:
+            # Get results from script; preview_data is capped at max_preview_rows
+            variables = script_result["variables"]
+            results = variables.get("results") or []
+            
             execution_result.update({
-                "success": False,
-                "error": f"Script execution error: {str(e)}\n{traceback.format_exc()}",
-                "output": stdout_capture.getvalue()
+                "success": True,
+                "preview_data": variables.get("preview_data") or [],
+                "preview_total": variables.get("preview_data_total", 0),
+                "processed_count": len(results)
+            })
+            
+            # If not in preview mode, upload to destinations
+            if not preview_mode and results:
+                execution_result.update(await upload_script_results(results, upload_to_sheets, upload_to_database, db))
+        else:
+            execution_result.update({
+                "error": f"Script execution error: {script_result['error']}",
+                "timed_out": script_result["timed_out"]
             })
         
         # Always include any stderr output
-        stderr_output = stderr_capture.getvalue()
+        stderr_output = script_result["stderr"]
         if stderr_output:
             execution_result["error"] += f"Warnings: {stderr_output}"
             
         return execution_result
         
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -1153,6 +1386,78 @@ async def execute_txt_script(
             "processed_count": 0
         }
 
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/txt-ingestion/execute-script/stream")
+async def execute_txt_script_stream(
+    script: str = Form(...),
+    preview_mode: bool = Form(True),
+    upload_to_sheets: bool = Form(False),
+    upload_to_database: bool = Form(False),
+    max_preview_rows: int = Form(SCRIPT_PREVIEW_MAX_ROWS)
+):
+    """
+    Execute a TXT ingestion script, streaming Server-Sent Events while it runs: "started" once
+    a worker picks it up, "output"/"stderr" ({"text"}) as lines are printed, "rows" ({"rows",
+    "total"}) as preview rows are added (up to max_preview_rows, then counts only), and a final
+    "done" with the fields of /txt-ingestion/execute-script minus what was already streamed
+    """
+    try:
+        messages = script_pool.stream(
+            "txt", script, {"root_directory": UPLOAD_DIR}, variables=("results", "preview_data"),
+            row_variable="preview_data", max_rows=max_preview_rows
+        )
+        # Wait for a worker now, so a full pool is a 503 rather than an error event
+        first = await messages.__anext__()
+    except ScriptPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    async def events():
+        message = first
+        try:
+            while True:
+                kind, payload = message
+                if kind == "done":
+                    break
+                if kind in ("rows", "started"):
+                    yield sse_event(kind, payload)
+                else:
+                    yield sse_event(kind, {"text": payload})
+                message = await messages.__anext__()
+        finally:
+            await messages.aclose()  # client gone mid-script: frees (replaces) the worker
+        
+        script_result = payload
+        variables = script_result.get("variables", {})
+        results = variables.get("results") or []
+        done = {
+            "success": script_result["success"],
+            "output": script_result.get("output", ""),  # only a truncation notice, if any
+            "error": "" if script_result["success"] else f"Script execution error: {script_result['error']}",
+            "timed_out": script_result.get("timed_out", False),
+            "preview_total": variables.get("preview_data_total", 0),
+            "processed_count": len(results),
+            "sheets_uploaded": False,
+            "database_uploaded": False
+        }
+        if script_result["success"] and not preview_mode and results:
+            # Own session: request dependencies may be closed before a streamed body finishes
+            db = SessionLocal()
+            try:
+                done.update(await upload_script_results(results, upload_to_sheets, upload_to_database, db))
+            finally:
+                db.close()
+        if script_result.get("stderr"):
+            done["error"] += f"Warnings: {script_result['stderr']}"
+        yield sse_event("done", done)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/txt-ingestion/sample-scripts")
 async def get_sample_scripts():
     """Get sample ChatGPT instruction scripts"""
@@ -0,0 +1,278 @@
+"""
+Media Duration Module
+Read audio/video durations from container headers only (MP4/MOV mvhd atom, MP3
+Xing/VBRI header or frame headers, WAV fmt/data chunks) so Audiobook Length,
+Video Length and Read time can be filled without decoding any media
+"""
+
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Optional
+
+# Worker threads probing files in probe_many
+MEDIA_PROBE_WORKERS = int(os.environ.get("SHUSPOT_MEDIA_PROBE_WORKERS", 4))
+
+# Probed durations remembered (keyed by path, validated by mtime/size)
+MEDIA_DURATION_CACHE_ENTRIES = 10000
+
+# Bytes searched for the first MP3 frame after the ID3 tag
+MP3_SYNC_SEARCH_BYTES = 64 * 1024
+
+# Frames sampled to decide whether an MP3 without a Xing/VBRI header is constant bitrate
+MP3_SAMPLE_FRAMES = 32
+
+MP4_EXTENSIONS = ('.mp4', '.m4a', '.m4v', '.mov')
+MP3_EXTENSIONS = ('.mp3',)
+WAV_EXTENSIONS = ('.wav',)
+PROBE_EXTENSIONS = MP4_EXTENSIONS + MP3_EXTENSIONS + WAV_EXTENSIONS
+
+# kbps by [version][layer] (version: 1 = MPEG-1, 2 = MPEG-2/2.5), index 0 = free format
+MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Hz by version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+MP3_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Duration in seconds read from the file's headers, or None if unknown/unsupported"""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            if ext in MP4_EXTENSIONS:
+                return _mp4_duration(f, size)
+            if ext in MP3_EXTENSIONS:
+                return _mp3_duration(f, size)
+            if ext in WAV_EXTENSIONS:
+                return _wav_duration(f, size)
+    except (OSError, struct.error, ValueError):
+        pass
+    return None
+
+
+def _mp4_duration(f: BinaryIO, size: int) -> Optional[float]:
+    """moov/mvhd: timescale and duration of the whole movie; mdat and other atoms are seeked over"""
+    position, end = 0, size
+    while position + 8 <= end:
+        f.seek(position)
+        atom_size, atom_type = struct.unpack('>I4s', f.read(8))
+        header = 8
+        if atom_size == 1:
+            atom_size = struct.unpack('>Q', f.read(8))[0]
+            header = 16
+        elif atom_size == 0:
+            atom_size = end - position
+        if atom_size < header:
+            return None
+
+        if atom_type == b'moov':
+            # Descend: the mvhd atom is a direct child of moov
+            position, end = position + header, position + atom_size
+            continue
+        if atom_type == b'mvhd':
+            version = f.read(4)[0]
+            if version == 1:
+                _, _, timescale, duration = struct.unpack('>QQIQ', f.read(28))
+            else:
+                _, _, timescale, duration = struct.unpack('>IIII', f.read(16))
+            return duration / timescale if timescale else None
+
+        position += atom_size
+    return None
+
+
+def _wav_duration(f: BinaryIO, size: int) -> Optional[float]:
+    """RIFF chunks: byte rate from 'fmt ', audio size from 'data'"""
+    riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+    if riff != b'RIFF' or wave != b'WAVE':
+        return None
+
+    byte_rate = None
+    position = 12
+    while position + 8 <= size:
+        f.seek(position)
+        chunk_id, chunk_size = struct.unpack('<4sI', f.read(8))
+        if chunk_id == b'fmt ':
+            byte_rate = struct.unpack('<HHII', f.read(12))[3]
+        elif chunk_id == b'data':
+            # Streamed recordings leave the size at 0 or 0xFFFFFFFF; use what's on disk instead
+            data_size = min(chunk_size, size - position - 8) if chunk_size else size - position - 8
+            return data_size / byte_rate if byte_rate else None
+        position += 8 + chunk_size + (chunk_size & 1)  # chunks are word aligned
+    return None
+
+
+def _mp3_frame(header: bytes) -> Optional[tuple]:
+    """(frame bytes, samples per frame, sample rate, kbps, version bits, mono) of a frame header, or None"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 3
+    layer = 4 - ((header[1] >> 1) & 3)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    version = 1 if version_bits == 3 else 2
+    kbps = MP3_BITRATES[(version, layer)][bitrate_index]
+    sample_rate = MP3_SAMPLE_RATES[version_bits][rate_index]
+    padding = (header[2] >> 1) & 1
+    mono = (header[3] >> 6) == 3
+
+    if layer == 1:
+        samples = 384
+        frame_bytes = (12 * kbps * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 576 if layer == 3 and version == 2 else 1152
+        frame_bytes = samples // 8 * kbps * 1000 // sample_rate + padding
+    return frame_bytes, samples, sample_rate, kbps, version_bits, mono
+
+
+def _mp3_duration(f: BinaryIO, size: int) -> Optional[float]:
+    """Xing/Info or VBRI frame count when present, else CBR arithmetic, else a walk over frame headers"""
+    start = 0
+    head = f.read(10)
+    if head[:3] == b'ID3':
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+
+    end = size
+    if size >= 128:
+        f.seek(size - 128)
+        if f.read(3) == b'TAG':
+            end = size - 128  # ID3v1 tag
+
+    # First frame whose successor also starts with a valid header (avoids false syncs)
+    f.seek(start)
+    buffer = f.read(MP3_SYNC_SEARCH_BYTES)
+    first = None
+    offset = buffer.find(b'\xff')
+    while offset != -1 and offset + 4 <= len(buffer):
+        frame = _mp3_frame(buffer[offset:offset + 4])
+        if frame:
+            following = buffer[offset + frame[0]:offset + frame[0] + 4]
+            if len(following) < 4 or _mp3_frame(following):
+                first = frame
+                break
+        offset = buffer.find(b'\xff', offset + 1)
+    if first is None:
+        return None
+
+    frame_bytes, samples, sample_rate, kbps, version_bits, mono = first
+    audio_start = start + offset
+
+    # Xing/Info sits after the side information of the first frame, VBRI at a fixed offset
+    side_info = (17 if mono else 32) if version_bits == 3 else (9 if mono else 17)
+    xing = buffer[offset + 4 + side_info:offset + 4 + side_info + 12]
+    if xing[:4] in (b'Xing', b'Info') and struct.unpack('>I', xing[4:8])[0] & 1:
+        return struct.unpack('>I', xing[8:12])[0] * samples / sample_rate
+    vbri = buffer[offset + 36:offset + 36 + 18]
+    if vbri[:4] == b'VBRI':
+        return struct.unpack('>I', vbri[14:18])[0] * samples / sample_rate
+
+    # No frame count in the file: constant bitrate if the first frames agree
+    position, bitrates = audio_start, set()
+    for _ in range(MP3_SAMPLE_FRAMES):
+        f.seek(position)
+        frame = _mp3_frame(f.read(4))
+        if not frame:
+            break
+        bitrates.add(frame[3])
+        position += frame[0]
+    if len(bitrates) <= 1:
+        return (end - audio_start) * 8 / (kbps * 1000)
+
+    # Variable bitrate without a header: count frames by hopping from header to header
+    position, frames = audio_start, 0
+    while position + 4 <= end:
+        f.seek(position)
+        frame = _mp3_frame(f.read(4))
+        if not frame or not frame[0]:
+            break
+        frames += 1
+        position += frame[0]
+    return frames * samples / sample_rate
+
+
+class DurationProber:
+    """probe_duration with an LRU cache keyed by path and validated by mtime/size, plus a worker pool"""
+
+    def __init__(self, workers: int = MEDIA_PROBE_WORKERS, max_entries: int = MEDIA_DURATION_CACHE_ENTRIES):
+        self.workers = workers
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # path -> (mtime_ns, size, seconds)
+        self._lock = threading.Lock()
+        self._executor = None
+        self.stats = {"hits": 0, "misses": 0, "failed": 0}
+
+    def get(self, path: str) -> Optional[float]:
+        """Cached duration of one file, probing it on a miss"""
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return None
+        key = os.path.abspath(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == stat_result.st_mtime_ns and entry[1] == stat_result.st_size:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[2]
+            self.stats["misses"] += 1
+
+        seconds = probe_duration(path)
+        with self._lock:
+            if seconds is None:
+                self.stats["failed"] += 1
+            self._entries[key] = (stat_result.st_mtime_ns, stat_result.st_size, seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return seconds
+
+    def probe_many(self, paths: Iterable[str]) -> Dict[str, Optional[float]]:
+        """Durations of many files, probed in parallel"""
+        paths = list(dict.fromkeys(paths))
+        if len(paths) <= 1:
+            return {path: self.get(path) for path in paths}
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="media-probe")
+        return dict(zip(paths, self._executor.map(self.get, paths)))
+
+    def total(self, paths: Iterable[str]) -> Optional[float]:
+        """Summed duration of the files, or None if none of them could be probed"""
+        durations = [seconds for seconds in self.probe_many(paths).values() if seconds is not None]
+        return sum(durations) if durations else None
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "entries": len(self._entries)}
+
+
+duration_prober = DurationProber()
+
+
+def format_duration(seconds: float) -> str:
+    """Length as H:MM:SS, or M:SS under an hour"""
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def format_minutes(seconds: float) -> str:
+    """Read time in the same style as the page-based estimate ("12 min", "1.5 hr")"""
+    minutes = max(1, int(round(seconds / 60)))
+    return f"{minutes} min" if minutes < 60 else f"{minutes / 60:.1f} hr"
@@ -0,0 +1,181 @@
+"""
+Sheet Duplicates Module
+Incremental duplicate index for the master sheet: rows are grouped by normalized
+title/author and by the Epic read ID in their URL, with an optional near-duplicate
+pass for typos
+"""
+
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+from sheet_mirror import SheetSnapshot, SHEETS_MIRROR_TTL_SECONDS
+
+EPIC_READ_ID_PATTERN = re.compile(r'getepic\.com/app/(?:read|book)/(\d+)', re.IGNORECASE)
+
+LEADING_ARTICLE_PATTERN = re.compile(r'^(the|a|an) ')
+
+NUMBER_PATTERN = re.compile(r'\d+')
+
+# Near-duplicate pass: titles in the same block must be at least this similar
+NEAR_DUPLICATE_MIN_RATIO = 0.9
+
+# Blocks bigger than this are skipped in the near-duplicate pass (pairwise cost)
+NEAR_DUPLICATE_MAX_BLOCK = 200
+
+
+def normalize_text(value) -> str:
+    """Lowercase, accent-free, punctuation-free text with single spaces"""
+    text = unicodedata.normalize('NFKD', str(value or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower().replace('&', ' and ')
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    return ' '.join(text.split())
+
+
+def normalize_title(value) -> str:
+    """Title key: normalized text without a leading article ("The Very Hungry..." == "Very Hungry...")"""
+    return LEADING_ARTICLE_PATTERN.sub('', normalize_text(value))
+
+
+def title_author_key(name, author) -> Optional[str]:
+    title = normalize_title(name)
+    return f"{title}|{normalize_text(author)}" if title else None
+
+
+def epic_read_id(url) -> Optional[str]:
+    match = EPIC_READ_ID_PATTERN.search(str(url or ''))
+    return match.group(1) if match else None
+
+
+class DuplicateIndex(SheetSnapshot):
+    """Row index -> (title/author key, Epic ID), plus the reverse maps used to group rows in O(n)"""
+
+    FIELDS = ['Name', 'Author', 'URL', 'Status']
+
+    def __init__(self, ttl_seconds: int = SHEETS_MIRROR_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.rows: Dict[int, Dict] = {}  # row index -> {'Name', 'Author', 'URL'} for live rows
+        self._entries: Dict[int, tuple] = {}  # row index -> (title/author key, epic id)
+        self._by_key: Dict[str, set] = {}
+        self._by_epic: Dict[str, set] = {}
+
+    def load(self, records: List[Dict], remote_modified: Optional[str] = None):
+        with self._lock:
+            self.rows, self._entries, self._by_key, self._by_epic = {}, {}, {}, {}
+            for index, record in enumerate(records):
+                self._add(index, record)
+            self._mark_loaded(remote_modified)
+
+    def add(self, start: int, records: List[Dict]):
+        """Index rows appended at row index start"""
+        with self._lock:
+            for offset, record in enumerate(records):
+                self._add(start + offset, record)
+            self.revision += 1
+
+    def update_row(self, index: int, fields: Dict):
+        """Re-index a row after some of its fields were written"""
+        with self._lock:
+            if not any(field in fields for field in self.FIELDS):
+                return
+            record = {**self.rows.get(index, {}), **fields}
+            self._remove(index)
+            self._add(index, record)
+            self.revision += 1
+
+    def _add(self, index: int, record: Dict):
+        if str(record.get('Status', '')).strip().lower() == 'deleted':
+            return
+        key = title_author_key(record.get('Name'), record.get('Author'))
+        epic_id = epic_read_id(record.get('URL'))
+        self.rows[index] = {field: record.get(field, '') for field in self.FIELDS}
+        self._entries[index] = (key, epic_id)
+        if key:
+            self._by_key.setdefault(key, set()).add(index)
+        if epic_id:
+            self._by_epic.setdefault(epic_id, set()).add(index)
+
+    def _remove(self, index: int):
+        key, epic_id = self._entries.pop(index, (None, None))
+        self.rows.pop(index, None)
+        for mapping, value in ((self._by_key, key), (self._by_epic, epic_id)):
+            if value and value in mapping:
+                mapping[value].discard(index)
+                if not mapping[value]:
+                    del mapping[value]
+
+    def groups(self) -> List[Dict]:
+        """Rows sharing a title/author key or an Epic ID, merged transitively (union-find)"""
+        with self._lock:
+            parent: Dict[int, int] = {}
+
+            def find(i):
+                while parent.setdefault(i, i) != i:
+                    parent[i] = parent[parent[i]]
+                    i = parent[i]
+                return i
+
+            reasons: Dict[int, set] = {}
+            for reason, mapping in (('title_author', self._by_key), ('epic_id', self._by_epic)):
+                for members in mapping.values():
+                    if len(members) < 2:
+                        continue
+                    first, *rest = sorted(members)
+                    for other in rest:
+                        parent[find(other)] = find(first)
+                    for member in members:
+                        reasons.setdefault(member, set()).add(reason)
+
+            grouped: Dict[int, List[int]] = {}
+            for index in parent:
+                grouped.setdefault(find(index), []).append(index)
+
+            return [
+                {
+                    'reasons': sorted(set().union(*(reasons[i] for i in members))),
+                    'rows': [self._row_summary(i) for i in sorted(members)]
+                }
+                for members in sorted(grouped.values(), key=min)
+            ]
+
+    def near_duplicates(self, min_ratio: float = NEAR_DUPLICATE_MIN_RATIO) -> List[Dict]:
+        """
+        Likely typos: pairs with the same author whose titles differ slightly. Rows are
+        blocked by author and title prefix so only plausible pairs are compared.
+        """
+        with self._lock:
+            blocks: Dict[tuple, List[int]] = {}
+            for index, (key, _) in self._entries.items():
+                if not key:
+                    continue
+                title, _, author = key.partition('|')
+                blocks.setdefault((author, title[:2]), []).append(index)
+
+            pairs = []
+            for members in blocks.values():
+                if len(members) < 2 or len(members) > NEAR_DUPLICATE_MAX_BLOCK:
+                    continue
+                members.sort()
+                for position, first in enumerate(members):
+                    first_title = self._entries[first][0].partition('|')[0]
+                    for second in members[position + 1:]:
+                        second_title = self._entries[second][0].partition('|')[0]
+                        if first_title == second_title:
+                            continue  # exact matches are already reported by groups()
+                        if NUMBER_PATTERN.sub('#', first_title) == NUMBER_PATTERN.sub('#', second_title):
+                            continue  # "Book 2" vs "Book 3" is a series, not a typo
+                        matcher = SequenceMatcher(None, first_title, second_title)
+                        # Cheap upper bounds first; ratio() is the expensive part
+                        if matcher.real_quick_ratio() < min_ratio or matcher.quick_ratio() < min_ratio:
+                            continue
+                        ratio = matcher.ratio()
+                        if ratio >= min_ratio:
+                            pairs.append({
+                                'similarity': round(ratio, 3),
+                                'rows': [self._row_summary(first), self._row_summary(second)]
+                            })
+            return sorted(pairs, key=lambda pair: -pair['similarity'])
+
+    def _row_summary(self, index: int) -> Dict:
+        return {'row': index + 2, **self.rows[index], 'epic_id': self._entries[index][1]}
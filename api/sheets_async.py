@@ -0,0 +1,144 @@
+"""
+Async Sheets Module
+Run blocking GoogleSheetsManager calls on a dedicated, bounded thread pool so a
+slow Sheets round trip never stalls the event loop
+"""
+
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from database import SessionLocal
+from sheets_client import cancel_event
+
+# Worker threads reserved for Sheets I/O (separate from the default pool used for files)
+SHEETS_EXECUTOR_WORKERS = int(os.environ.get("SHUSPOT_SHEETS_WORKERS", 4))
+
+# Calls allowed to wait for a worker before new ones are rejected
+SHEETS_MAX_PENDING = int(os.environ.get("SHUSPOT_SHEETS_MAX_PENDING", 32))
+
+# Per-call timeouts: single reads/writes vs. whole-sheet jobs like sync and bulk import
+SHEETS_CALL_TIMEOUT = float(os.environ.get("SHUSPOT_SHEETS_CALL_TIMEOUT", 30))
+SHEETS_JOB_TIMEOUT = float(os.environ.get("SHUSPOT_SHEETS_JOB_TIMEOUT", 900))
+
+
+class SheetsBusy(Exception):
+    """Too many Sheets operations are already queued"""
+
+
+class SheetsExecutor:
+    """Bounded thread pool for Sheets calls with timeouts and cooperative cancellation"""
+
+    def __init__(self, workers: int = SHEETS_EXECUTOR_WORKERS, max_pending: int = SHEETS_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sheets")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self.stats = {"calls": 0, "timeouts": 0, "cancelled": 0, "rejected": 0, "in_flight": 0}
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = SHEETS_CALL_TIMEOUT, **kwargs):
+        """Run fn(*args, **kwargs) on a Sheets worker; raises asyncio.TimeoutError after timeout seconds"""
+        if not self._slots.acquire(blocking=False):
+            self.stats["rejected"] += 1
+            raise SheetsBusy("Too many Google Sheets operations in progress, try again shortly")
+
+        cancelled = threading.Event()
+
+        def invoke():
+            # Each worker thread has its own context, so this only affects this call
+            token = cancel_event.set(cancelled)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                cancel_event.reset(token)
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, invoke)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        # The slot stays taken until the worker really finishes, even if the caller stopped waiting
+        future.add_done_callback(self._finished)
+        self.stats["calls"] += 1
+        self.stats["in_flight"] += 1
+
+        try:
+            # shield: on timeout the worker keeps going only until its next API call sees the event
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            cancelled.set()
+            raise
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            cancelled.set()
+            raise
+
+    def _finished(self, future):
+        self._slots.release()
+        self.stats["in_flight"] -= 1
+        if not future.cancelled():
+            future.exception()  # abandoned calls may fail later; mark the error as retrieved
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "workers": self.workers, "max_pending": self.max_pending}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncSheetsManager:
+    """Awaitable versions of the GoogleSheetsManager operations used by the API"""
+
+    def __init__(self, manager, executor: SheetsExecutor):
+        self.manager = manager
+        self.executor = executor
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = SHEETS_CALL_TIMEOUT, **kwargs):
+        return await self.executor.run(fn, *args, timeout=timeout, **kwargs)
+
+    async def connect(self) -> bool:
+        return await self.run(self.manager.connect)
+
+    async def get_all_books(self, force_refresh: bool = False) -> List[Dict]:
+        return await self.run(self.manager.get_all_books, force_refresh)
+
+    async def get_books_page(self, offset: int = 0, limit: int = 100, force_refresh: bool = False) -> Dict:
+        return await self.run(self.manager.get_books_page, offset, limit, force_refresh)
+
+    async def add_book(self, book_data: Dict) -> bool:
+        return await self.run(self.manager.add_book, book_data)
+
+    async def update_book(self, book_id: int, updates: Dict) -> bool:
+        return await self.run(self.manager.update_book, book_id, updates)
+
+    async def bulk_add_books(self, books_data: List[Dict]) -> Dict:
+        return await self.run(self.manager.bulk_add_books, books_data, timeout=SHEETS_JOB_TIMEOUT)
+
+    async def get_duplicates(self) -> List[Dict]:
+        return await self.run(self.manager.get_duplicates)
+
+    async def find_duplicates(self, include_near: bool = False) -> Dict:
+        return await self.run(self.manager.find_duplicates, include_near)
+
+    async def run_job(self, fn: Callable, *args, **kwargs):
+        """Long-running work that talks to Sheets (DB sync, folder ingestion)"""
+        return await self.run(fn, *args, timeout=SHEETS_JOB_TIMEOUT, **kwargs)
+
+    async def run_db_job(self, fn: Callable, *args, **kwargs):
+        """
+        run_job for work that also uses the database: fn(db, *args, **kwargs) gets a session opened
+        and closed on the worker thread. The request's session can't be used there, since it is
+        closed when the handler stops waiting while the worker may still be running.
+        """
+        def with_session():
+            db = SessionLocal()
+            try:
+                return fn(db, *args, **kwargs)
+            finally:
+                db.close()
+
+        return await self.run_job(with_session)
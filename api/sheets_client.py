@@ -0,0 +1,218 @@
+"""
+Sheets Client Module
+Rate limiting, retry with backoff and request counters for every Google Sheets API call
+"""
+
+import os
+import time
+import random
+import threading
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+import requests
+from gspread.exceptions import APIError
+
+# Sheets allows 60 read and 60 write requests per minute per user; the service account is one user
+SHEETS_READS_PER_MINUTE = int(os.environ.get("SHUSPOT_SHEETS_READS_PER_MINUTE", 60))
+SHEETS_WRITES_PER_MINUTE = int(os.environ.get("SHUSPOT_SHEETS_WRITES_PER_MINUTE", 60))
+
+# Truncated exponential backoff, as recommended for the Sheets API
+SHEETS_MAX_RETRIES = int(os.environ.get("SHUSPOT_SHEETS_MAX_RETRIES", 5))
+SHEETS_BACKOFF_BASE_SECONDS = 1.0
+SHEETS_BACKOFF_MAX_SECONDS = 32.0
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Methods that only read; everything else is charged to the write quota
+READ_METHODS = {
+    "get_all_records", "get_all_values", "get_values", "get", "batch_get", "row_values",
+    "col_values", "acell", "cell", "find", "findall", "get_lastUpdateTime", "fetch_sheet_metadata",
+    "worksheet", "worksheets", "open", "open_by_key", "sheet1",
+}
+
+# Appends aren't idempotent: a 5xx may still have written the rows, so only quota errors are retried
+NON_IDEMPOTENT_METHODS = {"append_row", "append_rows", "insert_row", "insert_rows", "add_worksheet"}
+
+# Set by the async facade for the call running on the current worker thread; once the
+# awaiting request times out or is cancelled no further API requests are started
+cancel_event: ContextVar[Optional[threading.Event]] = ContextVar("sheets_cancel_event", default=None)
+
+
+class SheetsCallCancelled(Exception):
+    """The caller gave up on this Sheets operation before it finished"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request is allowed"""
+
+    def __init__(self, per_minute: int, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.per_minute = per_minute
+        self.capacity = float(max(per_minute, 1))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    def acquire(self) -> float:
+        """Take one token, sleeping as needed; returns the seconds spent waiting"""
+        if not self.enabled:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) * 60.0 / self.per_minute
+            self.sleep(delay)
+            waited += delay
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status behind a gspread/requests error, if there is one"""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class SheetsApiClient:
+    """Runs Sheets calls through per-quota token buckets, retries transient failures and counts requests"""
+
+    def __init__(self, reads_per_minute: int = SHEETS_READS_PER_MINUTE,
+                 writes_per_minute: int = SHEETS_WRITES_PER_MINUTE,
+                 max_retries: int = SHEETS_MAX_RETRIES,
+                 backoff_base: float = SHEETS_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = SHEETS_BACKOFF_MAX_SECONDS,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.read_bucket = TokenBucket(reads_per_minute, sleep=sleep)
+        self.write_bucket = TokenBucket(writes_per_minute, sleep=sleep)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0, "reads": 0, "writes": 0, "retries": 0, "failures": 0,
+            "rate_limited": 0, "server_errors": 0, "throttled_seconds": 0.0, "backoff_seconds": 0.0,
+        }
+        self.by_method: Dict[str, Dict[str, int]] = {}
+
+    def backoff_delay(self, attempt: int) -> float:
+        """2^attempt seconds (scaled by the base) plus up to a second of jitter, capped"""
+        return min(self.backoff_base * (2 ** attempt) + random.uniform(0, 1), self.backoff_max)
+
+    def is_retryable(self, method: str, error: Exception) -> bool:
+        if isinstance(error, APIError):
+            status = error_status(error)
+            if method in NON_IDEMPOTENT_METHODS:
+                return status == 429
+            return status in RETRYABLE_STATUS_CODES
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return method not in NON_IDEMPOTENT_METHODS
+        return False
+
+    def call(self, method: str, fn: Callable, *args, **kwargs):
+        """Call fn(*args, **kwargs) under the quota for method, retrying transient errors"""
+        is_read = method in READ_METHODS
+        bucket = self.read_bucket if is_read else self.write_bucket
+
+        cancelled = cancel_event.get()
+        attempt = 0
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                raise SheetsCallCancelled(f"Sheets {method} cancelled")
+            waited = bucket.acquire()
+            self._count(method, "reads" if is_read else "writes", waited)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status = error_status(e)
+                with self._lock:
+                    if status == 429:
+                        self.stats["rate_limited"] += 1
+                    elif status is not None and status >= 500:
+                        self.stats["server_errors"] += 1
+
+                if attempt >= self.max_retries or not self.is_retryable(method, e):
+                    with self._lock:
+                        self.stats["failures"] += 1
+                        self.by_method[method]["failures"] += 1
+                    raise
+
+                delay = retry_after_seconds(e) or self.backoff_delay(attempt)
+                with self._lock:
+                    self.stats["retries"] += 1
+                    self.stats["backoff_seconds"] += delay
+                    self.by_method[method]["retries"] += 1
+                print(f"Sheets {method} failed ({status or type(e).__name__}), retrying in {delay:.1f}s")
+                if cancelled is not None:
+                    cancelled.wait(delay)
+                else:
+                    self.sleep(delay)
+                attempt += 1
+
+    def _count(self, method: str, kind: str, waited: float):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[kind] += 1
+            self.stats["throttled_seconds"] += waited
+            counters = self.by_method.setdefault(method, {"requests": 0, "retries": 0, "failures": 0})
+            counters["requests"] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "throttled_seconds": round(self.stats["throttled_seconds"], 3),
+                "backoff_seconds": round(self.stats["backoff_seconds"], 3),
+                "reads_per_minute": self.read_bucket.per_minute,
+                "writes_per_minute": self.write_bucket.per_minute,
+                "by_method": {name: dict(counters) for name, counters in self.by_method.items()},
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0.0 if isinstance(self.stats[key], float) else 0
+            self.by_method.clear()
+
+
+class ThrottledProxy:
+    """Wraps a gspread Spreadsheet/Worksheet so every method call goes through SheetsApiClient.call"""
+
+    def __init__(self, target, api: SheetsApiClient):
+        self._target = target
+        self._api = api
+
+    @property
+    def unwrapped(self):
+        return self._target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def throttled(*args, **kwargs):
+            return self._api.call(name, attr, *args, **kwargs)
+
+        return throttled
@@ -6,6 +6,8 @@ from pathlib import Path
 import mimetypes
 from datetime import datetime
 
+from media_duration import duration_prober, format_duration, format_minutes
+
 class ShuSpotFolderParser:
     """
     Custom parser for ShuSpot folder structure:
@@ -277,6 +279,20 @@ class ShuSpotFolderParser:
         file_counts = self._count_media_files(book_path)
         book_data.update(file_counts)
         
+        # Real audio/video lengths, read from the media file headers
+        files = book_data['_files']
+        audio_seconds = duration_prober.total(str(book_path / name) for name in files['audio'])
+        video_seconds = duration_prober.total(str(book_path / name) for name in files['video'])
+        if audio_seconds and not book_data.get('Audiobook Length'):
+            book_data['Audiobook Length'] = format_duration(audio_seconds)
+        if video_seconds and not book_data.get('Video Length'):
+            book_data['Video Length'] = format_duration(video_seconds)
+        
+        if not book_data.get('Read time'):
+            read_time = self._estimate_time(book_path, media_type, file_counts, audio_seconds, video_seconds)
+            if read_time:
+                book_data['Read time'] = read_time
+        
         return book_data
 
     def _clean_author_name(self, author_name: str) -> str:
@@ -552,19 +568,21 @@ class ShuSpotFolderParser:
         
         return counts
     
-    def _estimate_time(self, book_path: Path, media_type: str, file_counts: Dict) -> Optional[str]:
+    def _estimate_time(self, book_path: Path, media_type: str, file_counts: Dict,
+                       audio_seconds: Optional[float] = None, video_seconds: Optional[float] = None) -> Optional[str]:
         """Estimate reading/viewing time based on content"""
         try:
-            if media_type == 'Video Book':
-                # For video books, try to get actual video duration
-                video_files = list(book_path.glob('*.mp4'))
-                if video_files:
-                    # This would require ffmpeg or similar to get actual duration
-                    # For now, return a placeholder
-                    return "5-10 mins"
+            if media_type in ('Video Book', 'Video'):
+                # Running time of the video files, from their headers
+                if video_seconds:
+                    return format_minutes(video_seconds)
             
-            elif media_type == 'Read to Me':
-                # Estimate based on number of pages/audio files
+            elif media_type in ('Read to Me', 'Audiobook'):
+                # Narration length when the audio headers could be read
+                if audio_seconds:
+                    return format_minutes(audio_seconds)
+                
+                # Otherwise estimate based on number of pages/audio files
                 audio_count = file_counts.get('_audio_file_count', 0)
                 page_count = int(file_counts.get('Pages', '0'))
                 
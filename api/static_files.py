@@ -0,0 +1,174 @@
+"""
+Static Files Module
+StaticFiles handler for the ShuSpot image folders, with a debug mode that logs every
+lookup and a production mode that resolves paths once and answers conditional requests
+"""
+
+import os
+import stat
+from mimetypes import guess_type
+from email.utils import formatdate, parsedate
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import FileResponse, Response
+
+from image_derivatives import source_version
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+# Upper bound on remembered path resolutions (cleared wholesale when reached)
+PATH_CACHE_MAX_ENTRIES = 50000
+
+
+def normalize_request_path(path: str) -> str:
+    """Decode and clean a request path the same way in both serving modes"""
+    decoded_path = unquote(path)
+
+    # Replace backslashes with forward slashes for consistency
+    decoded_path = decoded_path.replace('\\', '/')
+
+    # Clean up double slashes
+    while '//' in decoded_path:
+        decoded_path = decoded_path.replace('//', '/')
+
+    # Remove any leading slash
+    return decoded_path.lstrip('/')
+
+
+def resolve_static_path(root: str, path: str) -> Optional[str]:
+    """
+    Real path of a request path under root (itself a real path), or None if it escapes root.
+    Page cache entries are keyed by this path, so code that prewarms the cache resolves through here too.
+    """
+    full_path = os.path.realpath(os.path.join(root, normalize_request_path(path)))
+    # Don't allow misbehaving clients to break out of the static files directory
+    if os.path.commonpath([root, full_path]) != root:
+        return None
+    return full_path
+
+
+def strong_etag(stat_result: os.stat_result) -> str:
+    """Strong validator derived from size and nanosecond mtime"""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def is_not_modified(request_headers: Headers, etag: str, stat_result: os.stat_result) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since"""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        parsed = parsedate(if_modified_since)
+        last_modified = parsedate(formatdate(stat_result.st_mtime, usegmt=True))
+        return parsed is not None and parsed >= last_modified
+
+    return False
+
+
+# Create a custom static files handler that handles multiple folders and spaces in filenames
+class CustomStaticFiles(StaticFiles):
+    def __init__(self, *args, production: bool = False, page_cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.production = production
+        self.page_cache = page_cache  # Optional PageByteCache used in production mode
+        self._path_cache: Dict[str, str] = {}  # request path -> resolved absolute file path
+        self._root = os.path.realpath(str(self.directory))
+
+    async def get_response(self, path: str, scope):
+        if self.production:
+            response = await self._fast_response(path, scope)
+            if response is not None:
+                return response
+            return await super().get_response(normalize_request_path(path), scope)
+
+        return await self._debug_response(path, scope)
+
+    async def _debug_response(self, path: str, scope):
+        """Original verbose handler, useful when a page image fails to load"""
+        try:
+            # First try with URL-decoded path (handle spaces and special characters)
+            decoded_path = normalize_request_path(path)
+            print(f"[StaticFiles] Requested path: {path}")
+            print(f"[StaticFiles] Decoded path: {decoded_path}")
+            print(f"[StaticFiles] Full directory: {self.directory}")
+
+            # Build the full path using os.path.join for platform-specific path handling
+            full_path = os.path.join(str(self.directory), decoded_path)
+            print(f"[StaticFiles] Full file path: {full_path}")
+            print(f"[StaticFiles] File exists: {os.path.exists(full_path)}")
+
+            if not os.path.exists(full_path):
+                print(f"[StaticFiles] Looking for file in folder: {os.listdir(os.path.dirname(full_path))}")
+
+            response = await super().get_response(decoded_path, scope)
+            print(f"[StaticFiles] Response status: {response.status_code}")
+            return response
+        except Exception as e:
+            print(f"[StaticFiles] Error serving {path}: {str(e)}")
+            raise
+
+    def _resolve(self, path: str) -> Optional[Tuple[str, os.stat_result]]:
+        """Resolve a request path to (file path, stat), remembering successful resolutions"""
+        full_path = self._path_cache.get(path)
+        if full_path is None:
+            full_path = resolve_static_path(self._root, path)
+            if full_path is None:
+                return None
+
+        try:
+            stat_result = os.stat(full_path)
+        except OSError:
+            self._path_cache.pop(path, None)
+            return None
+
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+
+        if path not in self._path_cache:
+            if len(self._path_cache) >= PATH_CACHE_MAX_ENTRIES:
+                self._path_cache.clear()
+            self._path_cache[path] = full_path
+
+        return full_path, stat_result
+
+    async def _fast_response(self, path: str, scope) -> Optional[Response]:
+        """Serve a regular file without directory listings or thread hops; None defers to StaticFiles"""
+        if scope["method"] not in ("GET", "HEAD"):
+            return None
+
+        resolved = self._resolve(path)
+        if resolved is None:
+            return None
+
+        full_path, stat_result = resolved
+        etag = strong_etag(stat_result)
+        last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        # Only a URL carrying the file's current version (as book manifests write them) names
+        # fixed bytes; anything else may be replaced in place
+        versioned = QueryParams(scope.get("query_string", b"")).get("v") == source_version(stat_result)
+        cache_control = IMMUTABLE_CACHE_CONTROL if versioned else DEFAULT_CACHE_CONTROL
+        headers = {
+            "etag": etag,
+            "last-modified": last_modified,
+            "cache-control": cache_control,
+        }
+
+        if is_not_modified(Headers(scope=scope), etag, stat_result):
+            return Response(status_code=304, headers=headers)
+
+        if scope["method"] == "GET" and self.page_cache is not None and self.page_cache.cacheable(stat_result):
+            data = self.page_cache.get(full_path, stat_result)
+            if data is None:
+                data = await anyio.to_thread.run_sync(self.page_cache.load, full_path)
+            if data is not None:
+                return Response(content=data, headers=headers, media_type=guess_type(full_path)[0] or "text/plain")
+
+        return FileResponse(full_path, headers=headers, stat_result=stat_result, method=scope["method"])
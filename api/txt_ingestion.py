@@ -1,10 +1,52 @@
 import os
 import re
 import json
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 import logging
 
+from media_duration import duration_prober, format_duration, format_minutes
+
+# Worker threads parsing book folders in batch_parse_folders / ingestion
+TXT_PARSE_WORKERS = int(os.environ.get("SHUSPOT_TXT_PARSE_WORKERS", 8))
+
+# Parsed folders converted and sent to the sheet per bulk_add_books call during ingestion
+TXT_INGEST_BATCH_SIZE = 500
+
+# Labels recognised at the start of a line in free-form text, with the field they fill and
+# their precedence (lower wins; ties go to the earlier line)
+STRUCTURED_LABELS = {
+    'title': ('title', 0),
+    'book title': ('title', 0),
+    'author': ('author', 0),
+    'by': ('author', 1),
+    'written by': ('author', 1),
+    'description': ('description', 0),
+    'summary': ('description', 1),
+    'about': ('description', 2),
+}
+
+STRUCTURED_LABEL_PATTERN = re.compile(
+    r'(book title|title|written by|author|by|description|summary|about)(?:[:\s]+|$)(.*)', re.IGNORECASE
+)
+
+ISBN_PATTERN = re.compile(r'isbn[:\s]*(\d{13}|\d{10}|\d{1,5}-\d{1,7}-\d{1,7}-\d{1,7}-[\dX]|\d{1,5}-\d{1,7}-\d{1,7}-[\dX])',
+                          re.IGNORECASE)
+
+YEAR_PATTERN = re.compile(r'(?:published|year)[:\s]*(\d{4})', re.IGNORECASE)
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.wav', '.aac')
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
+
+# A folder is a book folder when it holds at least one of these
+BOOK_FOLDER_EXTENSIONS = ('.txt', '.pdf', '.mp3', '.m4a', '.wav', '.aac', '.mp4', '.mov', '.avi', '.mkv', '.webm',
+                          '.epub', '.mobi', '.docx', '.doc')
+
 class TxtMetadataParser:
     """Parse metadata from .txt files in book folders"""
     
@@ -27,6 +69,12 @@ class TxtMetadataParser:
             'format': ['format', 'type', 'media type'],
             'notes': ['notes', 'comments', 'additional info']
         }
+        
+        # Alias -> standard field; an alias listed twice ('type') belongs to the first field
+        self.field_aliases: Dict[str, str] = {}
+        for standard_field, variations in self.field_mappings.items():
+            for alias in variations:
+                self.field_aliases.setdefault(alias, standard_field)
     
     def parse_txt_file(self, txt_path: str) -> Dict:
         """Parse a single .txt file and extract metadata"""
@@ -41,99 +89,114 @@ class TxtMetadataParser:
             self.logger.error(f"Error reading {txt_path}: {e}")
             return {}
         
-        metadata = {}
-        
-        # Try different parsing strategies
-        metadata.update(self._parse_key_value_pairs(content))
-        metadata.update(self._parse_structured_text(content))
-        metadata.update(self._parse_json_like(content))
-        
         # Clean and normalize the data
-        metadata = self._normalize_metadata(metadata)
-        
-        return metadata
+        return self._normalize_metadata(self.tokenize(content))
     
-    def _parse_key_value_pairs(self, content: str) -> Dict:
-        """Parse key: value pairs from text"""
-        metadata = {}
-        
-        # Look for patterns like "Title: Book Name" or "Author: Author Name"
-        lines = content.split('\n')
-        
-        for line in lines:
-            line = line.strip()
+    def tokenize(self, content: str) -> Dict:
+        """
+        Raw metadata from one pass over the lines of a file. Each line feeds every strategy:
+        "Key: value" pairs (last one wins), labelled free text such as "Title ..." or "By ..."
+        (first one wins, overrides key/value pairs), and JSON objects decoded in place
+        (override both). Without a labelled title, the first plain line is the title.
+        """
+        pairs: Dict[str, str] = {}
+        structured: Dict[str, tuple] = {}  # field -> (precedence, value)
+        found: Dict[str, str] = {}  # ISBN / year
+        objects: Dict = {}
+        first_line = None
+        pending = None  # (field, precedence) of a label whose value is on the next line
+        
+        decoder = json.JSONDecoder()
+        position, length = 0, len(content)
+        
+        while position < length:
+            line_end = content.find('\n', position)
+            if line_end == -1:
+                line_end = length
+            raw_line = content[position:line_end]
+            next_position = line_end + 1
+            line = raw_line.strip()
+            
+            if not line:
+                position = next_position
+                continue
+            
+            # JSON objects are decoded where they start, and the lines they span are skipped
+            if '{' in raw_line:
+                decoded_end = self._decode_objects(decoder, content, position + raw_line.index('{'), line_end, objects)
+                if decoded_end is not None:
+                    position = content.find('\n', decoded_end)
+                    position = length if position == -1 else position + 1
+                    continue
+            
+            if pending:
+                field, precedence = pending
+                pending = None
+                if field not in structured or structured[field][0] > precedence:
+                    structured[field] = (precedence, line)
+            
+            key = None
             if ':' in line:
-                parts = line.split(':', 1)
-                if len(parts) == 2:
-                    key = parts[0].strip().lower()
-                    value = parts[1].strip()
-                    
-                    # Map to standard fields
-                    for standard_field, variations in self.field_mappings.items():
-                        if key in variations:
-                            metadata[standard_field] = value
-                            break
-                    else:
-                        # Store unmapped fields as-is
-                        metadata[key] = value
-        
-        return metadata
-    
-    def _parse_structured_text(self, content: str) -> Dict:
-        """Parse structured text blocks"""
-        metadata = {}
-        
-        # Look for common patterns
-        patterns = {
-            'title': [
-                r'title[:\s]+(.+?)(?:\n|$)',
-                r'book title[:\s]+(.+?)(?:\n|$)',
-                r'^(.+?)(?:\n|\r\n)',  # First line as title
-            ],
-            'author': [
-                r'author[:\s]+(.+?)(?:\n|$)',
-                r'by[:\s]+(.+?)(?:\n|$)',
-                r'written by[:\s]+(.+?)(?:\n|$)',
-            ],
-            'description': [
-                r'description[:\s]+(.+?)(?:\n\n|\r\n\r\n|$)',
-                r'summary[:\s]+(.+?)(?:\n\n|\r\n\r\n|$)',
-                r'about[:\s]+(.+?)(?:\n\n|\r\n\r\n|$)',
-            ],
-            'isbn': [
-                r'isbn[:\s]*(\d{10}|\d{13}|\d{1,5}-\d{1,7}-\d{1,7}-[\dX])',
-            ],
-            'year': [
-                r'(?:published|year)[:\s]*(\d{4})',
-            ]
-        }
+                key, value = line.split(':', 1)
+                key = key.strip().lower()
+                pairs[self.field_aliases.get(key, key)] = value.strip()
+            
+            match = STRUCTURED_LABEL_PATTERN.match(line)
+            if match:
+                field, precedence = STRUCTURED_LABELS[match.group(1).lower()]
+                value = match.group(2).strip()
+                if not value:
+                    pending = (field, precedence)
+                elif field not in structured or structured[field][0] > precedence:
+                    structured[field] = (precedence, value)
+            elif first_line is None and key not in self.field_aliases:
+                first_line = line
+            
+            lowered = line.lower()
+            if 'isbn' not in found and 'isbn' in lowered:
+                isbn = ISBN_PATTERN.search(line)
+                if isbn:
+                    found['isbn'] = isbn.group(1)
+            if 'year' not in found and ('year' in lowered or 'published' in lowered):
+                year = YEAR_PATTERN.search(line)
+                if year:
+                    found['year'] = year.group(1)
+            
+            position = next_position
         
-        for field, field_patterns in patterns.items():
-            for pattern in field_patterns:
-                match = re.search(pattern, content, re.IGNORECASE | re.MULTILINE | re.DOTALL)
-                if match:
-                    metadata[field] = match.group(1).strip()
-                    break
+        if 'title' not in structured and first_line is not None:
+            structured['title'] = (2, first_line)
         
+        metadata = dict(pairs)
+        metadata.update({field: value for field, (_, value) in structured.items()})
+        metadata.update(found)
+        metadata.update(objects)
         return metadata
     
-    def _parse_json_like(self, content: str) -> Dict:
-        """Try to parse JSON-like structures"""
-        metadata = {}
-        
-        # Look for JSON blocks
-        json_pattern = r'\{[^{}]*\}'
-        matches = re.findall(json_pattern, content, re.DOTALL)
-        
-        for match in matches:
+    def _decode_objects(self, decoder: json.JSONDecoder, content: str, start: int, line_end: int,
+                        objects: Dict) -> Optional[int]:
+        """Decode the JSON objects starting on this line into objects; returns where the last one ended"""
+        decoded_end = None
+        brace = start
+        while brace != -1 and brace < line_end:
             try:
-                data = json.loads(match)
-                if isinstance(data, dict):
-                    metadata.update(data)
+                value, end = decoder.raw_decode(content, brace)
             except json.JSONDecodeError:
+                brace = content.find('{', brace + 1, line_end)
                 continue
-        
-        return metadata
+            if isinstance(value, dict):
+                self._merge_flat_objects(value, objects)
+            decoded_end = end
+            brace = content.find('{', end, line_end)
+        return decoded_end
+    
+    def _merge_flat_objects(self, value: Dict, objects: Dict):
+        """Merge objects without nested objects; a nested object contributes its inner objects only"""
+        nested = [item for item in value.values() if isinstance(item, dict)]
+        if not nested:
+            objects.update(value)
+        for item in nested:
+            self._merge_flat_objects(item, objects)
     
     def _normalize_metadata(self, metadata: Dict) -> Dict:
         """Clean and normalize metadata"""
@@ -144,40 +207,31 @@ class TxtMetadataParser:
                 continue
             
             # Clean the value
-            value = value.strip()
-            value = re.sub(r'\s+', ' ', value)  # Normalize whitespace
+            value = WHITESPACE_PATTERN.sub(' ', value.strip())  # Normalize whitespace
             
             # Skip empty values
             if not value:
                 continue
             
-            # Normalize key
-            key = key.lower().strip()
-            
             # Map to standard fields
-            mapped = False
-            for standard_field, variations in self.field_mappings.items():
-                if key in variations:
-                    normalized[standard_field] = value
-                    mapped = True
-                    break
-            
-            if not mapped:
-                normalized[key] = value
+            key = key.lower().strip()
+            normalized[self.field_aliases.get(key, key)] = value
         
         return normalized
     
-    def parse_folder(self, folder_path: str) -> Dict:
-        """Parse all .txt files in a folder and combine metadata"""
+    def parse_folder(self, folder_path: str, files: Optional[List[str]] = None) -> Dict:
+        """Parse all .txt files in a folder and combine metadata (files: the folder's file names, if already listed)"""
         
-        if not os.path.exists(folder_path):
-            return {}
+        if files is None:
+            if not os.path.exists(folder_path):
+                return {}
+            files = os.listdir(folder_path)
         
         combined_metadata = {}
         txt_files = []
         
         # Find all .txt files
-        for file in os.listdir(folder_path):
+        for file in sorted(files):
             if file.lower().endswith('.txt'):
                 txt_files.append(os.path.join(folder_path, file))
         
@@ -204,49 +258,104 @@ class TxtMetadataParser:
         
         return combined_metadata
     
-    def batch_parse_folders(self, root_directory: str, max_folders: int = 1000) -> List[Dict]:
+    def batch_parse_folders(self, root_directory: str, max_folders: int = 1000,
+                            workers: int = TXT_PARSE_WORKERS) -> List[Dict]:
         """Parse metadata from multiple book folders"""
+        return list(self.iter_parsed_folders(root_directory, max_folders, workers))
+    
+    def iter_parsed_folders(self, root_directory: str, max_folders: int = 1000,
+                            workers: int = TXT_PARSE_WORKERS) -> Iterator[Dict]:
+        """
+        Metadata of every book folder under root_directory (at any depth), parsed on a pool of
+        workers and yielded in walk order. Only a few folders per worker are in flight at a time,
+        so memory doesn't grow with the size of the tree.
+        """
         
         if not os.path.exists(root_directory):
             self.logger.error(f"Directory not found: {root_directory}")
-            return []
+            return
         
-        results = []
         processed = 0
+        found = 0
+        in_flight = deque()
         
-        for item in os.listdir(root_directory):
-            if processed >= max_folders:
-                break
-            
-            item_path = os.path.join(root_directory, item)
-            
-            if os.path.isdir(item_path):
-                self.logger.info(f"Processing folder: {item}")
-                
-                metadata = self.parse_folder(item_path)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="txt-parse") as executor:
+            for folder_path, files in islice(self.walk_book_folders(root_directory), max_folders):
+                in_flight.append(executor.submit(self._parse_listed_folder, folder_path, files))
+                processed += 1
                 
+                if len(in_flight) >= workers * 4:
+                    metadata = in_flight.popleft().result()
+                    if metadata:
+                        found += 1
+                        yield metadata
+            
+            while in_flight:
+                metadata = in_flight.popleft().result()
                 if metadata:
-                    # Add folder path for reference
-                    metadata['folder_path'] = item_path
-                    metadata['folder_name'] = item
-                    
-                    # Detect file types in folder
-                    file_types = self._detect_file_types(item_path)
-                    metadata['available_formats'] = file_types
-                    
-                    results.append(metadata)
-                
-                processed += 1
+                    found += 1
+                    yield metadata
         
-        self.logger.info(f"Processed {processed} folders, found {len(results)} with metadata")
-        return results
+        self.logger.info(f"Processed {processed} folders, found {found} with metadata")
     
-    def _detect_file_types(self, folder_path: str) -> List[str]:
+    def walk_book_folders(self, root_directory: str) -> Iterator[Tuple[str, List[str]]]:
+        """
+        (folder path, file names) for every folder below root_directory that holds book files.
+        Each directory is listed exactly once with os.scandir; symlinked and hidden folders are skipped.
+        """
+        
+        stack = [(root_directory, 0)]
+        while stack:
+            folder_path, depth = stack.pop()
+            files, subfolders = [], []
+            
+            try:
+                with os.scandir(folder_path) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            subfolders.append(entry.name)
+                        elif entry.is_file():
+                            files.append(entry.name)
+            except OSError as e:
+                self.logger.error(f"Error listing {folder_path}: {e}")
+                continue
+            
+            if depth > 0 and any(name.lower().endswith(BOOK_FOLDER_EXTENSIONS) for name in files):
+                yield folder_path, sorted(files)
+            
+            # Reversed so folders come off the stack in name order
+            for name in sorted(subfolders, reverse=True):
+                stack.append((os.path.join(folder_path, name), depth + 1))
+    
+    def _parse_listed_folder(self, folder_path: str, files: List[str]) -> Optional[Dict]:
+        """parse_folder plus the folder details batch parsing adds, from one directory listing"""
+        try:
+            self.logger.info(f"Processing folder: {folder_path}")
+            metadata = self.parse_folder(folder_path, files)
+            
+            if metadata:
+                # Add folder path for reference
+                metadata['folder_path'] = folder_path
+                metadata['folder_name'] = os.path.basename(folder_path)
+                
+                # Detect file types in folder
+                metadata['available_formats'] = self._detect_file_types(folder_path, files)
+                metadata['files'] = files
+            
+            return metadata
+            
+        except Exception as e:
+            self.logger.error(f"Error parsing folder {folder_path}: {e}")
+            return None
+    
+    def _detect_file_types(self, folder_path: str, files: Optional[List[str]] = None) -> List[str]:
         """Detect what file types are available in the folder"""
         
         formats = []
         
-        for file in os.listdir(folder_path):
+        for file in (os.listdir(folder_path) if files is None else files):
             file_lower = file.lower()
             
             if file_lower.endswith(('.pdf')):
@@ -262,10 +371,18 @@ class TxtMetadataParser:
         
         return list(set(formats))  # Remove duplicates
     
-    def export_to_google_sheets_format(self, metadata_list: List[Dict]) -> List[Dict]:
+    def export_to_google_sheets_format(self, metadata_list: Iterable[Dict]) -> List[Dict]:
         """Convert parsed metadata to ShuSpot Google Sheets format"""
         
         sheets_data = []
+        metadata_list = list(metadata_list)
+        
+        # Probe every audio/video file of the batch in parallel up front; the rows below hit the cache
+        duration_prober.probe_many(
+            path for metadata in metadata_list
+            for path in self._media_paths(metadata.get('folder_path', ''), metadata.get('files'),
+                                          AUDIO_EXTENSIONS + VIDEO_EXTENSIONS)
+        )
         
         for metadata in metadata_list:
             # Determine media type based on available formats
@@ -279,21 +396,33 @@ class TxtMetadataParser:
             else:
                 media_type = 'Book'
             
+            # File names listed during the walk, so the folder isn't read again
+            folder_path = metadata.get('folder_path', '')
+            files = metadata.get('files')
+            
+            # Real running time for audio and video books, the page estimate otherwise
+            read_time = self._estimate_read_time(metadata)
+            if media_type in ('Audio', 'Video'):
+                seconds = self._media_seconds(folder_path, files,
+                                              VIDEO_EXTENSIONS if media_type == 'Video' else AUDIO_EXTENSIONS)
+                if seconds:
+                    read_time = format_minutes(seconds)
+            
             # Map to ShuSpot Google Sheets schema
             sheets_row = {
                 'Name': metadata.get('title', ''),
                 'Category': metadata.get('genre', ''),
                 'Media': media_type,
-                'URL': self._find_file_path(metadata.get('folder_path', ''), ['.pdf', '.mp3', '.mp4']),
+                'URL': self._find_file_path(folder_path, ['.pdf', '.mp3', '.mp4'], files),
                 'Author': metadata.get('author', ''),
                 'Age': self._extract_age_from_reading_level(metadata.get('reading_level', '')),
-                'Read time': self._estimate_read_time(metadata),
+                'Read time': read_time,
                 'AR Level': metadata.get('ar_level', ''),
                 'Lexile': metadata.get('lexile', ''),
                 'GRL': metadata.get('grl', ''),
                 'Pages': metadata.get('pages', ''),
-                'Audiobook Length': self._get_audio_length(metadata.get('folder_path', '')),
-                'Video Length': self._get_video_length(metadata.get('folder_path', '')),
+                'Audiobook Length': self._get_audio_length(folder_path, files),
+                'Video Length': self._get_video_length(folder_path, files),
                 'Status': 'Active',
                 'Notes': metadata.get('notes', '')
             }
@@ -331,35 +460,35 @@ class TxtMetadataParser:
                 pass
         return ''
     
-    def _get_audio_length(self, folder_path: str) -> str:
+    def _media_paths(self, folder_path: str, files: Optional[List[str]], extensions: tuple) -> List[str]:
+        """Paths of the folder's files with one of the extensions"""
+        if not folder_path:
+            return []
+        if files is None:
+            if not os.path.exists(folder_path):
+                return []
+            files = os.listdir(folder_path)
+        return [os.path.join(folder_path, file) for file in files if file.lower().endswith(extensions)]
+    
+    def _media_seconds(self, folder_path: str, files: Optional[List[str]], extensions: tuple) -> Optional[float]:
+        """Total duration of the folder's media files, read from their headers"""
+        return duration_prober.total(self._media_paths(folder_path, files, extensions))
+    
+    def _get_audio_length(self, folder_path: str, files: Optional[List[str]] = None) -> str:
         """Get audio file duration if available"""
-        if not folder_path or not os.path.exists(folder_path):
-            return ''
-        
-        audio_files = []
-        for file in os.listdir(folder_path):
-            if file.lower().endswith(('.mp3', '.m4a', '.wav', '.aac')):
-                audio_files.append(file)
-        
-        if audio_files:
-            # For now, return placeholder - could integrate with mutagen for actual duration
-            return 'TBD'
-        return ''
+        return self._format_length(folder_path, files, AUDIO_EXTENSIONS)
     
-    def _get_video_length(self, folder_path: str) -> str:
+    def _get_video_length(self, folder_path: str, files: Optional[List[str]] = None) -> str:
         """Get video file duration if available"""
-        if not folder_path or not os.path.exists(folder_path):
+        return self._format_length(folder_path, files, VIDEO_EXTENSIONS)
+    
+    def _format_length(self, folder_path: str, files: Optional[List[str]], extensions: tuple) -> str:
+        if not self._media_paths(folder_path, files, extensions):
             return ''
         
-        video_files = []
-        for file in os.listdir(folder_path):
-            if file.lower().endswith(('.mp4', '.mov', '.avi', '.mkv')):
-                video_files.append(file)
-        
-        if video_files:
-            # For now, return placeholder - could integrate with ffmpeg for actual duration
-            return 'TBD'
-        return ''
+        # AVI/MKV/AAC headers aren't read; those stay 'TBD'
+        seconds = self._media_seconds(folder_path, files, extensions)
+        return format_duration(seconds) if seconds else 'TBD'
     
     def _determine_book_type(self, metadata: Dict) -> str:
         """Determine book type based on available formats"""
@@ -375,13 +504,17 @@ class TxtMetadataParser:
         else:
             return 'Book'
     
-    def _find_file_path(self, folder_path: str, extensions: List[str]) -> str:
+    def _find_file_path(self, folder_path: str, extensions: List[str], files: Optional[List[str]] = None) -> str:
         """Find the first file with matching extension in folder"""
         
-        if not folder_path or not os.path.exists(folder_path):
+        if not folder_path:
             return ''
+        if files is None:
+            if not os.path.exists(folder_path):
+                return ''
+            files = os.listdir(folder_path)
         
-        for file in os.listdir(folder_path):
+        for file in files:
             file_lower = file.lower()
             for ext in extensions:
                 if file_lower.endswith(ext.lower()):
@@ -403,23 +536,36 @@ class TxtIngestionPipeline:
         
         self.logger.info(f"Starting ingestion from: {root_directory}")
         
-        # Parse all folders
-        metadata_list = self.parser.batch_parse_folders(root_directory, max_folders)
+        totals = {"folders": 0, "success": 0, "duplicates": 0, "errors": 0, "chunks": []}
         
-        if not metadata_list:
-            return {"error": "No metadata found"}
-        
-        # Convert to Google Sheets format
-        sheets_data = self.parser.export_to_google_sheets_format(metadata_list)
+        # Parsed folders are converted and uploaded a batch at a time as the walk goes
+        folders = self.parser.iter_parsed_folders(root_directory, max_folders)
+        while True:
+            metadata_batch = list(islice(folders, TXT_INGEST_BATCH_SIZE))
+            if not metadata_batch:
+                break
+            
+            # Convert to Google Sheets format
+            sheets_data = self.parser.export_to_google_sheets_format(metadata_batch)
+            
+            # Upload to Google Sheets
+            results = self.sheets_manager.bulk_add_books(sheets_data)
+            
+            totals["folders"] += len(metadata_batch)
+            for field in ("success", "duplicates", "errors"):
+                totals[field] += results.get(field, 0)
+            for chunk in results.get("chunks", []):
+                totals["chunks"].append({**chunk, "chunk": len(totals["chunks"]) + 1})
         
-        # Upload to Google Sheets
-        results = self.sheets_manager.bulk_add_books(sheets_data)
+        if not totals["folders"]:
+            return {"error": "No metadata found"}
         
-        self.logger.info(f"Ingestion complete: {results}")
+        self.logger.info(f"Ingestion complete: {totals}")
         
         return {
-            "total_folders_processed": len(metadata_list),
-            "books_added": results.get("success", 0),
-            "duplicates_skipped": results.get("duplicates", 0),
-            "errors": results.get("errors", 0)
-        }
\ No newline at end of file
+            "total_folders_processed": totals["folders"],
+            "books_added": totals["success"],
+            "duplicates_skipped": totals["duplicates"],
+            "errors": totals["errors"],
+            "chunks": totals["chunks"]
+        }
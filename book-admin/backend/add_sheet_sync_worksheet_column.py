@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the worksheet column to an existing sheet_sync_state table
+"""
+
+import sqlite3
+import os
+
+def add_sheet_sync_worksheet_column():
+    """Add worksheet column to sheet_sync_state table"""
+    db_path = "./books.db"
+    
+    if not os.path.exists(db_path):
+        print("Database file not found. No migration needed.")
+        return
+    
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # Check if the table and column already exist
+        cursor.execute("PRAGMA table_info(sheet_sync_state)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if not columns:
+            print("sheet_sync_state table not found. It will be created with the column on startup.")
+            return
+        
+        if 'worksheet' in columns:
+            print("worksheet column already exists. No migration needed.")
+            return
+        
+        # Add the column; NULL means the row was synced before sharding was turned on
+        cursor.execute("ALTER TABLE sheet_sync_state ADD COLUMN worksheet VARCHAR")
+        
+        conn.commit()
+        print("Successfully added worksheet column to sheet_sync_state table")
+        
+        # Verify the column was added
+        cursor.execute("PRAGMA table_info(sheet_sync_state)")
+        columns = [column[1] for column in cursor.fetchall()]
+        print(f"Current columns: {columns}")
+        
+    except Exception as e:
+        print(f"Error during migration: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    add_sheet_sync_worksheet_column()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark script comparing requests/sec of the debug and production
+CustomStaticFiles serving modes on a synthetic ShuSpot page folder.
+
+Usage: python benchmark_static_files.py [requests] [pages]
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from static_files import CustomStaticFiles, strong_etag
+from page_cache import PageByteCache
+
+
+def create_sample_folder(root: str, pages: int) -> list:
+    """Create a book folder with crop-N.png files and return their request paths"""
+    book_dir = os.path.join(root, "Art", "A Gift for Sophie", "resized")
+    os.makedirs(book_dir)
+
+    paths = []
+    for i in range(1, pages + 1):
+        with open(os.path.join(book_dir, f"crop-{i}.png"), "wb") as f:
+            f.write(os.urandom(48 * 1024))
+        paths.append(f"/Art/A%20Gift%20for%20Sophie/resized/crop-{i}.png")
+    return paths
+
+
+async def run_requests(app, paths: list, total: int, headers=None) -> float:
+    """Drive the ASGI app directly and return requests/sec"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(total):
+        path = paths[i % len(paths)]
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": headers or [],
+        }
+        await app(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    return total / elapsed
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    root = tempfile.mkdtemp(prefix="shuspot-static-bench-")
+    try:
+        paths = create_sample_folder(root, pages)
+
+        debug_app = CustomStaticFiles(directory=root, production=False)
+        production_app = CustomStaticFiles(directory=root, production=True)
+        cached_app = CustomStaticFiles(directory=root, production=True, page_cache=PageByteCache(max_mb=64))
+
+        # Debug mode prints six lines per request; discard them so only the handler is measured
+        with contextlib.redirect_stdout(io.StringIO()):
+            debug_rps = asyncio.run(run_requests(debug_app, paths, total))
+        production_rps = asyncio.run(run_requests(production_app, paths, total))
+        cached_rps = asyncio.run(run_requests(cached_app, paths, total))
+
+        # Revalidation traffic: browsers re-requesting pages they already hold
+        _, stat_result = production_app._resolve(paths[0])
+        etag_headers = [(b"if-none-match", strong_etag(stat_result).encode())]
+        not_modified_rps = asyncio.run(run_requests(production_app, paths[:1], total, etag_headers))
+
+        print(f"Requests: {total} over {pages} pages")
+        print(f"  debug mode:            {debug_rps:10.0f} req/s")
+        print(f"  production mode:       {production_rps:10.0f} req/s ({production_rps / debug_rps:.1f}x)")
+        print(f"  production + page cache: {cached_rps:8.0f} req/s ({cached_rps / debug_rps:.1f}x)")
+        print(f"  production 304s:       {not_modified_rps:10.0f} req/s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Book Manifest Module
+Build the per-book reader manifest: page image dimensions read straight from
+PNG/JPEG/GIF headers (no decoding), byte sizes, content hashes and matching page audio
+"""
+
+import os
+import re
+import struct
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, quote
+
+from image_derivatives import source_version
+
+MANIFEST_VERSION = 3
+
+# Width used for manifest thumbnail URLs (served by the /img resize endpoint)
+THUMBNAIL_WIDTH = 240
+
+PAGE_AUDIO_PATTERN = re.compile(r'page\s*[-_]?\s*(\d+)\.(mp3|wav|m4a|aac)$', re.IGNORECASE)
+
+# JPEG start-of-frame markers carry the image size; C4/C8/CC share the range but aren't frames
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """Return (width, height) from the image header, or None if the format isn't recognised"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(26)
+
+            # PNG: 8-byte signature, then the IHDR chunk with big-endian width/height
+            if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+
+            # GIF: logical screen size, little-endian
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+
+            # JPEG: walk the marker segments until a start-of-frame
+            if head[:2] == b'\xff\xd8':
+                f.seek(2)
+                return _read_jpeg_size(f)
+    except (OSError, struct.error):
+        pass
+
+    return None
+
+
+def _read_jpeg_size(f) -> Optional[Tuple[int, int]]:
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue  # Markers without a length field
+        if marker == 0xD9:
+            return None
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+
+        if marker in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def file_hash(path: str) -> str:
+    """Short content hash used by the reader to detect changed pages"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def public_path(path: str, public_roots: List[str]) -> Optional[str]:
+    """Turn an absolute file path into "<mounted folder>/<relative path>" if it lives under a served folder"""
+    normalized = path.replace('\\', '/')
+    for root in public_roots:
+        folder_name = os.path.basename(root.rstrip('/\\'))
+        marker = f"/{folder_name}/"
+        if marker in normalized:
+            return folder_name + '/' + normalized.split(marker, 1)[1]
+    return None
+
+
+def build_book_manifest(folder_path: str, page_sequence: List[Dict], audio_files: List[str],
+                        public_roots: List[str]) -> Dict:
+    """Build the reader manifest for a book folder from its page sequence"""
+    audio_by_page = {}
+    for audio_file in audio_files or []:
+        match = PAGE_AUDIO_PATTERN.search(audio_file)
+        if match:
+            audio_by_page.setdefault(int(match.group(1)), audio_file)
+
+    pages = []
+    for page in page_sequence:
+        image_path = unquote(page.get('file_path', ''))
+        page_entry = {
+            'page_number': page.get('page_number'),
+            'display_name': page.get('display_name', ''),
+            'is_cover': page.get('is_cover', False),
+            'is_left_page': page.get('is_left_page', False),
+            'file_name': page.get('file_name', os.path.basename(image_path)),
+            'width': None,
+            'height': None,
+            'bytes': None,
+            'hash': None,
+            'image_url': None,
+            'thumbnail_url': None,
+            'audio_file': None,
+            'audio_url': None
+        }
+
+        version = None
+        if image_path and os.path.isfile(image_path):
+            size = read_image_size(image_path)
+            if size:
+                page_entry['width'], page_entry['height'] = size
+            stat_result = os.stat(image_path)
+            page_entry['bytes'] = stat_result.st_size
+            page_entry['hash'] = file_hash(image_path)
+            version = source_version(stat_result)
+
+        relative_image = public_path(image_path, public_roots)
+        if relative_image:
+            page_entry['image_url'] = '/' + quote(relative_image)
+            page_entry['thumbnail_url'] = f"/img/{quote(relative_image)}?w={THUMBNAIL_WIDTH}&fmt=webp"
+            if version:
+                # Versioned page and thumbnail URLs may be cached forever
+                page_entry['image_url'] += f"?v={version}"
+                page_entry['thumbnail_url'] += f"&v={version}"
+
+        audio_file = audio_by_page.get(page.get('page_number'))
+        if audio_file:
+            page_entry['audio_file'] = audio_file
+            relative_audio = public_path(os.path.join(folder_path, audio_file), public_roots)
+            if relative_audio:
+                page_entry['audio_url'] = '/media/' + quote(relative_audio)
+
+        pages.append(page_entry)
+
+    return {
+        'version': MANIFEST_VERSION,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'total_pages': len([p for p in pages if not p['is_cover']]),
+        'pages': pages
+    }
+
+
+def manifest_etag(manifest: Dict) -> str:
+    """Strong ETag over the manifest contents"""
+    payload = json.dumps(manifest, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return '"' + hashlib.sha1(payload).hexdigest() + '"'
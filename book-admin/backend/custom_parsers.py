@@ -6,12 +6,71 @@ Add new parsing logic here without modifying the main parsers.py file
 import re
 import os
 import json
-from typing import Dict, List, Optional
+import bisect
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from abc import ABC, abstractmethod
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import engine, SessionLocal, CustomParserDefinition, CustomParserVersion
+
+# Most of a file a content-based parser gets to see
+PARSER_VIEW_MAX_BYTES = 1024 * 1024
+
+# Upper bounds (ms) of the can_parse/parse latency histogram buckets; one more bucket catches the rest
+PROFILE_BUCKETS_MS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 50, 100, 1000)
+
+# Per-parser call counts, latencies and win rates; cheap enough to leave on (0 turns it off)
+CUSTOM_PARSER_PROFILING = os.environ.get("SHUSPOT_CUSTOM_PARSER_PROFILING", "1") != "0"
+
+# Files parsed concurrently by the batch test/parse endpoints
+CUSTOM_PARSE_WORKERS = int(os.environ.get("SHUSPOT_CUSTOM_PARSE_WORKERS", 8))
+
+# Seconds between checks for parser definitions saved by other workers; parses in between
+# (a whole batch, usually) reuse the last check. Saves in this process apply immediately.
+CUSTOM_PARSER_REFRESH_SECONDS = float(os.environ.get("SHUSPOT_CUSTOM_PARSER_REFRESH_SECONDS", 2))
+
+class FileView:
+    """Text of one file, read on first use and shared by every content-based parser"""
+    
+    def __init__(self, file_path: str, max_bytes: int = PARSER_VIEW_MAX_BYTES):
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self._text = None
+        self.error = None
+    
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            try:
+                with open(self.file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    self._text = f.read(self.max_bytes)
+            except OSError as e:
+                self.error = e
+                self._text = ''
+        return self._text
+    
+    def head(self, chars: int) -> str:
+        return self.text[:chars]
+    
+    @property
+    def first_line(self) -> str:
+        return self.text.split('\n', 1)[0]
 
 class BaseCustomParser(ABC):
     """Base class for custom parsers"""
     
+    # File extensions (lowercase, with the dot) this parser handles; None = any file
+    extensions: Optional[Tuple[str, ...]] = None
+    
+    # Content-based parsers get the shared FileView as view= instead of opening the file themselves
+    reads_content = False
+    
     @abstractmethod
     def can_parse(self, file_path: str, filename: str, folder_path: str = None) -> bool:
         """Return True if this parser can handle the given file"""
@@ -25,103 +84,112 @@ class BaseCustomParser(ABC):
     def get_priority(self) -> int:
         """Return parser priority (higher = runs first)"""
         return 0
+    
+    def get_name(self) -> str:
+        """Name reported as _parser_used and in parser statistics"""
+        return self.__class__.__name__
 
-class SeriesEpisodeParser(BaseCustomParser):
+class FilenamePatternParser(BaseCustomParser):
     """
-    Example: Parse files like "Series Name S01E02 - Episode Title.mp4"
+    Parser driven by one regex searched (case-insensitively) in the file's base name.
+    The registry compiles all of these into one FilenameMatcher, so a file name is
+    matched once for every pattern parser; subclasses only turn captures into metadata.
     """
     
+    filename_pattern = ''
+    
+    def __init__(self):
+        self.regex = re.compile(self.filename_pattern, re.IGNORECASE)
+    
+    def match(self, filename: str) -> Optional[tuple]:
+        """(whole match, group 1, group 2, ...) for this parser alone, or None"""
+        match = self.regex.search(os.path.splitext(filename)[0])
+        return (match.group(0),) + match.groups() if match else None
+    
     def can_parse(self, file_path: str, filename: str, folder_path: str = None) -> bool:
-        # Check if filename matches series pattern
-        pattern = r'(.+?)\s+S(\d+)E(\d+)\s*-\s*(.+)'
-        return bool(re.search(pattern, filename, re.IGNORECASE))
+        return self.match(filename) is not None
     
     def parse(self, file_path: str, filename: str, folder_path: str = None) -> Dict:
-        base_name = os.path.splitext(filename)[0]
-        pattern = r'(.+?)\s+S(\d+)E(\d+)\s*-\s*(.+)'
-        match = re.search(pattern, base_name, re.IGNORECASE)
-        
-        if match:
-            return {
-                'title': match.group(4).strip(),
-                'series_name': match.group(1).strip(),
-                'season': int(match.group(2)),
-                'episode': int(match.group(3)),
-                'book_type': 'Video Book',
-                'genre': 'Educational Series',
-                'notes': f"Season {match.group(2)}, Episode {match.group(3)}"
-            }
-        return {}
+        groups = self.match(filename)
+        return self.parse_match(groups, filename, folder_path) if groups else {}
+    
+    @abstractmethod
+    def parse_match(self, groups: tuple, filename: str, folder_path: str = None) -> Dict:
+        """Metadata from the captures; groups[n] is what match.group(n) would return"""
+        pass
+
+class SeriesEpisodeParser(FilenamePatternParser):
+    """
+    Example: Parse files like "Series Name S01E02 - Episode Title.mp4"
+    """
+    
+    filename_pattern = r'(.+?)\s+S(\d+)E(\d+)\s*-\s*(.+)'
+    
+    def parse_match(self, groups: tuple, filename: str, folder_path: str = None) -> Dict:
+        return {
+            'title': groups[4].strip(),
+            'series_name': groups[1].strip(),
+            'season': int(groups[2]),
+            'episode': int(groups[3]),
+            'book_type': 'Video Book',
+            'genre': 'Educational Series',
+            'notes': f"Season {groups[2]}, Episode {groups[3]}"
+        }
     
     def get_priority(self) -> int:
         return 10  # High priority for specific pattern
 
-class GradeLevelParser(BaseCustomParser):
+class GradeLevelParser(FilenamePatternParser):
     """
     Example: Parse files like "Grade3_Math_Addition_Workbook.pdf"
     """
     
-    def can_parse(self, file_path: str, filename: str, folder_path: str = None) -> bool:
-        pattern = r'Grade(\d+)_([^_]+)_(.+)'
-        return bool(re.search(pattern, filename, re.IGNORECASE))
+    filename_pattern = r'Grade(\d+)_([^_]+)_(.+)'
     
-    def parse(self, file_path: str, filename: str, folder_path: str = None) -> Dict:
-        base_name = os.path.splitext(filename)[0]
-        pattern = r'Grade(\d+)_([^_]+)_(.+)'
-        match = re.search(pattern, base_name, re.IGNORECASE)
+    def parse_match(self, groups: tuple, filename: str, folder_path: str = None) -> Dict:
+        grade = int(groups[1])
+        subject = groups[2].replace('_', ' ').title()
+        title = groups[3].replace('_', ' ').title()
         
-        if match:
-            grade = int(match.group(1))
-            subject = match.group(2).replace('_', ' ').title()
-            title = match.group(3).replace('_', ' ').title()
-            
-            # Map grade to reading level
-            if grade <= 2:
-                reading_level = "Pre-K to Grade 2"
-            elif grade <= 5:
-                reading_level = "Grade 3-5"
-            elif grade <= 8:
-                reading_level = "Grade 6-8"
-            else:
-                reading_level = "Grade 9-12"
-            
-            return {
-                'title': title,
-                'genre': subject,
-                'reading_level': reading_level,
-                'book_type': 'Read-to-Me',
-                'notes': f"Grade {grade} {subject} material"
-            }
-        return {}
+        # Map grade to reading level
+        if grade <= 2:
+            reading_level = "Pre-K to Grade 2"
+        elif grade <= 5:
+            reading_level = "Grade 3-5"
+        elif grade <= 8:
+            reading_level = "Grade 6-8"
+        else:
+            reading_level = "Grade 9-12"
+        
+        return {
+            'title': title,
+            'genre': subject,
+            'reading_level': reading_level,
+            'book_type': 'Read-to-Me',
+            'notes': f"Grade {grade} {subject} material"
+        }
 
-class PublisherSeriesParser(BaseCustomParser):
+class PublisherSeriesParser(FilenamePatternParser):
     """
     Example: Parse files like "Scholastic - Magic School Bus - The Human Body.pdf"
     """
     
-    def can_parse(self, file_path: str, filename: str, folder_path: str = None) -> bool:
-        # Check for Publisher - Series - Title format
-        parts = filename.split(' - ')
-        return len(parts) >= 3
+    # Publisher - Series - Title; the title keeps any further " - "
+    filename_pattern = r'^(.*?) - (.*?) - (.*)$'
     
-    def parse(self, file_path: str, filename: str, folder_path: str = None) -> Dict:
-        base_name = os.path.splitext(filename)[0]
-        parts = base_name.split(' - ')
+    def parse_match(self, groups: tuple, filename: str, folder_path: str = None) -> Dict:
+        publisher = groups[1].strip()
+        series = groups[2].strip()
+        title = groups[3].strip()
         
-        if len(parts) >= 3:
-            publisher = parts[0].strip()
-            series = parts[1].strip()
-            title = ' - '.join(parts[2:]).strip()  # In case title has dashes
-            
-            return {
-                'title': title,
-                'publisher': publisher,
-                'series': series,
-                'author': f"{series} Series",
-                'book_type': 'Read-to-Me',
-                'notes': f"Part of {series} series by {publisher}"
-            }
-        return {}
+        return {
+            'title': title,
+            'publisher': publisher,
+            'series': series,
+            'author': f"{series} Series",
+            'book_type': 'Read-to-Me',
+            'notes': f"Part of {series} series by {publisher}"
+        }
 
 class FolderBasedParser(BaseCustomParser):
     """
@@ -164,21 +232,19 @@ class XMLMetadataParser(BaseCustomParser):
     <grade>3</grade>
     """
     
-    def can_parse(self, file_path: str, filename: str, folder_path: str = None) -> bool:
+    extensions = ('.txt',)
+    reads_content = True
+    
+    def can_parse(self, file_path: str, filename: str, folder_path: str = None, view: FileView = None) -> bool:
         if not filename.lower().endswith('.txt'):
             return False
         
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read(500)  # Read first 500 chars
-                return '<title>' in content.lower() and '<author>' in content.lower()
-        except:
-            return False
+        content = (view or FileView(file_path)).head(500).lower()  # First 500 chars
+        return '<title>' in content and '<author>' in content
     
-    def parse(self, file_path: str, filename: str, folder_path: str = None) -> Dict:
+    def parse(self, file_path: str, filename: str, folder_path: str = None, view: FileView = None) -> Dict:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = (view or FileView(file_path)).text
             
             metadata = {}
             
@@ -229,21 +295,19 @@ class PipeDelimitedParser(BaseCustomParser):
     Format: "Title|Author|Grade|Subject|Description"
     """
     
-    def can_parse(self, file_path: str, filename: str, folder_path: str = None) -> bool:
+    extensions = ('.txt',)
+    reads_content = True
+    
+    def can_parse(self, file_path: str, filename: str, folder_path: str = None, view: FileView = None) -> bool:
         if not filename.lower().endswith('.txt'):
             return False
         
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                first_line = f.readline().strip()
-                return first_line.count('|') >= 3  # At least 4 fields
-        except:
-            return False
+        first_line = (view or FileView(file_path)).first_line.strip()
+        return first_line.count('|') >= 3  # At least 4 fields
     
-    def parse(self, file_path: str, filename: str, folder_path: str = None) -> Dict:
+    def parse(self, file_path: str, filename: str, folder_path: str = None, view: FileView = None) -> Dict:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                first_line = f.readline().strip()
+            first_line = (view or FileView(file_path)).first_line.strip()
             
             parts = first_line.split('|')
             if len(parts) >= 4:
@@ -281,6 +345,234 @@ class PipeDelimitedParser(BaseCustomParser):
         
         return {}
 
+class FilenameMatcher:
+    """
+    Every FilenamePatternParser fused into one regex. Each parser becomes a lookahead
+    alternative "(?=[\s\S]*?(?P<pN>pattern))" tried in priority order at the start of the name,
+    so the first alternative that matches is the highest-priority parser whose pattern occurs
+    anywhere in the name (what a separate re.search per parser would have found).
+    """
+    
+    # Patterns that can't be embedded: named groups collide, backreferences would be renumbered
+    UNFUSABLE_PATTERN = re.compile(r'\(\?P[<=]|\\[1-9]|\\g<')
+    
+    def __init__(self, parsers: List[FilenamePatternParser]):
+        self.parsers = parsers  # priority order
+        self.standalone = set()  # ids of parsers matched on their own
+        self._slots: Dict[str, tuple] = {}  # group name -> (parser, first group index, group count)
+        alternatives = []
+        
+        for parser in parsers:
+            name = f"p{len(alternatives)}"
+            alternative = f"(?=[\\s\\S]*?(?P<{name}>{parser.filename_pattern}))"
+            if self.UNFUSABLE_PATTERN.search(parser.filename_pattern):
+                self.standalone.add(id(parser))
+                continue
+            try:
+                re.compile(alternative, re.IGNORECASE)
+            except re.error:
+                # e.g. inline global flags like (?i) that are only allowed at the start
+                self.standalone.add(id(parser))
+                continue
+            alternatives.append(alternative)
+            self._slots[name] = (parser, parser.regex.groups)
+        
+        self.regex = re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+        if self.regex:
+            self._slots = {
+                name: (parser, self.regex.groupindex[name], count)
+                for name, (parser, count) in self._slots.items()
+            }
+    
+    def match(self, filename: str) -> Tuple[Optional[FilenamePatternParser], Optional[tuple]]:
+        """Highest-priority fused parser matching the file's base name and its captures, in one regex call"""
+        if self.regex is None:
+            return None, None
+        match = self.regex.match(os.path.splitext(filename)[0])
+        if not match:
+            return None, None
+        # The parser's wrapper group closes after its inner groups, so it's the last group matched
+        parser, start, count = self._slots[match.lastgroup]
+        return parser, match.groups()[start - 1:start + count]
+    
+    def is_fused(self, parser: BaseCustomParser) -> bool:
+        return id(parser) not in self.standalone
+
+class LatencyHistogram:
+    """Call count, total/max and bucketed latencies (PROFILE_BUCKETS_MS) of one parser phase"""
+    
+    BOUNDS_NS = tuple(int(bound * 1_000_000) for bound in PROFILE_BUCKETS_MS)
+    
+    __slots__ = ('counts', 'calls', 'total_ns', 'max_ns')
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_NS) + 1)
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+    
+    def add(self, ns: int):
+        self.counts[bisect.bisect_left(self.BOUNDS_NS, ns)] += 1
+        self.calls += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+    
+    def to_dict(self) -> Dict:
+        labels = [f"{bound:g}" for bound in PROFILE_BUCKETS_MS] + ["+Inf"]
+        return {
+            "timed_calls": self.calls,
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "avg_ms": round(self.total_ns / self.calls / 1e6, 4) if self.calls else 0.0,
+            "max_ms": round(self.max_ns / 1e6, 3),
+            "histogram_ms": dict(zip(labels, self.counts)),  # bucket upper bound -> calls
+        }
+
+class ParserProfiler:
+    """
+    Per-parser counters and latency histograms for parse_with_custom_parsers. Each parse hands
+    over its events in one record() call, so the cost is a few perf_counter_ns calls and one
+    lock acquisition per file.
+    """
+    
+    def __init__(self, enabled: bool = CUSTOM_PARSER_PROFILING):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.files = 0
+            self.matched = 0
+            self.since = datetime.utcnow()
+            self.matcher = LatencyHistogram()  # the combined filename match
+            self.parsers: Dict[str, Dict] = {}
+    
+    @staticmethod
+    def _new_entry() -> Dict:
+        return {
+            "can_parse_calls": 0, "can_parse_hits": 0, "parse_calls": 0, "empty_results": 0,
+            "exceptions": 0, "wins": 0,
+            "can_parse": LatencyHistogram(), "parse": LatencyHistogram(),
+        }
+    
+    def _entry(self, name: str) -> Dict:
+        entry = self.parsers.get(name)
+        if entry is None:
+            entry = self.parsers[name] = self._new_entry()
+        return entry
+    
+    def record(self, events: List[tuple], winner: Optional[str], matcher_ns: Optional[int]):
+        with self._lock:
+            self.files += 1
+            if matcher_ns is not None:
+                self.matcher.add(matcher_ns)
+            for name, phase, elapsed, outcome in events:
+                entry = self._entry(name)
+                if phase == 'can_parse':
+                    entry["can_parse_calls"] += 1
+                    entry["can_parse_hits"] += outcome
+                    if elapsed is not None:
+                        entry["can_parse"].add(elapsed)
+                else:
+                    entry["parse_calls"] += 1
+                    entry["parse"].add(elapsed)
+                    if outcome is None:
+                        entry["exceptions"] += 1
+                    elif not outcome:
+                        entry["empty_results"] += 1
+            if winner:
+                self.matched += 1
+                self._entry(winner)["wins"] += 1
+    
+    def parser_stats(self, name: str) -> Dict:
+        with self._lock:
+            return self._format(self.parsers.get(name) or self._new_entry())
+    
+    def _format(self, entry: Dict) -> Dict:
+        return {
+            **{key: value for key, value in entry.items() if not isinstance(value, LatencyHistogram)},
+            "win_rate": round(entry["wins"] / self.files, 4) if self.files else 0.0,
+            "can_parse_latency": entry["can_parse"].to_dict(),
+            "parse_latency": entry["parse"].to_dict(),
+        }
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "since": self.since.isoformat(),
+                "files": self.files,
+                "matched": self.matched,
+                "unmatched": self.files - self.matched,
+                "filename_matcher": self.matcher.to_dict(),
+                "parsers": {name: self._format(entry) for name, entry in self.parsers.items()},
+            }
+
+class ParserRegistry:
+    """
+    Custom parsers kept in priority order (sorted once, as they are added) plus a dispatch
+    table of the parsers to try for each file extension
+    """
+    
+    def __init__(self, parsers: List[BaseCustomParser]):
+        self.source = parsers  # The CUSTOM_PARSERS list; appending to it directly still works
+        self._lock = threading.Lock()
+        self._build()
+    
+    def _build(self):
+        with self._lock:
+            # Stable sort: equal priorities keep their registration order
+            self._ordered = sorted(self.source, key=lambda p: -p.get_priority())
+            self._priorities = [-p.get_priority() for p in self._ordered]
+            self._seen = len(self.source)
+            self._by_extension: Dict[str, Tuple[BaseCustomParser, ...]] = {}
+            self._matcher = None
+    
+    def add(self, parser: BaseCustomParser):
+        with self._lock:
+            self.source.append(parser)
+            position = bisect.bisect_right(self._priorities, -parser.get_priority())
+            self._ordered.insert(position, parser)
+            self._priorities.insert(position, -parser.get_priority())
+            self._seen = len(self.source)
+            self._by_extension = {}
+            if isinstance(parser, FilenamePatternParser):
+                self._matcher = None  # recompiled with the new pattern on next use
+    
+    def replace(self, old: List[BaseCustomParser], new: List[BaseCustomParser]):
+        """Swap one set of parsers for another (a reload of the persisted definitions)"""
+        old_ids = {id(parser) for parser in old}
+        with self._lock:
+            self.source[:] = [parser for parser in self.source if id(parser) not in old_ids] + list(new)
+        self._build()
+    
+    def parsers(self) -> List[BaseCustomParser]:
+        if self._seen != len(self.source):
+            self._build()
+        return list(self._ordered)
+    
+    def candidates(self, filename: str) -> Tuple[BaseCustomParser, ...]:
+        """Parsers that may handle a file with this name, in priority order"""
+        if self._seen != len(self.source):
+            self._build()
+        extension = os.path.splitext(filename)[1].lower()
+        candidates = self._by_extension.get(extension)
+        if candidates is None:
+            candidates = tuple(p for p in self._ordered if p.extensions is None or extension in p.extensions)
+            self._by_extension[extension] = candidates
+        return candidates
+    
+    def filename_matcher(self) -> FilenameMatcher:
+        matcher = self._matcher
+        if matcher is None or self._seen != len(self.source):
+            if self._seen != len(self.source):
+                self._build()
+            with self._lock:
+                matcher = FilenameMatcher([p for p in self._ordered if isinstance(p, FilenamePatternParser)])
+                self._matcher = matcher
+        return matcher
+
 # Registry of all custom parsers
 CUSTOM_PARSERS = [
     SeriesEpisodeParser(),
@@ -291,31 +583,204 @@ CUSTOM_PARSERS = [
     PipeDelimitedParser(),
 ]
 
+PARSER_REGISTRY = ParserRegistry(CUSTOM_PARSERS)
+PARSER_PROFILER = ParserProfiler()
+
 def get_custom_parsers() -> List[BaseCustomParser]:
     """Get all registered custom parsers, sorted by priority"""
-    return sorted(CUSTOM_PARSERS, key=lambda p: p.get_priority(), reverse=True)
+    DYNAMIC_PARSERS.refresh()
+    return PARSER_REGISTRY.parsers()
 
 def parse_with_custom_parsers(file_path: str, filename: str, folder_path: str = None) -> Dict:
     """
-    Try all custom parsers and return metadata from the first one that can parse the file
+    Try the custom parsers registered for this file type and return metadata from the first
+    one that can parse the file. The file is opened at most once, by whichever content-based
+    parser looks at it first.
+    """
+    DYNAMIC_PARSERS.refresh()
+    view = FileView(file_path)
+    matcher = PARSER_REGISTRY.filename_matcher()
+    winner = groups = None
+    matched = passed_winner = False
+    # (parser name, phase, elapsed ns or None, outcome), handed to the profiler in one call
+    events = [] if PARSER_PROFILER.enabled else None
+    matcher_ns = None
+    now = time.perf_counter_ns
+    metadata = {}
+    
+    candidates = PARSER_REGISTRY.candidates(filename)
+    for parser in candidates:
+        if isinstance(parser, FilenamePatternParser) and matcher.is_fused(parser):
+            # One combined match decides every pattern parser ranked above the winner
+            if not matched:
+                started = now()
+                winner, groups = matcher.match(filename)
+                matcher_ns = now() - started
+                matched = True
+                # A winner not registered for this extension decides nothing; match one by one
+                passed_winner = winner is not None and winner not in candidates
+            if parser is winner:
+                passed_winner = True
+                parser_groups = groups
+                elapsed = None  # its share of the combined match isn't measurable
+            elif not passed_winner:
+                # Ranks above the winner (or nothing matched), so its pattern didn't match
+                if events is not None:
+                    events.append((parser.get_name(), 'can_parse', None, False))
+                continue
+            else:
+                started = now()
+                parser_groups = parser.match(filename)  # the winner returned nothing; rare
+                elapsed = now() - started
+        elif isinstance(parser, FilenamePatternParser):
+            started = now()
+            parser_groups = parser.match(filename)
+            elapsed = now() - started
+        else:
+            kwargs = {'view': view} if parser.reads_content else {}
+            started = now()
+            parser_groups = () if parser.can_parse(file_path, filename, folder_path, **kwargs) else None
+            elapsed = now() - started
+        
+        if events is not None:
+            events.append((parser.get_name(), 'can_parse', elapsed, parser_groups is not None))
+        if parser_groups is None:
+            continue
+        
+        started = now()
+        try:
+            if isinstance(parser, FilenamePatternParser):
+                metadata = parser.parse_match(parser_groups, filename, folder_path)
+            else:
+                metadata = parser.parse(file_path, filename, folder_path, **kwargs)
+        except Exception as e:
+            print(f"Error in {parser.get_name()}: {e}")
+            metadata = None
+        if events is not None:
+            events.append((parser.get_name(), 'parse', now() - started, None if metadata is None else bool(metadata)))
+        if metadata:  # If parser returned any metadata
+            metadata['_parser_used'] = parser.get_name()
+            break
+        metadata = {}
+    
+    if events is not None:
+        PARSER_PROFILER.record(events, metadata.get('_parser_used'), matcher_ns)
+    return metadata
+
+def walk_files(directory: str, recursive: bool = True) -> Iterator[str]:
+    """Paths of the files under a directory in sorted order, skipping hidden and symlinked entries"""
+    stack = [directory]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted((e for e in it if not e.name.startswith('.')), key=lambda e: e.name)
+        except OSError:
+            continue
+        subfolders = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subfolders.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.path
+        if recursive:
+            stack.extend(reversed(subfolders))
+
+def parse_file_batch(
+    paths: Iterable[str],
+    parse: Callable[[str, str, Optional[str]], Dict] = None,
+    compare: Callable[[str, str, Optional[str]], Dict] = None,
+    workers: int = CUSTOM_PARSE_WORKERS,
+) -> Iterator[Dict]:
     """
-    for parser in get_custom_parsers():
-        if parser.can_parse(file_path, filename, folder_path):
+    Run parse(file_path, filename, folder_path) (parse_with_custom_parsers by default) over many
+    files on a thread pool, yielding one result per file in input order. Only workers * 4 files
+    are in flight at a time, so a huge directory is streamed rather than queued up front.
+    compare, if given, runs after parse (untimed) and its result is added as compare_metadata.
+    """
+    parse = parse or parse_with_custom_parsers
+    
+    def run(file_path: str) -> Dict:
+        filename = os.path.basename(file_path)
+        result = {"file_path": file_path, "filename": filename}
+        start = time.perf_counter()
+        try:
+            metadata = parse(file_path, filename, os.path.dirname(file_path))
+            result["metadata"] = metadata
+            result["parser_used"] = metadata.get('_parser_used') if metadata else None
+        except Exception as e:
+            result["metadata"] = {}
+            result["parser_used"] = None
+            result["error"] = str(e)
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        if compare:
             try:
-                metadata = parser.parse(file_path, filename, folder_path)
-                if metadata:  # If parser returned any metadata
-                    metadata['_parser_used'] = parser.__class__.__name__
-                    return metadata
+                result["compare_metadata"] = compare(file_path, filename, os.path.dirname(file_path))
             except Exception as e:
-                print(f"Error in {parser.__class__.__name__}: {e}")
-                continue
+                result["compare_metadata"] = {"error": str(e)}
+        return result
     
-    return {}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="custom-parse") as executor:
+        pending = deque()
+        for file_path in paths:
+            pending.append(executor.submit(run, file_path))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class BatchParseStats:
+    """Totals for a batch run: winning parser counts and timings, unmatched share, errors"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.files = 0
+        self.unmatched = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.parsers: Dict[str, Dict] = {}  # winning parser -> {"files", "total_ms", "max_ms"}
+    
+    def add(self, result: Dict):
+        self.files += 1
+        self.total_ms += result["elapsed_ms"]
+        if "error" in result:
+            self.errors += 1
+        parser = result.get("parser_used")
+        if not parser:
+            self.unmatched += 1
+            return
+        entry = self.parsers.setdefault(parser, {"files": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["files"] += 1
+        entry["total_ms"] += result["elapsed_ms"]
+        entry["max_ms"] = max(entry["max_ms"], result["elapsed_ms"])
+    
+    def summary(self) -> Dict:
+        parsers = {
+            name: {
+                "files": entry["files"],
+                "share": round(entry["files"] / self.files, 4),
+                "total_ms": round(entry["total_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["files"], 3),
+                "max_ms": round(entry["max_ms"], 3),
+            }
+            for name, entry in sorted(self.parsers.items(), key=lambda item: -item[1]["files"])
+        }
+        elapsed = time.perf_counter() - self.started
+        return {
+            "files": self.files,
+            "matched": self.files - self.unmatched,
+            "unmatched": self.unmatched,
+            "unmatched_share": round(self.unmatched / self.files, 4) if self.files else 0.0,
+            "errors": self.errors,
+            "parsers": parsers,
+            "avg_ms": round(self.total_ms / self.files, 3) if self.files else 0.0,
+            "elapsed_seconds": round(elapsed, 3),
+            "files_per_second": round(self.files / elapsed, 1) if elapsed else 0.0,
+        }
 
 def add_custom_parser(parser: BaseCustomParser):
     """Add a new custom parser to the registry"""
-    CUSTOM_PARSERS.append(parser)
-    CUSTOM_PARSERS.sort(key=lambda p: p.get_priority(), reverse=True)
+    PARSER_REGISTRY.add(parser)
 
 # Example of how to create a new parser dynamically
 def create_regex_parser(name: str, pattern: str, field_mapping: Dict[int, str], priority: int = 5):
@@ -329,37 +794,136 @@ def create_regex_parser(name: str, pattern: str, field_mapping: Dict[int, str],
         priority: Parser priority
     """
     
-    class DynamicRegexParser(BaseCustomParser):
+    class DynamicRegexParser(FilenamePatternParser):
         def __init__(self):
             self.name = name
             self.pattern = pattern
+            self.filename_pattern = pattern
             self.field_mapping = field_mapping
             self.priority = priority
+            super().__init__()  # compiles the pattern, so a bad one fails here
         
-        def can_parse(self, file_path: str, filename: str, folder_path: str = None) -> bool:
-            return bool(re.search(self.pattern, filename, re.IGNORECASE))
-        
-        def parse(self, file_path: str, filename: str, folder_path: str = None) -> Dict:
-            base_name = os.path.splitext(filename)[0]
-            match = re.search(self.pattern, base_name, re.IGNORECASE)
-            
-            if match:
-                metadata = {}
-                for group_num, field_name in self.field_mapping.items():
-                    try:
-                        value = match.group(group_num)
-                        if value:
-                            metadata[field_name] = value.strip()
-                    except IndexError:
-                        continue
-                return metadata
-            return {}
+        def parse_match(self, groups: tuple, filename: str, folder_path: str = None) -> Dict:
+            metadata = {}
+            for group_num, field_name in self.field_mapping.items():
+                if 0 <= group_num < len(groups) and groups[group_num]:
+                    metadata[field_name] = groups[group_num].strip()
+            return metadata
         
         def get_priority(self) -> int:
             return self.priority
+        
+        def get_name(self) -> str:
+            return self.name
     
     return DynamicRegexParser()
 
+class DynamicParserStore:
+    """
+    Regex parsers created through the API, persisted in the custom_parser_definitions table
+    so every worker process (and every restart) parses with the same set. Each save bumps
+    custom_parser_version; refresh() compares it with the version this process loaded and,
+    when another worker has changed the definitions, recompiles them into the registry.
+    """
+    
+    def __init__(self, registry: ParserRegistry, refresh_seconds: float = CUSTOM_PARSER_REFRESH_SECONDS):
+        self.registry = registry
+        self.refresh_seconds = refresh_seconds
+        self.version = None  # version loaded into this process; None = not loaded yet
+        self.loaded: List[BaseCustomParser] = []
+        self._checked_at: Optional[float] = None  # monotonic time of the last version query
+        self._lock = threading.Lock()
+    
+    def current_version(self) -> int:
+        """One primary-key lookup"""
+        with engine.connect() as conn:
+            version = conn.execute(
+                text("SELECT version FROM custom_parser_version WHERE id = 1")
+            ).scalar()
+        return version or 0
+    
+    def refresh(self, force: bool = False):
+        """
+        Reload the persisted parsers if any worker saved a definition since the last load.
+        The version is queried at most once per refresh_seconds unless force is set.
+        """
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        try:
+            if not force and self.current_version() == self.version:
+                return
+            with self._lock:
+                self._load()
+        except SQLAlchemyError as e:
+            # Keep parsing with what's loaded; the next check tries again
+            print(f"Could not refresh custom parser definitions: {e}")
+    
+    def _load(self):
+        db = SessionLocal()
+        try:
+            # Version and definitions from one transaction, so they belong together
+            state = db.get(CustomParserVersion, 1)
+            version = state.version if state else 0
+            if version == self.version:
+                return  # another thread reloaded while we waited
+            definitions = db.query(CustomParserDefinition).order_by(CustomParserDefinition.id).all()
+        finally:
+            db.close()
+        
+        parsers = []
+        for definition in definitions:
+            try:
+                parsers.append(create_regex_parser(
+                    definition.name,
+                    definition.pattern,
+                    {int(k): v for k, v in json.loads(definition.field_mapping or '{}').items()},
+                    definition.priority,
+                ))
+            except (re.error, ValueError) as e:
+                print(f"Skipping custom parser {definition.name}: {e}")
+        
+        self.registry.replace(self.loaded, parsers)
+        self.loaded = parsers
+        self.version = version
+    
+    def save(self, name: str, pattern: str, field_mapping: Dict[int, str], priority: int = 5) -> BaseCustomParser:
+        """Create or replace (by name) a persisted regex parser and load it into this process"""
+        parser = create_regex_parser(name, pattern, field_mapping, priority)  # invalid patterns stop here
+        
+        db = SessionLocal()
+        try:
+            definition = db.query(CustomParserDefinition).filter(CustomParserDefinition.name == name).first()
+            if definition is None:
+                definition = CustomParserDefinition(name=name)
+                db.add(definition)
+            definition.pattern = pattern
+            definition.field_mapping = json.dumps({str(k): v for k, v in field_mapping.items()})
+            definition.priority = priority
+            definition.updated_at = datetime.utcnow()
+            
+            state = db.get(CustomParserVersion, 1)
+            if state is None:
+                db.add(CustomParserVersion(id=1, version=1))
+            else:
+                state.version = CustomParserVersion.version + 1  # atomic increment in SQL
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        
+        self.refresh(force=True)
+        return parser
+
+DYNAMIC_PARSERS = DynamicParserStore(PARSER_REGISTRY)
+
+def save_regex_parser(name: str, pattern: str, field_mapping: Dict[int, str], priority: int = 5) -> BaseCustomParser:
+    """Create a regex parser and persist it so every worker picks it up"""
+    return DYNAMIC_PARSERS.save(name, pattern, field_mapping, priority)
+
 # Example usage of dynamic parser creation:
 # isbn_parser = create_regex_parser(
 #     name="ISBN Parser",
@@ -68,6 +68,37 @@ class Book(Base):
         
         return book_dict
 
+class SheetSyncState(Base):
+    """Last version of each book pushed to the Google Sheets master sheet"""
+    __tablename__ = "sheet_sync_state"
+    
+    book_id = Column(Integer, primary_key=True)
+    sheet_key = Column(String, index=True)  # Name/Author duplicate key the row was written under
+    worksheet = Column(String, nullable=True)  # Worksheet (shard) holding the row; NULL = the only one
+    row_hash = Column(String)  # Hash of the row values last written
+    status = Column(String, default="synced")  # synced or deleted
+    synced_revision = Column(Integer, default=0)  # Sync run that last wrote this row
+    synced_at = Column(DateTime, default=datetime.utcnow)
+
+class CustomParserDefinition(Base):
+    """Regex parser created through /custom-parsers/create-regex, shared by every API worker"""
+    __tablename__ = "custom_parser_definitions"
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, index=True)
+    pattern = Column(String)  # Searched in the file's base name
+    field_mapping = Column(Text)  # JSON: capture group number -> metadata field
+    priority = Column(Integer, default=5)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class CustomParserVersion(Base):
+    """Single row (id 1) bumped on every parser definition change; workers reload when it moves"""
+    __tablename__ = "custom_parser_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0)
+
 # Create tables
 Base.metadata.create_all(bind=engine)
 
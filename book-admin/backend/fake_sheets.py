@@ -0,0 +1,216 @@
+"""
+Fake Sheets Module
+In-memory stand-in for a gspread Spreadsheet/Worksheet so sync throughput and the
+rate limiting layer can be exercised offline
+"""
+
+import re
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+
+
+# Strings USER_ENTERED input would turn into a date (e.g. an age range like "4-7")
+USER_ENTERED_DATE_PATTERN = re.compile(r'^(\d{1,2})[-/](\d{1,2})$')
+
+
+def user_entered(value):
+    """
+    Roughly what Sheets stores for a value sent with value_input_option='USER_ENTERED':
+    "=..." is evaluated as a formula and month-day strings become dates. RAW stores values as sent
+    """
+    if not isinstance(value, str):
+        return value
+    if value.startswith('='):
+        return '#ERROR!'
+    date = USER_ENTERED_DATE_PATTERN.match(value)
+    if date and 1 <= int(date.group(1)) <= 12 and 1 <= int(date.group(2)) <= 31:
+        return f"{int(date.group(1))}/{int(date.group(2))}/{datetime.now().year}"
+    return value
+
+
+def _entered(values: List[List], value_input_option) -> List[List]:
+    if value_input_option != 'USER_ENTERED':
+        return [list(row) for row in values]
+    return [[user_entered(value) for value in row] for row in values]
+
+
+def api_error(status_code: int = 429, message: str = "Quota exceeded for quota metric 'Write requests'",
+                status: str = "RESOURCE_EXHAUSTED") -> APIError:
+    """Build the APIError gspread raises for an HTTP error response"""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps({
+        "error": {"code": status_code, "message": message, "status": status}
+    }).encode("utf-8")
+    return APIError(response)
+
+
+class FakeSpreadsheet:
+    """Spreadsheet holding FakeWorksheets; can add latency and enforce a per-minute quota like the real API"""
+
+    def __init__(self, title: str = "ShuSpot Books Master", latency_ms: float = 0.0,
+                 quota_per_minute: int = 0, fail_every: int = 0):
+        self.title = title
+        self.latency = latency_ms / 1000.0
+        self.quota_per_minute = quota_per_minute  # 0 = unlimited
+        self.fail_every = fail_every  # return a 503 on every Nth request (0 = never)
+        self.request_log: List[str] = []
+        self._request_times: deque = deque()
+        self._worksheets: List["FakeWorksheet"] = []
+        self._modified = datetime.now(timezone.utc)
+        self._lock = threading.Lock()
+        self.add_worksheet("Sheet1")
+
+    def _request(self, method: str, write: bool = False):
+        """Account for one API request: latency, quota and injected failures"""
+        with self._lock:
+            self.request_log.append(method)
+            now = time.monotonic()
+            if self.quota_per_minute:
+                while self._request_times and now - self._request_times[0] >= 60:
+                    self._request_times.popleft()
+                if len(self._request_times) >= self.quota_per_minute:
+                    raise api_error()
+                self._request_times.append(now)
+            if self.fail_every and len(self.request_log) % self.fail_every == 0:
+                raise api_error(503, "The service is currently unavailable.", "UNAVAILABLE")
+            if write:
+                self._modified = datetime.now(timezone.utc)
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def sheet1(self) -> "FakeWorksheet":
+        return self._worksheets[0]
+
+    def worksheet(self, title: str) -> "FakeWorksheet":
+        self._request("worksheet")
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise WorksheetNotFound(title)
+
+    def worksheets(self) -> List["FakeWorksheet"]:
+        self._request("worksheets")
+        return list(self._worksheets)
+
+    def add_worksheet(self, title: str, rows=1000, cols=26) -> "FakeWorksheet":
+        if self._worksheets:
+            self._request("add_worksheet", write=True)
+        worksheet = FakeWorksheet(self, title)
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def get_lastUpdateTime(self) -> str:
+        self._request("get_lastUpdateTime")
+        return self._modified.isoformat().replace("+00:00", "Z")
+
+
+class FakeWorksheet:
+    """The subset of gspread.Worksheet that GoogleSheetsManager uses, backed by a list of rows"""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet, title: str):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.rows: List[List] = []
+
+    def _cell_grid(self, row: int, col: int):
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        while len(cells) < col:
+            cells.append("")
+        return cells
+
+    def _write_block(self, top: int, left: int, values: List[List]):
+        for r, row_values in enumerate(values):
+            for c, value in enumerate(row_values):
+                self._cell_grid(top + r, left + c)[left + c - 1] = value
+
+    def _read_range(self, a1_range: str) -> List[List]:
+        start, _, end = a1_range.partition(":")
+        top, left = _a1_bounds(start, 1, 1)
+        bottom, right = _a1_bounds(end or start, len(self.rows), max((len(r) for r in self.rows), default=0))
+        return [
+            [row[c] if c < len(row) else "" for c in range(left - 1, right)]
+            for row in self.rows[top - 1:bottom]
+        ]
+
+    def get_all_values(self) -> List[List]:
+        self.spreadsheet._request("get_all_values")
+        return [list(row) for row in self.rows]
+
+    def get_all_records(self) -> List[Dict]:
+        self.spreadsheet._request("get_all_records")
+        if not self.rows:
+            return []
+        header = self.rows[0]
+        return [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in self.rows[1:]]
+
+    def row_values(self, row: int) -> List:
+        self.spreadsheet._request("row_values")
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def batch_get(self, ranges: List[str], **kwargs) -> List[List[List]]:
+        self.spreadsheet._request("batch_get")
+        return [self._read_range(a1_range) for a1_range in ranges]
+
+    def append_row(self, values: List, value_input_option='RAW', **kwargs) -> Dict:
+        self.spreadsheet._request("append_row", write=True)
+        return self._append(_entered([values], value_input_option))
+
+    def append_rows(self, values: List[List], value_input_option='RAW', **kwargs) -> Dict:
+        self.spreadsheet._request("append_rows", write=True)
+        return self._append(_entered(values, value_input_option))
+
+    def _append(self, values: List[List]) -> Dict:
+        """Add rows after the table and answer like values:append does"""
+        start = len(self.rows) + 1
+        self.rows.extend(list(row) for row in values)
+        width = max((len(row) for row in values), default=1)
+        end = rowcol_to_a1(start + len(values) - 1, width)
+        return {"updates": {"updatedRange": f"'{self.title}'!A{start}:{end}", "updatedRows": len(values)}}
+
+    def update(self, range_name: str, values: List[List] = None, value_input_option='RAW', **kwargs):
+        self.spreadsheet._request("update", write=True)
+        top, left = a1_to_rowcol(range_name.split(":")[0])
+        self._write_block(top, left, _entered(values or [], value_input_option))
+
+    def update_cell(self, row: int, col: int, value):
+        self.spreadsheet._request("update_cell", write=True)
+        self._cell_grid(row, col)[col - 1] = value
+
+    def batch_update(self, data: List[Dict], value_input_option='RAW', **kwargs):
+        self.spreadsheet._request("batch_update", write=True)
+        for entry in data:
+            top, left = a1_to_rowcol(entry["range"].split(":")[0])
+            self._write_block(top, left, _entered(entry["values"], value_input_option))
+
+    def format(self, ranges, fmt: Dict):
+        self.spreadsheet._request("format", write=True)
+
+
+def _a1_bounds(a1: str, default_row: int, default_col: int):
+    """Row/column of an A1 reference that may omit either part ("C" or "5")"""
+    letters = "".join(ch for ch in a1 if ch.isalpha())
+    digits = "".join(ch for ch in a1 if ch.isdigit())
+    col = 0
+    for ch in letters.upper():
+        col = col * 26 + ord(ch) - 64
+    return (int(digits) if digits else default_row), (col or default_col)
+
+
+def create_fake_spreadsheet(header: Optional[List[str]] = None, **options) -> FakeSpreadsheet:
+    """Fake spreadsheet whose first worksheet already has a header row"""
+    spreadsheet = FakeSpreadsheet(**options)
+    if header:
+        spreadsheet.sheet1.rows.append(list(header))
+    return spreadsheet
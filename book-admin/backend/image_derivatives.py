@@ -0,0 +1,205 @@
+"""
+Image Derivatives Module
+Resize ShuSpot page images on demand and keep the results in a size-capped disk cache
+"""
+
+import os
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Optional heavy dependencies
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    Image = None
+
+DERIVATIVE_CACHE_DIR = "../uploads/.derivatives"
+DERIVATIVE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+# Requested widths are snapped up to a multiple of this step so that every phone
+# model doesn't get its own copy of each page
+WIDTH_STEP = 80
+MAX_WIDTH = 2400
+
+# Output format -> (file extension, Pillow format name, save options)
+OUTPUT_FORMATS = {
+    'webp': ('.webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('.jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'jpg': ('.jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'png': ('.png', 'PNG', {'optimize': True}),
+}
+
+MEDIA_TYPES = {
+    '.webp': 'image/webp',
+    '.jpg': 'image/jpeg',
+    '.png': 'image/png',
+}
+
+
+class UnsupportedImage(Exception):
+    """The source file isn't an image Pillow can decode"""
+
+
+def source_version(stat_result: os.stat_result) -> str:
+    """Version token carried in page and /img URLs; changes whenever the source file is replaced"""
+    return f"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+
+
+def snap_width(width: int) -> int:
+    """Round a requested width up to the next cache bucket (0 means original size)"""
+    if width <= 0:
+        return 0
+    width = min(width, MAX_WIDTH)
+    return ((width + WIDTH_STEP - 1) // WIDTH_STEP) * WIDTH_STEP
+
+
+class DerivativeCache:
+    """Disk-backed LRU cache of resized images with single-flight rendering"""
+
+    def __init__(self, cache_dir: str = DERIVATIVE_CACHE_DIR, max_bytes: int = DERIVATIVE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "renders": 0, "collapsed": 0, "evictions": 0}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        """Rebuild the LRU order from files left by a previous run (least recently used first)"""
+        existing = []
+        for entry in os.scandir(self.cache_dir):
+            # .tmp files are renders in progress (or left by a crash mid-render), not derivatives
+            if entry.is_file() and not entry.name.startswith('.') and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                existing.append((stat.st_atime, entry.name, stat.st_size))
+
+        for _, name, size in sorted(existing):
+            self._entries[name] = size
+            self._total_bytes += size
+
+        self._evict()
+
+    @staticmethod
+    def derivative_key(source_path: str, width: int, fmt: str) -> str:
+        """Content-addressed key: changes whenever the source file or the requested variant changes"""
+        stat = os.stat(source_path)
+        raw = f"{os.path.abspath(source_path)}|{stat.st_mtime_ns}|{stat.st_size}|{width}|{fmt}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    async def get(self, source_path: str, width: int, fmt: str) -> Tuple[str, str]:
+        """Return (derivative path, etag), rendering it first if it isn't cached yet"""
+        extension = OUTPUT_FORMATS[fmt][0]
+        key = self.derivative_key(source_path, width, fmt)
+        name = key + extension
+        path = os.path.join(self.cache_dir, name)
+
+        if self._touch(name) and os.path.exists(path):
+            self.stats["hits"] += 1
+            return path, f'"{key}"'
+
+        # Collapse concurrent requests for the same derivative into one render
+        pending = self._inflight.get(name)
+        if pending is not None:
+            self.stats["collapsed"] += 1
+            await asyncio.shield(pending)
+            return path, f'"{key}"'
+
+        self.stats["misses"] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[name] = future
+        try:
+            size = await loop.run_in_executor(None, self._render, source_path, path, width, fmt)
+            self.stats["renders"] += 1
+            self._add(name, size)
+            future.set_result(path)
+        except Exception as e:
+            future.set_exception(e)
+            # Make sure an unobserved failure doesn't log "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(name, None)
+
+        return path, f'"{key}"'
+
+    def _render(self, source_path: str, target_path: str, width: int, fmt: str) -> int:
+        """Resize the source image and write it atomically into the cache"""
+        _, pil_format, save_options = OUTPUT_FORMATS[fmt]
+
+        try:
+            source = Image.open(source_path)
+        except (Image.UnidentifiedImageError, Image.DecompressionBombError) as e:
+            raise UnsupportedImage(str(e)) from e
+
+        tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with source as image:
+                if width and image.width > width:
+                    height = max(1, round(image.height * width / image.width))
+                    image = image.resize((width, height), Image.LANCZOS)
+
+                if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+
+                image.save(tmp_path, pil_format, **save_options)
+
+            os.replace(tmp_path, target_path)
+        except BaseException:
+            # Don't leave a partial file behind in the cache directory
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return os.path.getsize(target_path)
+
+    def _touch(self, name: str) -> bool:
+        """Mark an entry as recently used; False if it isn't cached"""
+        with self._lock:
+            if name not in self._entries:
+                return False
+            self._entries.move_to_end(name)
+            return True
+
+    def _add(self, name: str, size: int):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used derivatives until the cache fits its size cap"""
+        with self._lock:
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                name, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self.stats["evictions"] += 1
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def get_stats(self) -> Dict:
+        """Return cache counters and current size"""
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def media_type_for(path: str) -> str:
+    """Content type for a cached derivative"""
+    return MEDIA_TYPES.get(os.path.splitext(path)[1], 'application/octet-stream')
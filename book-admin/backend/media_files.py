@@ -0,0 +1,207 @@
+"""
+Media Files Module
+Serve Read to Me audio, video books and audiobooks with HTTP Range / If-Range support
+"""
+
+import os
+import mimetypes
+import secrets
+from email.utils import formatdate, parsedate
+from typing import List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+from static_files import strong_etag, is_not_modified
+
+# Bytes read per chunk when the server can't do zero-copy sends
+MEDIA_CHUNK_SIZE = int(os.environ.get("SHUSPOT_MEDIA_CHUNK_SIZE", 256 * 1024))
+
+# More ranges than this in one request are ignored and the full file is sent instead
+MAX_RANGES = 16
+
+# ASGI extension servers advertise when they can hand an open file to os.sendfile
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+mimetypes.add_type('audio/mp4', '.m4a')
+mimetypes.add_type('audio/aac', '.aac')
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a "bytes=" Range header into inclusive (start, end) pairs.
+    Returns None when the header should be ignored and [] when no range is satisfiable.
+    """
+    unit, _, spec = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if '-' not in part:
+            return None
+        start_text, _, end_text = part.partition('-')
+        start_text, end_text = start_text.strip(), end_text.strip()
+
+        try:
+            if not start_text:
+                # Suffix range: the last N bytes
+                suffix = int(end_text)
+                if suffix <= 0:
+                    continue
+                start, end = max(0, file_size - suffix), file_size - 1
+            else:
+                start = int(start_text)
+                if end_text:
+                    end = int(end_text)
+                    if end < start:
+                        return None
+                    end = min(end, file_size - 1)
+                else:
+                    end = file_size - 1
+        except ValueError:
+            return None
+
+        if start < file_size:
+            ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    return ranges
+
+
+def if_range_matches(if_range: str, etag: str, stat_result: os.stat_result) -> bool:
+    """If-Range holds either a strong ETag or an HTTP date; weak tags never match"""
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+
+    parsed = parsedate(if_range)
+    return parsed is not None and parsed == parsedate(formatdate(stat_result.st_mtime, usegmt=True))
+
+
+def read_at(fd: int, size: int, offset: int) -> bytes:
+    """Positional read; the descriptor belongs to a single response so seeking is safe where pread is missing"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+class RangeFileResponse(Response):
+    """File response that honours Range requests and streams each range without restarting at byte zero"""
+
+    def __init__(self, path: str, stat_result: os.stat_result, request_headers: Headers, method: str = "GET",
+                 chunk_size: int = MEDIA_CHUNK_SIZE, media_type: Optional[str] = None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.send_header_only = method.upper() == "HEAD"
+        self.background = None
+        self.media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+        file_size = stat_result.st_size
+        etag = strong_etag(stat_result)
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "cache-control": "public, max-age=3600",
+        }
+
+        self.ranges: List[Tuple[int, int]] = []
+        self.boundary = None
+        self.part_headers: List[bytes] = []
+        self.status_code = 200
+
+        # If-None-Match / If-Modified-Since are evaluated before Range (RFC 9110 section 13.2.2)
+        not_modified = is_not_modified(request_headers, etag, stat_result)
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        use_range = (not not_modified and range_header is not None
+                     and (if_range is None or if_range_matches(if_range, etag, stat_result)))
+        parsed_ranges = parse_range_header(range_header, file_size) if use_range else None
+
+        if not_modified:
+            self.status_code = 304
+        elif parsed_ranges == []:
+            self.status_code = 416
+            headers["content-range"] = f"bytes */{file_size}"
+            headers["content-length"] = "0"
+        elif parsed_ranges:
+            self.status_code = 206
+            self.ranges = parsed_ranges
+            if len(parsed_ranges) == 1:
+                start, end = parsed_ranges[0]
+                headers["content-range"] = f"bytes {start}-{end}/{file_size}"
+                headers["content-length"] = str(end - start + 1)
+            else:
+                self.boundary = secrets.token_hex(16)
+                content_length = 0
+                for start, end in parsed_ranges:
+                    part_header = (
+                        f"--{self.boundary}\r\n"
+                        f"Content-Type: {self.media_type}\r\n"
+                        f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+                    ).encode('latin-1')
+                    self.part_headers.append(part_header)
+                    content_length += len(part_header) + (end - start + 1) + 2
+                content_length += len(f"--{self.boundary}--\r\n")
+                headers["content-length"] = str(content_length)
+                self.media_type = f"multipart/byteranges; boundary={self.boundary}"
+        else:
+            self.ranges = [(0, file_size - 1)] if file_size else []
+            headers["content-length"] = str(file_size)
+
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if self.send_header_only or self.status_code in (304, 416) or not self.ranges:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+
+        # Each response has its own file and reads with explicit offsets, so any number of
+        # readers can seek around the same file concurrently
+        file = await anyio.to_thread.run_sync(open, self.path, 'rb', 0)
+        fd = file.fileno()
+        try:
+            for index, (start, end) in enumerate(self.ranges):
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": self.part_headers[index], "more_body": True})
+
+                if zerocopy:
+                    # The extension takes the opened file object, not its descriptor
+                    await send({
+                        "type": ZEROCOPY_EXTENSION,
+                        "file": file,
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": True,
+                    })
+                else:
+                    await self._send_range(fd, start, end, send)
+
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+
+            closing = f"--{self.boundary}--\r\n".encode('latin-1') if self.boundary else b""
+            await send({"type": "http.response.body", "body": closing, "more_body": False})
+        finally:
+            file.close()
+
+    async def _send_range(self, fd: int, start: int, end: int, send) -> None:
+        """Read the range in chunks off the event loop; each send waits for the client (backpressure)"""
+        offset = start
+        while offset <= end:
+            size = min(self.chunk_size, end - offset + 1)
+            chunk = await anyio.to_thread.run_sync(read_at, fd, size, offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
@@ -0,0 +1,121 @@
+"""
+Page Cache Module
+Memory-bounded LRU cache of page image bytes so popular books are served from RAM
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Total memory for cached page bytes; SHUSPOT_PAGE_CACHE_MB=0 disables the cache
+PAGE_CACHE_MB = int(os.environ.get("SHUSPOT_PAGE_CACHE_MB", 128))
+
+# Files bigger than this are always streamed from disk
+PAGE_CACHE_MAX_FILE_BYTES = 8 * 1024 * 1024
+
+# Pages loaded ahead of time when a reader opens a book
+PREWARM_PAGES = 6
+
+
+class PageByteCache:
+    """LRU cache of file contents, validated against the file's mtime and size on every lookup"""
+
+    def __init__(self, max_mb: int = PAGE_CACHE_MB, max_file_bytes: int = PAGE_CACHE_MAX_FILE_BYTES):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.max_file_bytes = min(max_file_bytes, self.max_bytes)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # path -> (mtime_ns, size, bytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "prewarmed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def cacheable(self, stat_result: os.stat_result) -> bool:
+        return self.enabled and stat_result.st_size <= self.max_file_bytes
+
+    def get(self, path: str, stat_result: os.stat_result) -> Optional[bytes]:
+        """Return cached bytes if they still match the file on disk"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            mtime_ns, size, data = entry
+            if mtime_ns != stat_result.st_mtime_ns or size != stat_result.st_size:
+                # File was replaced since it was cached
+                del self._entries[path]
+                self._total_bytes -= size
+                self.stats["stale"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(path)
+            self.stats["hits"] += 1
+            return data
+
+    def put(self, path: str, stat_result: os.stat_result, data: bytes):
+        """Store file bytes, evicting least recently used pages to stay within the memory cap"""
+        if not self.cacheable(stat_result) or len(data) != stat_result.st_size:
+            return
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+
+            self._entries[path] = (stat_result.st_mtime_ns, stat_result.st_size, data)
+            self._total_bytes += stat_result.st_size
+
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, (_, size, _) = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self.stats["evictions"] += 1
+
+    def load(self, path: str) -> Optional[bytes]:
+        """Read a file from disk into the cache (blocking; call from a worker thread)"""
+        try:
+            stat_result = os.stat(path)
+            if not self.cacheable(stat_result):
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        self.put(path, stat_result, data)
+        return data
+
+    def prewarm(self, paths: List[str]) -> int:
+        """Load pages that aren't cached yet; returns how many were read"""
+        loaded = 0
+        for path in paths:
+            with self._lock:
+                if path in self._entries:
+                    continue
+            if self.load(path) is not None:
+                loaded += 1
+
+        with self._lock:
+            self.stats["prewarmed"] += loaded
+        return loaded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Return hit-rate metrics and memory usage"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,648 @@
+"""
+Script Sandbox Module
+Run curator scripts (/execute-python-script, /txt-ingestion/execute-script) in a pool of
+pre-started worker processes with CPU-time, memory and wall-clock limits, so a script never
+blocks the event loop, mixes its output with another request's, or takes the API down.
+
+This is resource isolation, not a security boundary: workers run as the server's user, in its
+working directory (books.db, uploads, google_credentials.json are all readable), and scripts
+get `os`. Only the curators who can reach these endpoints should be able to run scripts.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import queue
+import signal
+import asyncio
+import threading
+import traceback
+import pickle
+import select
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; scripts then run without CPU/memory limits
+    resource = None
+
+# Worker processes kept running (one script at a time each)
+SCRIPT_WORKERS = int(os.environ.get("SHUSPOT_SCRIPT_WORKERS", 2))
+
+# Scripts allowed to wait for a free worker before new ones are rejected
+SCRIPT_MAX_PENDING = int(os.environ.get("SHUSPOT_SCRIPT_MAX_PENDING", 8))
+
+# Per-script limits: CPU seconds, address space of the worker, and wall-clock seconds
+SCRIPT_CPU_SECONDS = int(os.environ.get("SHUSPOT_SCRIPT_CPU_SECONDS", 60))
+SCRIPT_MEMORY_MB = int(os.environ.get("SHUSPOT_SCRIPT_MEMORY_MB", 1024))
+SCRIPT_TIMEOUT = float(os.environ.get("SHUSPOT_SCRIPT_TIMEOUT", 120))
+
+# stdout/stderr kept per script; the rest is counted and dropped
+SCRIPT_OUTPUT_MAX_CHARS = int(os.environ.get("SHUSPOT_SCRIPT_OUTPUT_MAX_CHARS", 1_000_000))
+
+# Preview rows a script run returns (or streams); further rows are only counted
+SCRIPT_PREVIEW_MAX_ROWS = int(os.environ.get("SHUSPOT_SCRIPT_PREVIEW_MAX_ROWS", 1000))
+
+# Streaming mode: how often new output/rows are sent, and rows per message at most
+SCRIPT_STREAM_INTERVAL = float(os.environ.get("SHUSPOT_SCRIPT_STREAM_INTERVAL", 0.25))
+SCRIPT_STREAM_ROW_BATCH = 200
+
+# Workers are replaced after this many scripts, since a script can change module state
+SCRIPT_WORKER_MAX_JOBS = int(os.environ.get("SHUSPOT_SCRIPT_WORKER_MAX_JOBS", 50))
+
+# Environment variables passed on to workers; everything else (API keys, cloud credentials) is dropped
+SCRIPT_WORKER_ENV = ("PATH", "HOME", "LANG", "LC_ALL", "TZ", "PYTHONPATH", "SYSTEMROOT")
+
+
+class ScriptPoolBusy(Exception):
+    """Too many scripts are already running or queued"""
+
+
+class ScriptCpuLimitExceeded(BaseException):
+    """Raised in the worker on SIGXCPU; a BaseException so `except Exception` in a script can't swallow it"""
+
+
+class BoundedOutput(io.TextIOBase):
+    """stdout/stderr replacement keeping the first max_chars characters written"""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.dropped = 0
+        self._parts: List[str] = []
+        self._size = 0
+        self._drained = 0  # parts already handed out by drain()
+        self._lock = threading.Lock()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            room = self.max_chars - self._size
+            if room > 0:
+                self._parts.append(text[:room])
+                self._size += min(len(text), room)
+            self.dropped += max(0, len(text) - max(room, 0))
+        return len(text)
+
+    def drain(self) -> str:
+        """Text written since the last drain (streaming mode)"""
+        with self._lock:
+            text = ''.join(self._parts[self._drained:])
+            self._drained = len(self._parts)
+        return text
+
+    def truncation_notice(self) -> str:
+        return f"\n... [output truncated, {self.dropped} more characters]\n" if self.dropped else ""
+
+    def getvalue(self) -> str:
+        with self._lock:
+            return ''.join(self._parts) + self.truncation_notice()
+
+
+def _plain(value):
+    """JSON-safe copy of what a script left behind, so it can cross the pipe and be returned"""
+    return json.loads(json.dumps(value, default=str))
+
+
+def _add_custom_parser(parser):
+    """In a worker, regex parsers are persisted so the API (and every other worker) gets them"""
+    from custom_parsers import add_custom_parser, save_regex_parser
+    if hasattr(parser, 'pattern') and hasattr(parser, 'field_mapping'):
+        save_regex_parser(parser.get_name(), parser.pattern, parser.field_mapping, parser.get_priority())
+    else:
+        add_custom_parser(parser)
+
+
+def _python_globals(params: Dict) -> Dict:
+    """Environment of /execute-python-script: a short builtins list, plus `os` and the parser helpers"""
+    from txt_ingestion import TxtMetadataParser
+    from custom_parsers import get_custom_parsers, parse_with_custom_parsers, create_regex_parser
+    return {
+        '__builtins__': {
+            'print': print,
+            'len': len,
+            'str': str,
+            'int': int,
+            'float': float,
+            'list': list,
+            'dict': dict,
+            'range': range,
+            'enumerate': enumerate,
+        },
+        'os': os,
+        'json': json,
+        'TxtMetadataParser': TxtMetadataParser,
+        'sheets_manager': None,  # kept so old scripts' `if sheets_manager:` checks still run; never set
+        'root_directory': params.get('root_directory'),
+        'get_custom_parsers': get_custom_parsers,
+        'parse_with_custom_parsers': parse_with_custom_parsers,
+        'add_custom_parser': _add_custom_parser,
+        'create_regex_parser': create_regex_parser,
+    }
+
+
+def _txt_globals(params: Dict) -> Dict:
+    """
+    Environment of /txt-ingestion/execute-script: full builtins plus os/re/glob/pathlib. Books a
+    script appends to `results` are uploaded by the API process when the request asks for it
+    (upload_to_sheets / upload_to_database); there is no Sheets client in the worker
+    """
+    import re
+    import glob
+    import pathlib
+    from txt_ingestion import TxtMetadataParser
+    return {
+        'root_directory': params.get('root_directory'),
+        'sheets_manager': None,  # kept so old scripts' `if sheets_manager:` checks still run; never set
+        'TxtMetadataParser': TxtMetadataParser,
+        'parser': None,
+        'os': os,
+        'json': json,
+        're': re,
+        'glob': glob,
+        'pathlib': pathlib,
+        'results': [],  # To collect results
+        'preview_data': [],  # To collect preview data
+    }
+
+
+SCRIPT_ENVIRONMENTS = {
+    "python": _python_globals,
+    "txt": _txt_globals,
+}
+
+
+def _cpu_used() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _on_cpu_limit(signum, frame):
+    raise ScriptCpuLimitExceeded()
+
+
+class _JobStreamer(threading.Thread):
+    """
+    Streaming mode, in the worker: every SCRIPT_STREAM_INTERVAL seconds send the output written
+    since the last send and the preview rows appended since then (up to the job's row cap).
+    Rows are read from whatever list the script's preview variable currently names, so scripts
+    that start with `preview_data = []` stream too. A slow reader blocks this thread on the
+    pipe, not the script; what piles up meanwhile is bounded by the output and row caps.
+    """
+
+    def __init__(self, send, stdout: BoundedOutput, stderr: BoundedOutput, job: Dict):
+        super().__init__(name="script-stream", daemon=True)
+        self.send = send
+        self.stdout = stdout
+        self.stderr = stderr
+        self.row_variable = job.get("row_variable")
+        self.max_rows = job.get("max_rows", SCRIPT_PREVIEW_MAX_ROWS)
+        self.script_globals: Dict = {}
+        self._rows = None
+        self._sent_rows = 0
+        self._reported_total = 0
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self):
+        while not self._stopped.wait(SCRIPT_STREAM_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            for kind, output in (("output", self.stdout), ("stderr", self.stderr)):
+                text = output.drain()
+                if text:
+                    self.send((kind, text))
+
+            rows = self.script_globals.get(self.row_variable) if self.row_variable else None
+            if not isinstance(rows, list):
+                return
+            if rows is not self._rows:
+                self._rows, self._sent_rows = rows, 0
+            total = len(rows)
+            while self._sent_rows < min(total, self.max_rows):
+                end = min(total, self.max_rows, self._sent_rows + SCRIPT_STREAM_ROW_BATCH)
+                try:
+                    batch = _plain(rows[self._sent_rows:end])
+                except (RuntimeError, ValueError):
+                    return  # a row changed while being copied; send it next time
+                self._sent_rows = end
+                self._reported_total = total
+                self.send(("rows", {"rows": batch, "total": total}))
+            if total != self._reported_total:
+                self._reported_total = total
+                self.send(("rows", {"rows": [], "total": total}))  # past the cap: count only
+
+    def finish(self):
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+        self.flush()
+
+
+def _collect_variables(script_globals: Dict, job: Dict, streamed: bool) -> Dict:
+    """JSON-safe values of the requested variables; the preview list is capped (or left out if streamed)"""
+    variables = {}
+    row_variable = job.get("row_variable")
+    for name in job["variables"]:
+        value = script_globals.get(name)
+        if name == row_variable and isinstance(value, list):
+            variables[f"{name}_total"] = len(value)
+            if streamed:
+                continue
+            value = value[:job.get("max_rows", SCRIPT_PREVIEW_MAX_ROWS)]
+        variables[name] = _plain(value)
+    return variables
+
+
+def _run_job(job: Dict, send=None) -> Dict:
+    """
+    Execute one script in this worker and collect its output and requested variables.
+    In streaming mode (job["stream"]) output and preview rows go out through send() while the
+    script runs, and the result carries only what wasn't streamed.
+    """
+    stdout = BoundedOutput(job["max_output_chars"])
+    stderr = BoundedOutput(job["max_output_chars"])
+    streamer = _JobStreamer(send, stdout, stderr, job) if job.get("stream") and send else None
+    result = {"success": False, "error": "", "variables": {}, "timed_out": False}
+    started = time.perf_counter()
+    cpu_start = _cpu_used() if resource else 0.0
+
+    if resource:
+        # Only the soft limit moves (it can go back up later); SIGXCPU then repeats every second
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = int(cpu_start) + job["cpu_seconds"] + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        script_globals = SCRIPT_ENVIRONMENTS[job["kind"]](job["params"])
+        if streamer:
+            streamer.script_globals = script_globals
+            streamer.start()
+        exec(job["script"], script_globals)
+        result["variables"] = _collect_variables(script_globals, job, streamed=bool(streamer))
+        result["success"] = True
+    except ScriptCpuLimitExceeded:
+        result["error"] = f"CPU time limit of {job['cpu_seconds']}s exceeded"
+    except MemoryError:
+        result["error"] = f"Memory limit of {job['memory_mb']} MB exceeded"
+    except Exception as e:
+        result["error"] = f"{str(e)}\n{traceback.format_exc()}"
+    finally:
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+        if resource:
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        if streamer:
+            streamer.finish()
+
+    result.update({
+        # Streamed output was already sent; only the truncation notice is left to report
+        "output": stdout.truncation_notice() if streamer else stdout.getvalue(),
+        "stderr": stderr.truncation_notice() if streamer else stderr.getvalue(),
+        "output_truncated": bool(stdout.dropped or stderr.dropped),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "cpu_seconds": round(_cpu_used() - cpu_start, 3) if resource else None,
+    })
+    return result
+
+
+def _worker_main(memory_mb: int):
+    """Worker process: apply the memory limit once, then run jobs received over stdin"""
+    # Keep the pipes to ourselves: a script printing straight to fd 1 lands on stderr instead
+    requests = os.fdopen(os.dup(0), 'rb')
+    replies = os.fdopen(os.dup(1), 'wb')
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(2, 1)
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C on the server is handled by the parent
+    if resource:
+        limit = memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+    # Load what scripts use before the first job arrives
+    import txt_ingestion  # noqa: F401
+    import custom_parsers  # noqa: F401
+
+    send_lock = threading.Lock()
+
+    def send(message: tuple):
+        data = pickle.dumps(message)
+        with send_lock:
+            replies.write(struct.pack('>I', len(data)) + data)  # length-prefixed frames
+            replies.flush()
+
+    # Messages are (kind, payload): "output"/"stderr"/"rows" while streaming, then one "done"
+    while True:
+        try:
+            job = pickle.load(requests)
+        except (EOFError, OSError, pickle.UnpicklingError):
+            return
+        if job is None:
+            return
+        try:
+            result = _run_job(job, send)
+            pickle.dumps(result)
+        except Exception as e:
+            result = {"success": False, "error": f"Could not return script result: {str(e)}",
+                      "variables": {}, "output": "", "stderr": "", "timed_out": False}
+        send(("done", result))
+
+
+class ScriptWorker:
+    """One worker process (this module run as a script) and the pipes to its stdin/stdout"""
+
+    def __init__(self, memory_mb: int):
+        # A fresh interpreter: it doesn't inherit the server's threads, sockets, Sheets client or
+        # secrets in its environment. It does share the working directory, which database.py and
+        # the custom parser store need
+        env = {name: value for name, value in os.environ.items()
+               if name in SCRIPT_WORKER_ENV or name.startswith("SHUSPOT_")}
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(memory_mb)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+        )
+        self.jobs = 0
+        self._buffer = bytearray()  # reply bytes read but not yet decoded
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def send(self, job: Dict):
+        pickle.dump(job, self.process.stdin)
+        self.process.stdin.flush()
+
+    def receive(self, timeout: float) -> Optional[tuple]:
+        """The worker's next (kind, payload) message, or None if none came within timeout seconds"""
+        deadline = time.monotonic() + timeout
+        fd = self.process.stdout.fileno()
+        while True:
+            if len(self._buffer) >= 4:
+                size = struct.unpack('>I', self._buffer[:4])[0]
+                if len(self._buffer) >= 4 + size:
+                    message = pickle.loads(self._buffer[4:4 + size])
+                    del self._buffer[:4 + size]
+                    return message
+            ready, _, _ = select.select([fd], [], [], max(0.0, deadline - time.monotonic()))
+            if not ready:
+                return None
+            chunk = os.read(fd, 1 << 20)
+            if not chunk:
+                raise EOFError("script worker closed its pipe")
+            self._buffer += chunk
+
+    def stop(self):
+        try:
+            self.send(None)
+            self.process.wait(1)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            pass
+        self.kill()
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+
+class ScriptWorkerPool:
+    """Pre-started script workers; each run takes an idle worker and talks to it over its pipe"""
+
+    def __init__(
+        self,
+        workers: int = SCRIPT_WORKERS,
+        max_pending: int = SCRIPT_MAX_PENDING,
+        timeout: float = SCRIPT_TIMEOUT,
+        cpu_seconds: int = SCRIPT_CPU_SECONDS,
+        memory_mb: int = SCRIPT_MEMORY_MB,
+        max_output_chars: int = SCRIPT_OUTPUT_MAX_CHARS,
+        max_jobs: int = SCRIPT_WORKER_MAX_JOBS,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_output_chars = max_output_chars
+        self.max_jobs = max_jobs
+        self._idle: "queue.Queue[ScriptWorker]" = queue.Queue()
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._started = False
+        self._waiters = ThreadPoolExecutor(max_workers=workers + max_pending, thread_name_prefix="script-wait")
+        self.stats = {"runs": 0, "failed": 0, "timeouts": 0, "crashed": 0, "rejected": 0, "restarts": 0,
+                      "in_flight": 0}
+
+    def start(self):
+        """Start the worker processes (also done on first use)"""
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.workers):
+                self._idle.put(ScriptWorker(self.memory_mb))
+            self._started = True
+
+    def _replace(self, worker: ScriptWorker) -> ScriptWorker:
+        worker.kill()
+        self.stats["restarts"] += 1
+        return ScriptWorker(self.memory_mb)
+
+    def _acquire_slot(self):
+        if not self._slots.acquire(blocking=False):
+            self.stats["rejected"] += 1
+            raise ScriptPoolBusy("Too many scripts running, try again shortly")
+
+    def _job(self, kind: str, script: str, params: Optional[Dict], variables, **options) -> Dict:
+        return {
+            "kind": kind, "script": script, "params": params or {}, "variables": list(variables),
+            "cpu_seconds": self.cpu_seconds, "memory_mb": self.memory_mb,
+            "max_output_chars": self.max_output_chars, **options,
+        }
+
+    def _checkout(self) -> ScriptWorker:
+        """Wait for an idle worker (blocking) and make sure it's still running"""
+        self.start()
+        worker = self._idle.get()
+        self.stats["runs"] += 1
+        self.stats["in_flight"] += 1
+        if not worker.alive():
+            worker = self._replace(worker)
+        return worker
+
+    def _checkin(self, worker: ScriptWorker, finished: bool, result: Dict):
+        """Return a worker to the pool; one stopped mid-job is replaced, an old one recycled"""
+        try:
+            if not finished:
+                worker = self._replace(worker)
+            else:
+                worker.jobs += 1
+                if worker.jobs >= self.max_jobs:
+                    worker.stop()
+                    worker = ScriptWorker(self.memory_mb)
+                    self.stats["restarts"] += 1
+        finally:
+            self.stats["in_flight"] -= 1
+            self._idle.put(worker)
+        if not result.get("success"):
+            self.stats["failed"] += 1
+
+    def _timeout_result(self, timeout: float) -> Dict:
+        self.stats["timeouts"] += 1
+        return {"success": False, "timed_out": True, "variables": {}, "output": "", "stderr": "",
+                "error": f"Script timed out after {timeout:g}s"}
+
+    def _crash_result(self, worker: ScriptWorker) -> Dict:
+        # The worker died mid-script: killed at the hard CPU limit, out of memory, or a crash
+        self.stats["crashed"] += 1
+        try:
+            exit_code = worker.process.wait(timeout=1)  # the pipe closes just before the exit is reaped
+        except subprocess.TimeoutExpired:
+            exit_code = None
+        return {"success": False, "timed_out": False, "variables": {}, "output": "", "stderr": "",
+                "error": f"Script worker exited unexpectedly (exit code {exit_code}); "
+                         f"the script may have exceeded its memory or CPU limit"}
+
+    def run(self, kind: str, script: str, params: Dict = None, variables: List[str] = (),
+            timeout: Optional[float] = None, **options) -> Dict:
+        """
+        Run a script in a worker (blocking). Returns success, output, stderr, error, timed_out and
+        the JSON-safe values of the requested global variables after the script finished.
+        options: row_variable/max_rows cap the preview list returned for that variable.
+        """
+        self._acquire_slot()
+        try:
+            return self._run(self._job(kind, script, params, variables, **options), timeout or self.timeout)
+        finally:
+            self._slots.release()
+
+    def _run(self, job: Dict, timeout: float) -> Dict:
+        worker = self._checkout()
+        finished = False
+        result = {}
+        try:
+            worker.send(job)
+            deadline = time.monotonic() + timeout
+            while True:
+                message = worker.receive(max(0.0, deadline - time.monotonic()))
+                if message is None:
+                    result = self._timeout_result(timeout)
+                    break
+                if message[0] == "done":
+                    result, finished = message[1], True
+                    break
+        except (EOFError, OSError, pickle.UnpicklingError):
+            result = self._crash_result(worker)
+        finally:
+            self._checkin(worker, finished, result)
+        return result
+
+    async def run_async(self, kind: str, script: str, params: Dict = None, variables: List[str] = (),
+                        timeout: Optional[float] = None, **options) -> Dict:
+        """run() without blocking the event loop; raises ScriptPoolBusy before queueing if full"""
+        self._acquire_slot()
+        job = self._job(kind, script, params, variables, **options)
+
+        def invoke():
+            try:
+                return self._run(job, timeout or self.timeout)
+            finally:
+                self._slots.release()
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._waiters, invoke)
+        except BaseException:
+            self._slots.release()
+            raise
+        # shield: a disconnected client doesn't abandon the worker mid-job
+        return await asyncio.shield(future)
+
+    async def stream(self, kind: str, script: str, params: Dict = None, variables: List[str] = (),
+                     timeout: Optional[float] = None, **options) -> AsyncIterator[tuple]:
+        """
+        Run a script in streaming mode, yielding ("started", {"timeout"}) once a worker has the
+        job, ("output" | "stderr", text) and ("rows",
+        {"rows", "total"}) messages as the worker sends them, then ("done", result) where result
+        is run()'s minus the already streamed output and preview rows. Messages are read from the
+        worker only as fast as the caller consumes them. If the caller stops early (client gone),
+        the worker is replaced.
+        """
+        self._acquire_slot()
+        loop = asyncio.get_running_loop()
+        timeout = timeout or self.timeout
+        try:
+            worker = await loop.run_in_executor(self._waiters, self._checkout)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        finished = False
+        result = {}
+        try:
+            worker.send(self._job(kind, script, params, variables, stream=True, **options))
+            deadline = time.monotonic() + timeout
+            yield ("started", {"timeout": timeout})
+            while True:
+                remaining = max(0.0, deadline - time.monotonic())
+                try:
+                    message = await loop.run_in_executor(self._waiters, worker.receive, remaining)
+                except (EOFError, OSError, pickle.UnpicklingError):
+                    result = self._crash_result(worker)
+                    break
+                if message is None:
+                    result = self._timeout_result(timeout)
+                    break
+                if message[0] == "done":
+                    result, finished = message[1], True
+                    break
+                yield message
+        finally:
+            # Not awaited: this also runs when the generator is closed early, and replacing or
+            # recycling a worker can take a moment
+            self._waiters.submit(self._release, worker, finished, result or {"success": False})
+        yield ("done", result)
+
+    def _release(self, worker: ScriptWorker, finished: bool, result: Dict):
+        try:
+            self._checkin(worker, finished, result)
+        finally:
+            self._slots.release()
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "idle": self._idle.qsize(),
+            "max_pending": self.max_pending,
+            "timeout": self.timeout,
+            "cpu_seconds": self.cpu_seconds,
+            "memory_mb": self.memory_mb,
+        }
+
+    def shutdown(self):
+        self._waiters.shutdown(wait=False, cancel_futures=True)
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+
+if __name__ == "__main__":
+    _worker_main(int(sys.argv[1]) if len(sys.argv) > 1 else SCRIPT_MEMORY_MB)
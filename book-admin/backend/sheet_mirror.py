@@ -0,0 +1,170 @@
+"""
+Sheet Mirror Module
+In-process copy of the master worksheet rows so reads, pagination and duplicate
+checks don't download the whole sheet on every call
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional, Set
+
+# How long a loaded mirror is trusted before the sheet's revision is checked again
+SHEETS_MIRROR_TTL_SECONDS = 60
+
+
+def book_key(name, author) -> str:
+    """Duplicate-check key used for the master sheet (Name + Author, case-insensitive)"""
+    return f"{str(name or '').lower()}_{str(author or '').lower()}"
+
+
+class SheetSnapshot:
+    """TTL and revision bookkeeping shared by the in-process sheet caches"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.revision = 0  # bumped on every load and every local write
+        self.remote_modified: Optional[str] = None  # Drive modifiedTime seen when last validated
+        self.loaded_at = 0.0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def is_fresh(self) -> bool:
+        return self._loaded and (time.monotonic() - self.loaded_at) < self.ttl_seconds
+
+    def _mark_loaded(self, remote_modified: Optional[str]):
+        self.remote_modified = remote_modified
+        self.loaded_at = time.monotonic()
+        self.revision += 1
+        self._loaded = True
+
+    def touch(self, remote_modified: Optional[str] = None):
+        """Extend the TTL after a revision check showed the sheet hasn't changed"""
+        with self._lock:
+            if remote_modified is not None:
+                self.remote_modified = remote_modified
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Force the next read to download the sheet again"""
+        with self._lock:
+            self._loaded = False
+
+
+class SheetMirror(SheetSnapshot):
+    """Rows of one worksheet with a TTL and a local revision counter"""
+
+    def __init__(self, ttl_seconds: int = SHEETS_MIRROR_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.header: List[str] = []
+        self.records: List[Dict] = []  # records[i] lives in sheet row i + 2
+        self._indexes: Dict[str, tuple] = {}  # field -> (revision, {value: [row indexes]})
+
+    def load(self, header: List[str], records: List[Dict], remote_modified: Optional[str] = None):
+        """Replace the mirror with a fresh download of the sheet"""
+        with self._lock:
+            self.header = list(header)
+            self.records = list(records)
+            self._mark_loaded(remote_modified)
+
+    def snapshot(self) -> List[Dict]:
+        """Shallow copy of the rows that callers can slice freely"""
+        with self._lock:
+            return list(self.records)
+
+    def append(self, records: List[Dict]):
+        """Record rows that were just appended to the sheet"""
+        with self._lock:
+            self.records.extend(records)
+            self.revision += 1
+
+    def update_row(self, index: int, fields: Dict):
+        """Record cell updates written to records[index]"""
+        with self._lock:
+            self.records[index].update(fields)
+            self.revision += 1
+
+    def find_rows(self, field: str, value) -> List[int]:
+        """Indexes of rows whose field equals value, via a per-revision value -> rows index"""
+        with self._lock:
+            cached = self._indexes.get(field)
+            if cached is None or cached[0] != self.revision:
+                index: Dict = {}
+                for i, record in enumerate(self.records):
+                    index.setdefault(record.get(field), []).append(i)
+                cached = (self.revision, index)
+                self._indexes[field] = cached
+            return list(cached[1].get(value, []))
+
+    @staticmethod
+    def row_number(index: int) -> int:
+        """Sheet row for records[index] (+2: sheets are 1-indexed and row 1 holds headers)"""
+        return index + 2
+
+
+class SheetKeyIndex(SheetSnapshot):
+    """Name/Author duplicate key of every row, loadable from just those two columns"""
+
+    def __init__(self, ttl_seconds: int = SHEETS_MIRROR_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.row_keys: List[str] = []  # row_keys[i] belongs to sheet row i + 2 ('' for rows without a key)
+        self._positions: Dict[str, List[int]] = {}
+
+    def load(self, row_keys: List[str], remote_modified: Optional[str] = None):
+        with self._lock:
+            self.row_keys = list(row_keys)
+            self._positions = {}
+            for i, key in enumerate(self.row_keys):
+                if key:
+                    self._positions.setdefault(key, []).append(i)
+            self._mark_loaded(remote_modified)
+
+    def has_key(self, key: str) -> bool:
+        return key in self._positions
+
+    def keys(self) -> Set[str]:
+        with self._lock:
+            return set(self._positions)
+
+    def find(self, key: str) -> List[int]:
+        """Row indexes (sheet row - 2) carrying key"""
+        with self._lock:
+            return list(self._positions.get(key, []))
+
+    def append(self, keys: List[str], start: Optional[int] = None):
+        """Record keys of rows appended at row index start (default: after the last known row)"""
+        with self._lock:
+            start = len(self.row_keys) if start is None else start
+            if start > len(self.row_keys):
+                self.row_keys.extend([''] * (start - len(self.row_keys)))
+            for offset, key in enumerate(keys):
+                index = start + offset
+                if index < len(self.row_keys):
+                    self._set(index, key)
+                else:
+                    self.row_keys.append(key)
+                    self._positions.setdefault(key, []).append(index)
+            self.revision += 1
+
+    def update_row(self, index: int, key: str):
+        with self._lock:
+            if index < len(self.row_keys) and self.row_keys[index] != key:
+                self._set(index, key)
+                self.revision += 1
+
+    def _set(self, index: int, key: str):
+        old_key = self.row_keys[index]
+        if old_key:
+            positions = self._positions.get(old_key, [])
+            if index in positions:
+                positions.remove(index)
+            if not positions:
+                self._positions.pop(old_key, None)
+        self.row_keys[index] = key
+        if key:
+            positions = self._positions.setdefault(key, [])
+            positions.append(index)
+            positions.sort()
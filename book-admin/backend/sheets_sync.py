@@ -0,0 +1,403 @@
+"""
+Sheets Sync Module
+Incremental sync between the local book database and the Google Sheets master sheet
+"""
+
+import json
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+
+from database import Book, SheetSyncState
+from sheet_mirror import book_key
+
+# Rows pushed per batched write; sync state is committed after each chunk so a failed
+# run resumes where it stopped
+SYNC_CHUNK_SIZE = 200
+
+# Master sheet columns filled from the DB; only these are hashed and diffed (Date Added /
+# Date Modified are stamped by the sheet writer, Notes has no column)
+SYNCED_COLUMNS = ('Name', 'Category', 'Media', 'Fiction Type', 'URL', 'Author', 'Age', 'Status')
+
+# Rows written per bulk update when importing curator edits back into the DB
+IMPORT_CHUNK_SIZE = 1000
+
+# Sheet column -> Book attribute for the fields curators edit in the master sheet
+SHEET_TO_BOOK_FIELDS = {
+    'Name': 'title',
+    'Author': 'author',
+    'Category': 'genre',
+    'Fiction Type': 'fiction_type',
+}
+
+# Field-level merge rules: 'sheet' takes the sheet value, 'db' keeps the DB value,
+# 'fill' takes the sheet value only where the DB has nothing
+DEFAULT_MERGE_RULES = {
+    'title': 'db',
+    'author': 'db',
+    'genre': 'sheet',
+    'fiction_type': 'sheet',
+}
+
+MERGE_RULE_CHOICES = {'sheet', 'db', 'fill'}
+IMPORT_STRATEGIES = {'last_writer_wins', 'merge'}
+
+
+def book_to_sheet_row(book: Book) -> Dict:
+    """Convert a local Book into the ShuSpot Google Sheets row format"""
+    # Determine media type based on file extension and book_type
+    media_type = 'Book'  # Default
+    if book.file_type:
+        file_ext = book.file_type.upper()
+        if file_ext in ['MP4', 'MOV', 'AVI', 'MKV', 'WEBM']:
+            media_type = 'Video'
+        elif file_ext in ['MP3', 'M4A', 'WAV', 'AAC']:
+            media_type = 'Audio'
+        elif file_ext == 'PDF':
+            media_type = 'PDF'
+        elif book.book_type == 'Audiobooks':
+            media_type = 'Audio'
+        elif book.book_type == 'Video Books':
+            media_type = 'Video'
+
+    # Convert reading level to age range
+    age_range = ''
+    if book.reading_level and book.reading_level != 'Unknown':
+        reading_level = book.reading_level.lower()
+        if 'pre-k' in reading_level or 'kindergarten' in reading_level or 'grade 1' in reading_level or 'grade 2' in reading_level:
+            age_range = '4-7'
+        elif 'grade 3' in reading_level or 'grade 4' in reading_level or 'grade 5' in reading_level:
+            age_range = '8-10'
+        elif 'grade 6' in reading_level or 'grade 7' in reading_level or 'grade 8' in reading_level:
+            age_range = '11-13'
+        elif 'grade 9' in reading_level or 'high school' in reading_level:
+            age_range = '14-18'
+
+    return {
+        'Name': book.title or '',
+        'Category': book.genre if book.genre != 'Unknown' else '',
+        'Media': media_type,
+        'Fiction Type': book.fiction_type or 'Fiction',
+        'URL': book.file_path or '',
+        'Author': book.author or '',
+        'Age': age_range,
+        'Status': 'Active'
+    }
+
+
+def row_hash(record: Dict) -> str:
+    """Stable hash of the synced columns of a row, whether built from a Book or read from the sheet"""
+    payload = {column: str(record.get(column) or '') for column in SYNCED_COLUMNS}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class DbToSheetsSync:
+    """Push only inserted, changed and deleted books to the master sheet"""
+
+    def __init__(self, db: Session, sheets_manager, chunk_size: int = SYNC_CHUNK_SIZE):
+        self.db = db
+        self.sheets_manager = sheets_manager
+        self.chunk_size = chunk_size
+
+    def run(self) -> Dict:
+        manager = self.sheets_manager
+        refreshed = set()
+
+        def keys_of(target):
+            # Each worksheet's key index is checked against the sheet once per run, and only if a
+            # book routes there
+            if id(target) not in refreshed:
+                target.refresh_keys(check_remote=True)
+                refreshed.add(id(target))
+            return target.key_index
+
+        revision = (self.db.query(func.max(SheetSyncState.synced_revision)).scalar() or 0) + 1
+        states = {state.book_id: state for state in self.db.query(SheetSyncState).all()}
+        books = self.db.query(Book).all()
+
+        inserts: List[tuple] = []  # (book id, target manager, record, hash)
+        updates: List[tuple] = []  # (book id, target manager, row key, record, hash)
+        moved: List[tuple] = []  # (old manager, key) rows left behind when a book changed shard
+        unchanged = 0
+
+        for book in books:
+            record = book_to_sheet_row(book)
+            digest = row_hash(record)
+            state = states.get(book.id)
+            target = manager.route(record)
+
+            if state and state.status == 'synced' and state.row_hash == digest:
+                unchanged += 1
+                continue
+
+            # A book whose Media/Category changed moves: the old row is soft-deleted in its shard
+            previous = manager.manager_for_worksheet(state.worksheet) if state and state.worksheet else None
+            if previous is not None and previous is not target:
+                moved.append((previous, state.sheet_key))
+                state = None
+
+            # Find the existing row under the key it was last written with (titles can change),
+            # falling back to the current key for books synced before state was tracked
+            lookup_key = state.sheet_key if state else book_key(record['Name'], record['Author'])
+            if keys_of(target).find(lookup_key):
+                updates.append((book.id, target, lookup_key, record, digest))
+            else:
+                inserts.append((book.id, target, record, digest))
+
+        live_ids = {book.id for book in books}
+        deletes = [state for book_id, state in states.items() if book_id not in live_ids and state.status != 'deleted']
+
+        summary = {
+            "revision": revision,
+            "inserted": 0,
+            "updated": 0,
+            "deleted": 0,
+            "moved": len(moved),
+            "unchanged": unchanged,
+            "pending": len(inserts) + len(updates) + len(deletes),
+            "completed": False,
+            "error": None
+        }
+
+        try:
+            for target, chunk in self._chunks_by_manager(updates, 1):
+                # Rows are written by position, so positions are looked up right before the write
+                target.refresh_keys(check_remote=True)
+                verified = target.key_index.remote_modified
+                written = []
+                for book_id, _, key, record, digest in chunk:
+                    rows = target.key_index.find(key)
+                    if rows:
+                        written.append((book_id, rows[0], record, digest))
+                    else:
+                        # The row was removed from the sheet since the diff; append it again
+                        inserts.append((book_id, target, record, digest))
+                if written:
+                    target.update_records([(index, record) for _, index, record, _ in written], verified)
+                for book_id, _, record, digest in written:
+                    self._mark(states, book_id, record, digest, 'synced', revision, target)
+                self.db.commit()
+                summary["updated"] += len(written)
+                summary["pending"] -= len(written)
+
+            # Soft-delete rows of moved books before their new rows go in, so a failed
+            # run never leaves a book in two shards with its state pointing at the new one
+            for previous, chunk in self._chunks_by_manager(moved, 0):
+                self._soft_delete(previous, [key for _, key in chunk])
+
+            for target, chunk in self._chunks_by_manager(inserts, 1):
+                target.append_records([record for _, _, record, _ in chunk])
+                for book_id, _, record, digest in chunk:
+                    self._mark(states, book_id, record, digest, 'synced', revision, target)
+                self.db.commit()
+                summary["inserted"] += len(chunk)
+                summary["pending"] -= len(chunk)
+
+            # Rows synced before sharding was turned on aren't in any shard (target None)
+            removals = [(manager.manager_for_worksheet(state.worksheet) if manager.shard_by else manager, state)
+                        for state in deletes]
+            for target, chunk in self._chunks_by_manager(removals, 0):
+                if target is not None:
+                    self._soft_delete(target, [state.sheet_key for _, state in chunk])
+                for _, state in chunk:
+                    state.status = 'deleted'
+                    state.synced_revision = revision
+                    state.synced_at = datetime.utcnow()
+                self.db.commit()
+                summary["deleted"] += len(chunk)
+                summary["pending"] -= len(chunk)
+
+            summary["completed"] = True
+
+        except Exception as e:
+            # Everything committed so far stays synced; the next run picks up the rest
+            self.db.rollback()
+            summary["error"] = str(e)
+            print(f"Sync stopped after partial progress: {e}")
+
+        return summary
+
+    def _soft_delete(self, target, keys: List[str]):
+        """Mark every row carrying one of keys as Deleted in the target worksheet"""
+        target.refresh_keys(check_remote=True)
+        soft_deletes = [(index, {'Status': 'Deleted'}) for key in keys for index in target.key_index.find(key)]
+        if soft_deletes:
+            target.update_records(soft_deletes, target.key_index.remote_modified)
+
+    def _chunks_by_manager(self, items: List[tuple], position: int) -> List[tuple]:
+        """(manager, chunk) pairs: items grouped by the manager at item[position], then chunked"""
+        grouped: Dict[int, tuple] = {}
+        for item in items:
+            target = item[position]
+            grouped.setdefault(id(target), (target, []))[1].append(item)
+        return [(target, chunk) for target, group in grouped.values() for chunk in self._chunks(group)]
+
+    def _chunks(self, items: List) -> List[List]:
+        return [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+
+    def _mark(self, states: Dict, book_id: int, record: Dict, digest: str, status: str, revision: int, target):
+        state = states.get(book_id)
+        if state is None:
+            state = SheetSyncState(book_id=book_id)
+            self.db.add(state)
+            states[book_id] = state
+        state.sheet_key = book_key(record['Name'], record['Author'])
+        state.worksheet = target.worksheet_title
+        state.row_hash = digest
+        state.status = status
+        state.synced_revision = revision
+        state.synced_at = datetime.utcnow()
+
+
+def parse_sheet_datetime(value) -> Optional[datetime]:
+    """
+    Date Added / Date Modified as written by GoogleSheetsManager (or a bare date typed by hand).
+    The sheet holds server-local time; the result is naive UTC to compare with DB timestamps.
+    """
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            local = datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            continue
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+    return None
+
+
+def sheet_value_for(attribute: str, value) -> str:
+    """Sheet cell -> Book attribute value (blank categories are stored as 'Unknown' locally)"""
+    value = str(value or '').strip()
+    if attribute == 'genre' and not value:
+        return 'Unknown'
+    return value
+
+
+def is_blank(value) -> bool:
+    return value is None or str(value).strip() in ('', 'Unknown')
+
+
+def import_merge_rules(strategy: str, rules: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Check import options before any work starts; returns the full merge rules or raises ValueError"""
+    if strategy not in IMPORT_STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', expected one of {sorted(IMPORT_STRATEGIES)}")
+    merge_rules = {**DEFAULT_MERGE_RULES, **(rules or {})}
+    invalid = {k: v for k, v in merge_rules.items() if k not in DEFAULT_MERGE_RULES or v not in MERGE_RULE_CHOICES}
+    if invalid:
+        raise ValueError(f"Invalid merge rules: {invalid}")
+    return merge_rules
+
+
+class SheetsToDbImport:
+    """Pull curator edits from the master sheet into the local books table"""
+
+    def __init__(self, db: Session, sheets_manager, strategy: str = 'last_writer_wins',
+                 rules: Optional[Dict[str, str]] = None, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.db = db
+        self.sheets_manager = sheets_manager
+        self.strategy = strategy
+        self.rules = import_merge_rules(strategy, rules)
+        self.chunk_size = chunk_size
+
+    def run(self, dry_run: bool = False) -> Dict:
+        # Every synced column, so a row's hash can be compared with the one recorded at the last push
+        rows = self.sheets_manager.read_columns(list(SYNCED_COLUMNS) + ['Date Modified'])
+
+        # Build side of the hash join: every book once, keyed by file path and by title/author
+        books = self.db.query(Book).options(load_only(
+            Book.id, Book.title, Book.author, Book.genre, Book.fiction_type, Book.file_path, Book.file_type,
+            Book.book_type, Book.reading_level, Book.uploaded_at
+        )).all()
+        by_path = {book.file_path: book for book in books if book.file_path}
+        by_key = {}
+        for book in books:
+            by_key.setdefault(book_key(book.title, book.author), book)
+        states = {state.book_id: state for state in self.db.query(SheetSyncState).filter(SheetSyncState.status == 'synced')}
+
+        summary = {
+            "rows": len(rows),
+            "matched": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "kept_db": 0,
+            "unmatched": 0,
+            "skipped_deleted": 0,
+            "dry_run": dry_run,
+            "strategy": self.strategy,
+            "changes": []
+        }
+        updates: List[Dict] = []
+        seen_ids = set()
+
+        # Probe side: one pass over the sheet rows
+        for row in rows:
+            if str(row.get('Status', '')).strip().lower() == 'deleted':
+                summary["skipped_deleted"] += 1
+                continue
+
+            book = by_path.get(row.get('URL')) or by_key.get(book_key(row.get('Name'), row.get('Author')))
+            if book is None:
+                summary["unmatched"] += 1
+                continue
+            if book.id in seen_ids:
+                # Several rows for one book: the first row wins, later ones are reported by the duplicate finder
+                continue
+            seen_ids.add(book.id)
+            summary["matched"] += 1
+
+            changes = self._resolve(book, row, states.get(book.id))
+            if changes is None:
+                summary["kept_db"] += 1
+            elif not changes:
+                summary["unchanged"] += 1
+            else:
+                updates.append({'id': book.id, **{attr: new for attr, (_, new) in changes.items()}})
+                if len(summary["changes"]) < 100:
+                    summary["changes"].append({"book_id": book.id, "fields": {
+                        attr: {"db": old, "sheet": new} for attr, (old, new) in changes.items()
+                    }})
+
+        if not dry_run:
+            for start in range(0, len(updates), self.chunk_size):
+                self.db.bulk_update_mappings(Book, updates[start:start + self.chunk_size])
+                self.db.commit()
+        summary["updated"] = len(updates)
+
+        return summary
+
+    def _resolve(self, book: Book, row: Dict, state: Optional[SheetSyncState]) -> Optional[Dict]:
+        """Field changes {attribute: (db value, new value)} to apply, or None when the DB copy wins"""
+        differing = {}
+        for column, attribute in SHEET_TO_BOOK_FIELDS.items():
+            new = sheet_value_for(attribute, row.get(column))
+            old = getattr(book, attribute)
+            if (old or '') != new and not (is_blank(old) and is_blank(new)):
+                differing[attribute] = (old, new)
+
+        if not differing:
+            return {}
+
+        if self.strategy == 'last_writer_wins':
+            # Compare both sides with the row hash recorded at the last push: hand edits don't
+            # touch Date Modified, so timestamps only break the tie when both sides changed
+            if state is not None and state.row_hash:
+                if row_hash(row) == state.row_hash:
+                    return None
+                if row_hash(book_to_sheet_row(book)) == state.row_hash:
+                    return differing
+
+            # Never pushed, or edited on both sides: the DB copy was last written when it was
+            # created or pushed; rows without a Date Modified count as newer
+            sheet_modified = parse_sheet_datetime(row.get('Date Modified'))
+            db_modified = (state.synced_at if state else None) or book.uploaded_at
+            if sheet_modified and db_modified and sheet_modified <= db_modified:
+                return None
+            return differing
+
+        merged = {}
+        for attribute, (old, new) in differing.items():
+            rule = self.rules[attribute]
+            if rule == 'sheet' or (rule == 'fill' and is_blank(old)):
+                merged[attribute] = (old, new)
+        return merged or None
@@ -0,0 +1,37 @@
+"""
+Shared pytest setup for the backend modules.
+The backend is not a package, so its directory goes on sys.path the way uvicorn
+runs it. database.py opens ./books.db and creates ../uploads relative to the
+working directory, so the suite runs from a scratch directory to leave the real
+database alone.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_workdir = os.path.join(tempfile.mkdtemp(prefix="shuspot-tests-"), "backend")
+os.makedirs(_workdir)
+os.chdir(_workdir)
+
+from database import Base  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Session on a fresh in-memory database"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
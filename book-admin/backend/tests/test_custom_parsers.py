@@ -0,0 +1,80 @@
+import custom_parsers
+from custom_parsers import (
+    DynamicParserStore, FilenameMatcher, GradeLevelParser, ParserRegistry, SeriesEpisodeParser,
+    create_regex_parser, parse_with_custom_parsers,
+)
+
+
+def test_dynamic_parser_version_is_checked_once_per_interval(monkeypatch):
+    store = DynamicParserStore(ParserRegistry([]), refresh_seconds=60)
+    calls = []
+    monkeypatch.setattr(store, "current_version", lambda: calls.append(1) or 0)
+    monkeypatch.setattr(store, "_load", lambda: setattr(store, "version", 0))
+
+    for _ in range(1000):
+        store.refresh()
+    assert len(calls) == 1
+
+    store._checked_at -= 61
+    store.refresh()
+    assert len(calls) == 2
+
+
+def _first_match(parsers, filename):
+    """What matching each parser on its own, in priority order, finds"""
+    for parser in parsers:
+        groups = parser.match(filename)
+        if groups is not None:
+            return parser, groups
+    return None, None
+
+
+def test_filename_matcher_agrees_with_parsers_matched_one_by_one():
+    parsers = [
+        SeriesEpisodeParser(),
+        GradeLevelParser(),
+        create_regex_parser("dash", r"(\w+)-(\d+)?(x)?", {1: "title"}),
+        create_regex_parser("year", r"\((\d{4})\)", {1: "year"}),
+    ]
+    matcher = FilenameMatcher(parsers)
+    names = [
+        "Space Cadets S01E02 - The Moon.mp4",
+        "Grade3_Math_Addition_Workbook.pdf",
+        "Grade3_Math S01E02 - Both Match.pdf",  # the series parser ranks first
+        "word-.txt",  # trailing optional groups unmatched
+        "word-12x.txt",
+        "Old Book (1911).pdf",
+        "nothing here.pdf",
+    ]
+
+    for name in names:
+        winner, groups = matcher.match(name)
+        expected_parser, expected_groups = _first_match(parsers, name)
+        assert winner is expected_parser, name
+        assert groups == expected_groups, name
+
+
+def test_filename_matcher_leaves_unfusable_patterns_standalone():
+    backreference = create_regex_parser("twice", r"(\w+) \1", {1: "title"})
+    named = create_regex_parser("named", r"(?P<title>\w+)!", {1: "title"})
+    inline_flag = create_regex_parser("flagged", r"(?i)xy", {})
+    grade = GradeLevelParser()
+    matcher = FilenameMatcher([backreference, named, inline_flag, grade])
+
+    assert not matcher.is_fused(backreference)
+    assert not matcher.is_fused(named)
+    assert not matcher.is_fused(inline_flag)
+    assert matcher.is_fused(grade)
+    # Only the fused parser is in the combined regex
+    assert matcher.match("hello hello Grade2_Art_Shapes.pdf")[0] is grade
+    assert matcher.match("hello hello.pdf") == (None, None)
+
+
+def test_parse_with_custom_parsers_falls_through_to_lower_priority_patterns(monkeypatch):
+    registry = ParserRegistry([SeriesEpisodeParser(), GradeLevelParser()])
+    monkeypatch.setattr(custom_parsers, "PARSER_REGISTRY", registry)
+    monkeypatch.setattr(custom_parsers.DYNAMIC_PARSERS, "refresh", lambda force=False: None)
+
+    metadata = parse_with_custom_parsers("/books/Grade4_Science_Plants.pdf", "Grade4_Science_Plants.pdf")
+    assert metadata["_parser_used"] == "GradeLevelParser"
+    assert metadata["reading_level"] == "Grade 3-5"
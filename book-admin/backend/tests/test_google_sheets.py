@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+
+from fake_sheets import create_fake_spreadsheet
+from google_sheets import GoogleSheetsManager
+
+
+def sharded_manager(shard_by: str = "Media") -> GoogleSheetsManager:
+    manager = GoogleSheetsManager("unused.json", shard_by=shard_by)
+    spreadsheet = create_fake_spreadsheet(manager.schema)
+    manager.attach(spreadsheet, spreadsheet.sheet1)
+    return manager
+
+
+def test_new_shards_are_created_through_the_rate_limited_client():
+    manager = sharded_manager()
+    manager.api.reset_stats()
+
+    shard = manager.route({"Media": "Audio"})
+
+    assert shard.worksheet_title == "Books - Audio"
+    by_method = manager.api.get_stats()["by_method"]
+    assert by_method["add_worksheet"]["requests"] == 1
+    assert by_method["append_row"]["requests"] == 1
+    assert manager.route({"Media": "audio"}) is shard
+
+
+def test_bulk_add_writes_each_record_to_its_shard():
+    manager = sharded_manager()
+
+    results = manager.bulk_add_books([
+        {"Name": "Frog Days", "Author": "Ann Lee", "Media": "Audio"},
+        {"Name": "Owl Nights", "Author": "Bo Park", "Media": "Video"},
+        {"Name": "Frog Days", "Author": "Ann Lee", "Media": "Audio"},
+        {"Name": "No Media", "Author": "Cy Tan"},
+    ])
+
+    assert (results["success"], results["duplicates"]) == (3, 1)
+    assert [shard.worksheet_title for shard in manager.shard_managers()] == [
+        "Books - Audio", "Books - Other", "Books - Video"
+    ]
+    assert [book["Name"] for book in manager.get_books_page(0, 10)["books"]] == ["Frog Days", "No Media", "Owl Nights"]
+
+
+def test_own_edits_do_not_make_the_mirror_download_the_sheet_again():
+    manager = GoogleSheetsManager("unused.json")
+    spreadsheet = create_fake_spreadsheet(["ID"] + manager.schema)
+    manager.attach(spreadsheet, spreadsheet.sheet1)
+    worksheet = spreadsheet.sheet1
+    worksheet.rows += [[1, "Frog Days"], [2, "Owl Nights"]]
+
+    assert manager.update_book(1, {"Status": "Checked"})
+    spreadsheet.request_log.clear()
+    for _ in range(5):
+        assert manager.update_book(2, {"Status": "Checked"})
+
+    assert spreadsheet.request_log == ["get_lastUpdateTime", "batch_update", "get_lastUpdateTime"] * 5
+
+    # Someone else's edit still makes the next write re-read the rows first
+    worksheet.rows.insert(1, [3, "Hand Added"])
+    spreadsheet._modified = datetime.now(timezone.utc) + timedelta(seconds=1)
+    spreadsheet.request_log.clear()
+    assert manager.update_book(2, {"Status": "Moved"})
+    assert "get_all_records" in spreadsheet.request_log
+    assert worksheet.rows[3][:2] == [2, "Owl Nights"]
+    assert worksheet.rows[3][manager.header.index("Status")] == "Moved"
+
+
+def test_bulk_add_stores_values_as_sent():
+    manager = GoogleSheetsManager("unused.json")
+    spreadsheet = create_fake_spreadsheet(manager.schema)
+    manager.attach(spreadsheet, spreadsheet.sheet1)
+
+    results = manager.bulk_add_books([
+        {"Name": "Frog Days", "Author": "Ann Lee", "Age": "4-7"},
+        {"Name": "=Owl Nights", "Author": "Bo Park", "Age": "11-13"},
+    ])
+
+    assert results["success"] == 2
+    rows = [dict(zip(manager.schema, row)) for row in spreadsheet.sheet1.rows[1:]]
+    assert [(row["Name"], row["Age"]) for row in rows] == [("Frog Days", "4-7"), ("=Owl Nights", "11-13")]
@@ -0,0 +1,105 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+from image_derivatives import DerivativeCache, UnsupportedImage, snap_width, source_version  # noqa: E402
+
+
+def make_image(path, width: int = 400, height: int = 300) -> str:
+    Image.new("RGB", (width, height), (200, 30, 30)).save(path, "PNG")
+    return str(path)
+
+
+def test_snap_width_buckets_requested_widths():
+    assert [snap_width(w) for w in (0, -5, 1, 80, 81, 5000)] == [0, 0, 80, 80, 160, 2400]
+
+
+def test_least_recently_used_derivatives_are_evicted(tmp_path):
+    source = make_image(tmp_path / "page.png")
+    cache = DerivativeCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+
+    first, _ = asyncio.run(cache.get(source, 80, "png"))
+    second, _ = asyncio.run(cache.get(source, 160, "png"))
+    asyncio.run(cache.get(source, 80, "png"))  # first is now more recent than second
+    third, _ = asyncio.run(cache.get(source, 240, "png"))
+    cache.max_bytes = os.path.getsize(first) + os.path.getsize(third)
+    cache._evict()
+
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_concurrent_requests_render_once(tmp_path):
+    source = make_image(tmp_path / "page.png")
+    cache = DerivativeCache(str(tmp_path / "cache"))
+
+    async def fetch_many():
+        return await asyncio.gather(*(cache.get(source, 160, "webp") for _ in range(5)))
+
+    results = asyncio.run(fetch_many())
+
+    assert len(set(results)) == 1
+    assert cache.stats["renders"] == 1 and cache.stats["collapsed"] == 4
+
+
+def test_replacing_the_source_changes_key_and_version(tmp_path):
+    source = make_image(tmp_path / "page.png")
+    cache = DerivativeCache(str(tmp_path / "cache"))
+    _, etag = asyncio.run(cache.get(source, 80, "webp"))
+    version = source_version(os.stat(source))
+
+    make_image(source, 500, 300)
+    os.utime(source, ns=(0, os.stat(source).st_mtime_ns + 1))
+
+    assert asyncio.run(cache.get(source, 80, "webp"))[1] != etag
+    assert source_version(os.stat(source)) != version
+
+
+def test_non_image_source_raises_unsupported_image(tmp_path):
+    source = tmp_path / "notes.png"
+    source.write_text("not an image")
+    cache = DerivativeCache(str(tmp_path / "cache"))
+
+    with pytest.raises(UnsupportedImage):
+        asyncio.run(cache.get(str(source), 80, "webp"))
+
+
+def test_existing_derivatives_are_picked_up_on_restart(tmp_path):
+    source = make_image(tmp_path / "page.png")
+    path, _ = asyncio.run(DerivativeCache(str(tmp_path / "cache")).get(source, 80, "png"))
+
+    restarted = DerivativeCache(str(tmp_path / "cache"))
+
+    assert asyncio.run(restarted.get(source, 80, "png"))[0] == path
+    assert restarted.stats["hits"] == 1
+
+
+def test_failed_render_leaves_no_temp_file(tmp_path, monkeypatch):
+    source = make_image(tmp_path / "page.png")
+    cache_dir = tmp_path / "cache"
+    cache = DerivativeCache(str(cache_dir))
+
+    def replace_fails(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("image_derivatives.os.replace", replace_fails)
+    with pytest.raises(OSError):
+        asyncio.run(cache.get(source, 80, "png"))
+
+    assert os.listdir(cache_dir) == []
+    assert cache.get_stats()["renders"] == 0
+
+
+def test_leftover_temp_files_are_not_loaded_as_entries(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "abc.png.123.456.tmp").write_bytes(b"x" * 100)
+    (cache_dir / "abc.png").write_bytes(b"x" * 10)
+
+    stats = DerivativeCache(str(cache_dir)).get_stats()
+    assert (stats["entries"], stats["total_bytes"]) == (1, 10)
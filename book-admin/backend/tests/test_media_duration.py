@@ -0,0 +1,129 @@
+import os
+import struct
+
+import pytest
+
+from media_duration import DurationProber, format_duration, format_minutes, probe_duration
+
+# MPEG-1 layer III, 44.1 kHz, stereo: 128 kbps frames are 417 bytes, 160 kbps frames 522
+MP3_128 = b'\xff\xfb\x90\x00'
+MP3_160 = b'\xff\xfb\xa0\x00'
+SAMPLES_PER_FRAME = 1152
+
+
+def mp3_frame(header: bytes, size: int, body: bytes = b'') -> bytes:
+    return header + body + b'\x00' * (size - 4 - len(body))
+
+
+def id3v2_tag(payload_size: int) -> bytes:
+    syncsafe = bytes((payload_size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b'ID3\x04\x00\x00' + syncsafe + b'\x00' * payload_size
+
+
+def atom(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_wav_duration_from_byte_rate(tmp_path):
+    fmt = struct.pack('<HHIIHH', 1, 1, 8000, 16000, 2, 16)
+    data = b'\x00' * 32000
+    body = b'WAVE' + struct.pack('<4sI', b'fmt ', len(fmt)) + fmt + struct.pack('<4sI', b'data', len(data)) + data
+    path = write(tmp_path, 'a.wav', b'RIFF' + struct.pack('<I', len(body)) + body)
+
+    assert probe_duration(path) == pytest.approx(2.0)
+
+
+def test_streamed_wav_uses_size_on_disk(tmp_path):
+    fmt = struct.pack('<HHIIHH', 1, 1, 8000, 16000, 2, 16)
+    body = b'WAVE' + struct.pack('<4sI', b'fmt ', len(fmt)) + fmt + struct.pack('<4sI', b'data', 0) + b'\x00' * 8000
+    path = write(tmp_path, 'streamed.wav', b'RIFF' + struct.pack('<I', 0) + body)
+
+    assert probe_duration(path) == pytest.approx(0.5)
+
+
+def test_mp4_duration_skips_media_data(tmp_path):
+    mvhd = atom(b'mvhd', b'\x00\x00\x00\x00' + struct.pack('>IIII', 0, 0, 1000, 90500) + b'\x00' * 80)
+    data = (
+        atom(b'ftyp', b'isom\x00\x00\x02\x00')
+        + atom(b'mdat', b'\x00' * 4096)
+        + atom(b'moov', atom(b'udta', b'\x00' * 16) + mvhd)
+    )
+    path = write(tmp_path, 'a.mp4', data)
+
+    assert probe_duration(path) == pytest.approx(90.5)
+
+
+def test_mp4_version_1_mvhd_and_64_bit_atom_size(tmp_path):
+    large_mdat = struct.pack('>I4sQ', 1, b'mdat', 16 + 64) + b'\x00' * 64
+    mvhd = atom(b'mvhd', b'\x01\x00\x00\x00' + struct.pack('>QQIQ', 0, 0, 600, 1800) + b'\x00' * 80)
+    path = write(tmp_path, 'a.m4a', large_mdat + atom(b'moov', mvhd))
+
+    assert probe_duration(path) == pytest.approx(3.0)
+
+
+def test_cbr_mp3_ignores_id3_tags(tmp_path):
+    frames = mp3_frame(MP3_128, 417) * 100
+    id3v1 = b'TAG' + b'\x00' * 125
+    path = write(tmp_path, 'cbr.mp3', id3v2_tag(300) + frames + id3v1)
+
+    assert probe_duration(path) == pytest.approx(len(frames) * 8 / 128000)
+
+
+def test_xing_header_frame_count(tmp_path):
+    # Stereo MPEG-1 side information is 32 bytes, so the tag starts 36 bytes into the frame
+    xing = b'\x00' * 32 + b'Xing' + struct.pack('>II', 1, 1000)
+    data = mp3_frame(MP3_128, 417, xing) + mp3_frame(MP3_160, 522) * 3
+    path = write(tmp_path, 'xing.mp3', data)
+
+    assert probe_duration(path) == pytest.approx(1000 * SAMPLES_PER_FRAME / 44100)
+
+
+def test_vbr_mp3_without_header_counts_frames(tmp_path):
+    data = (mp3_frame(MP3_128, 417) + mp3_frame(MP3_160, 522)) * 20
+    path = write(tmp_path, 'vbr.mp3', data)
+
+    assert probe_duration(path) == pytest.approx(40 * SAMPLES_PER_FRAME / 44100)
+
+
+def test_unsupported_or_garbage_files_have_no_duration(tmp_path):
+    assert probe_duration(write(tmp_path, 'notes.txt', b'hello')) is None
+    assert probe_duration(write(tmp_path, 'junk.mp3', b'\x00' * 2048)) is None
+    assert probe_duration(write(tmp_path, 'junk.wav', b'RIFX' + b'\x00' * 40)) is None
+    assert probe_duration(str(tmp_path / 'missing.mp4')) is None
+
+
+def test_prober_cache_is_validated_by_mtime_and_size(tmp_path):
+    path = write(tmp_path, 'cbr.mp3', mp3_frame(MP3_128, 417) * 10)
+    prober = DurationProber(workers=2)
+
+    first = prober.get(path)
+    assert prober.get(path) == first
+    assert prober.stats["hits"] == 1
+
+    with open(path, 'ab') as f:
+        f.write(mp3_frame(MP3_128, 417) * 10)
+    os.utime(path, ns=(1, 1))
+    assert prober.get(path) == pytest.approx(first * 2)
+    assert prober.stats["misses"] == 2
+
+
+def test_total_skips_unprobeable_files(tmp_path):
+    mp3 = write(tmp_path, 'cbr.mp3', mp3_frame(MP3_128, 417) * 10)
+    junk = write(tmp_path, 'junk.mp3', b'\x00' * 100)
+    prober = DurationProber(workers=2)
+
+    assert prober.total([mp3, junk, mp3]) == pytest.approx(probe_duration(mp3))
+    assert prober.total([junk]) is None
+
+
+def test_formatting():
+    assert format_duration(59.6) == "1:00"
+    assert format_duration(3725) == "1:02:05"
+    assert format_minutes(20) == "1 min"
+    assert format_minutes(5400) == "1.5 hr"
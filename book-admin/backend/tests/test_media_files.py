@@ -0,0 +1,133 @@
+import asyncio
+import io
+import os
+from email.utils import formatdate
+
+import pytest
+from starlette.datastructures import Headers
+
+from media_files import RangeFileResponse, ZEROCOPY_EXTENSION, if_range_matches, parse_range_header
+from static_files import is_not_modified, strong_etag
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=100-", [(100, 999)]),
+    ("bytes=-200", [(800, 999)]),
+    ("bytes=-5000", [(0, 999)]),
+    ("bytes=990-2000", [(990, 999)]),
+    ("bytes=0-9, 20-29", [(0, 9), (20, 29)]),
+    ("bytes=1000-1100", []),
+    ("bytes=-0", []),
+    ("bytes=50-10", None),
+    ("bytes=abc-10", None),
+    ("bytes=10", None),
+    ("items=0-10", None),
+    ("bytes=", None),
+    (",".join(["bytes=0-0"] + ["1-1"] * 16), None),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    path = tmp_path / "story.mp3"
+    path.write_bytes(bytes(range(256)) * 4)
+    return str(path), os.stat(path)
+
+
+def test_if_range_matches_strong_etag_or_exact_date(media_file):
+    _, stat_result = media_file
+    etag = strong_etag(stat_result)
+
+    assert if_range_matches(etag, etag, stat_result)
+    assert not if_range_matches(f"W/{etag}", etag, stat_result)
+    assert not if_range_matches('"other"', etag, stat_result)
+    assert if_range_matches(formatdate(stat_result.st_mtime, usegmt=True), etag, stat_result)
+    assert not if_range_matches(formatdate(stat_result.st_mtime - 60, usegmt=True), etag, stat_result)
+
+
+def test_is_not_modified_prefers_if_none_match(media_file):
+    _, stat_result = media_file
+    etag = strong_etag(stat_result)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+
+    assert is_not_modified(Headers({"if-none-match": f'"x", {etag}'}), etag, stat_result)
+    assert is_not_modified(Headers({"if-none-match": "*"}), etag, stat_result)
+    assert not is_not_modified(Headers({"if-none-match": '"x"', "if-modified-since": last_modified}), etag, stat_result)
+    assert is_not_modified(Headers({"if-modified-since": last_modified}), etag, stat_result)
+    assert not is_not_modified(Headers({}), etag, stat_result)
+
+
+def run_response(response, extensions=None):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "extensions": extensions or {}}
+    asyncio.run(response(scope, None, send))
+    return messages
+
+
+def body_of(messages) -> bytes:
+    return b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+
+
+def test_single_range_is_served_as_206(media_file):
+    path, stat_result = media_file
+    response = RangeFileResponse(path, stat_result, Headers({"range": "bytes=10-19"}))
+
+    messages = run_response(response)
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 10-19/1024"
+    assert body_of(messages) == bytes(range(10, 20))
+
+
+def test_multiple_ranges_are_multipart(media_file):
+    path, stat_result = media_file
+    response = RangeFileResponse(path, stat_result, Headers({"range": "bytes=0-1,-2"}))
+
+    body = body_of(run_response(response))
+
+    assert response.media_type.startswith("multipart/byteranges")
+    assert len(body) == int(response.headers["content-length"])
+    assert b"Content-Range: bytes 0-1/1024\r\n\r\n\x00\x01\r\n" in body
+    assert b"Content-Range: bytes 1022-1023/1024\r\n\r\n\xfe\xff\r\n" in body
+
+
+def test_stale_if_range_sends_the_whole_file(media_file):
+    path, stat_result = media_file
+    response = RangeFileResponse(path, stat_result, Headers({"range": "bytes=10-19", "if-range": '"old"'}))
+
+    assert response.status_code == 200
+    assert len(body_of(run_response(response))) == 1024
+
+
+def test_conditional_request_and_unsatisfiable_range(media_file):
+    path, stat_result = media_file
+    etag = strong_etag(stat_result)
+
+    assert RangeFileResponse(path, stat_result, Headers({"if-none-match": etag})).status_code == 304
+    # If-None-Match wins over Range, satisfiable or not
+    for range_header in ("bytes=10-19", "bytes=5000-"):
+        headers = Headers({"if-none-match": etag, "range": range_header})
+        assert RangeFileResponse(path, stat_result, headers).status_code == 304
+    unsatisfiable = RangeFileResponse(path, stat_result, Headers({"range": "bytes=5000-"}))
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == "bytes */1024"
+
+
+def test_zerocopy_send_gets_the_open_file(media_file):
+    path, stat_result = media_file
+    response = RangeFileResponse(path, stat_result, Headers({"range": "bytes=100-"}))
+
+    messages = run_response(response, {ZEROCOPY_EXTENSION: {}})
+
+    zerocopy = [m for m in messages if m["type"] == ZEROCOPY_EXTENSION]
+    assert len(zerocopy) == 1
+    assert isinstance(zerocopy[0]["file"], io.IOBase)
+    assert (zerocopy[0]["offset"], zerocopy[0]["count"]) == (100, 924)
+    assert zerocopy[0]["file"].closed
@@ -0,0 +1,92 @@
+import os
+
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from image_derivatives import source_version
+from page_cache import PageByteCache
+from static_files import DEFAULT_CACHE_CONTROL, IMMUTABLE_CACHE_CONTROL, CustomStaticFiles, resolve_static_path
+
+
+def write_page(directory, name: str, size: int) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+
+def test_least_recently_used_pages_are_evicted_first(tmp_path):
+    cache = PageByteCache(max_mb=1, max_file_bytes=512 * 1024)
+    a, b, c = (write_page(tmp_path, name, 400 * 1024) for name in "abc")
+
+    cache.load(a)
+    cache.load(b)
+    assert cache.get(a, os.stat(a)) is not None  # a is now more recent than b
+    cache.load(c)
+
+    assert cache.get(b, os.stat(b)) is None
+    assert cache.get(a, os.stat(a)) is not None and cache.get(c, os.stat(c)) is not None
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1 and stats["total_bytes"] == 800 * 1024
+
+
+def test_oversized_files_are_not_cached(tmp_path):
+    cache = PageByteCache(max_mb=1, max_file_bytes=1024)
+    path = write_page(tmp_path, "big", 2048)
+
+    assert cache.load(path) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_replaced_file_is_a_stale_miss(tmp_path):
+    cache = PageByteCache(max_mb=1)
+    path = write_page(tmp_path, "page", 100)
+    cache.load(path)
+
+    write_page(tmp_path, "page", 120)
+
+    assert cache.get(path, os.stat(path)) is None
+    assert cache.get_stats()["stale"] == 1
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = PageByteCache(max_mb=0)
+    path = write_page(tmp_path, "page", 100)
+
+    assert not cache.enabled
+    assert cache.prewarm([path]) == 0
+
+
+def test_prewarmed_pages_use_the_static_lookup_key(tmp_path):
+    root = tmp_path / "CROP-ShuSpot"
+    (root / "Books" / "My Book").mkdir(parents=True)
+    (root / "Alias").symlink_to(root / "Books")
+    write_page(root / "Books" / "My Book", "Screenshot (1).png", 100)
+
+    static = CustomStaticFiles(directory=str(root), production=True)
+    request_path = "Alias/My Book/Screenshot (1).png"
+    served_path, _ = static._resolve(request_path)
+
+    assert resolve_static_path(os.path.realpath(root), request_path) == served_path
+    cache = PageByteCache(max_mb=1)
+    cache.prewarm([served_path])
+    assert cache.get(served_path, os.stat(served_path)) is not None
+
+
+def test_paths_outside_the_root_are_refused(tmp_path):
+    (tmp_path / "root").mkdir()
+    write_page(tmp_path, "secret", 10)
+
+    assert resolve_static_path(os.path.realpath(tmp_path / "root"), "../secret") is None
+
+
+def test_only_versioned_urls_are_cached_immutably(tmp_path):
+    write_page(tmp_path, "page-20240101.png", 100)
+    app = Starlette()
+    app.mount("/pages", CustomStaticFiles(directory=str(tmp_path), production=True))
+    client = TestClient(app)
+    version = source_version(os.stat(tmp_path / "page-20240101.png"))
+
+    assert client.get("/pages/page-20240101.png").headers["cache-control"] == DEFAULT_CACHE_CONTROL
+    assert client.get("/pages/page-20240101.png?v=0-0").headers["cache-control"] == DEFAULT_CACHE_CONTROL
+    assert client.get(f"/pages/page-20240101.png?v={version}").headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+import script_sandbox
+from script_sandbox import ScriptPoolBusy, ScriptWorkerPool
+
+needs_rlimits = pytest.mark.skipif(script_sandbox.resource is None, reason="resource limits need POSIX")
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**options):
+        pool = ScriptWorkerPool(**{"workers": 1, "max_pending": 0, **options})
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def test_script_output_and_variables_come_back(make_pool):
+    pool = make_pool()
+    result = pool.run(
+        "txt", "print('scanned', root_directory)\nresults.append({'Name': 'A'})\npreview_data.extend(range(5))",
+        {"root_directory": "/books"}, variables=("results", "preview_data"), row_variable="preview_data", max_rows=2,
+    )
+
+    assert result["success"], result["error"]
+    assert result["output"] == "scanned /books\n"
+    assert result["variables"]["results"] == [{"Name": "A"}]
+    assert result["variables"]["preview_data"] == [0, 1]
+    assert result["variables"]["preview_data_total"] == 5
+
+
+def test_python_scripts_get_trimmed_builtins(make_pool):
+    result = make_pool().run("python", "open('books.db')")
+
+    assert not result["success"]
+    assert "name 'open' is not defined" in result["error"]
+
+
+def test_workers_do_not_inherit_secrets_from_the_environment(make_pool, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "secret")
+    monkeypatch.setenv("SHUSPOT_EXAMPLE_SETTING", "kept")
+    result = make_pool().run("txt", "print(os.environ.get('GOOGLE_API_KEY'), os.environ.get('SHUSPOT_EXAMPLE_SETTING'))")
+
+    assert result["output"] == "None kept\n"
+
+
+def test_timed_out_worker_is_replaced(make_pool):
+    pool = make_pool(cpu_seconds=60)
+    result = pool.run("txt", "while True:\n    pass", timeout=0.5)
+
+    assert result["timed_out"]
+    assert pool.stats["timeouts"] == 1
+    assert pool.stats["restarts"] == 1
+    assert pool.run("txt", "print('next')")["output"] == "next\n"
+
+
+@needs_rlimits
+def test_cpu_limit_stops_the_script_but_keeps_the_worker(make_pool):
+    pool = make_pool(cpu_seconds=1)
+    result = pool.run("txt", "try:\n    while True:\n        pass\nexcept Exception:\n    pass", timeout=30)
+
+    assert not result["success"]
+    assert "CPU time limit of 1s exceeded" in result["error"]
+    assert pool.stats["restarts"] == 0
+    assert pool.run("txt", "print('next')")["success"]
+
+
+@needs_rlimits
+def test_memory_limit_is_reported(make_pool):
+    pool = make_pool(memory_mb=300)
+    result = pool.run("txt", "block = bytearray(1024 * 1024 * 1024)")
+
+    assert not result["success"]
+    assert "Memory limit of 300 MB exceeded" in result["error"]
+
+
+def test_crashed_worker_is_replaced(make_pool):
+    pool = make_pool()
+    result = pool.run("txt", "os._exit(3)")
+
+    assert not result["success"]
+    assert "exit code 3" in result["error"]
+    assert pool.stats["crashed"] == 1
+    assert pool.run("txt", "print('next')")["success"]
+
+
+def test_worker_is_recycled_after_max_jobs(make_pool):
+    pool = make_pool(max_jobs=2)
+    pids = [pool.run("txt", "print(os.getpid())")["output"] for _ in range(3)]
+
+    assert pids[0] == pids[1] != pids[2]
+    assert pool.stats["restarts"] == 1
+
+
+def test_full_pool_rejects_new_scripts(make_pool):
+    pool = make_pool()
+    pool.start()
+    running = threading.Thread(target=pool.run, args=("txt", "import time\ntime.sleep(1)"))
+    running.start()
+    try:
+        deadline = time.monotonic() + 5
+        while pool.stats["in_flight"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with pytest.raises(ScriptPoolBusy):
+            pool.run("txt", "print('queued')")
+        assert pool.stats["rejected"] == 1
+    finally:
+        running.join()
@@ -0,0 +1,76 @@
+from sheet_duplicates import DuplicateIndex, epic_read_id, title_author_key
+
+EPIC = "https://www.getepic.com/app/read/{}"
+
+
+def group_rows(index):
+    return [[row['row'] for row in group['rows']] for group in index.groups()]
+
+
+def test_title_author_key_ignores_case_accents_punctuation_and_articles():
+    key = title_author_key("The Very Hungry Caterpillar", "Eric Carle")
+
+    assert title_author_key("very hungry caterpillar!", "ERIC  CARLE") == key
+    assert title_author_key("Crème & Brûlée", "X") == title_author_key("creme and brulee", "x")
+    assert title_author_key("", "Eric Carle") is None
+    assert epic_read_id(EPIC.format(123) + "?ref=x") == "123"
+    assert epic_read_id("https://example.com/read/123") is None
+
+
+def test_groups_merge_title_and_epic_matches_transitively():
+    index = DuplicateIndex()
+    index.load([
+        {'Name': 'Frog Days', 'Author': 'Ann', 'URL': EPIC.format(1)},  # row 2
+        {'Name': 'frog days', 'Author': 'ann', 'URL': ''},  # row 3: same title/author as row 2
+        {'Name': 'Toad Nights', 'Author': 'Bo', 'URL': EPIC.format(1)},  # row 4: same Epic ID as row 2
+        {'Name': 'Toad Nights', 'Author': 'Bo', 'URL': ''},  # row 5: same title/author as row 4
+        {'Name': 'Alone', 'Author': 'Cy', 'URL': EPIC.format(2)},  # row 6
+    ])
+
+    groups = index.groups()
+    assert group_rows(index) == [[2, 3, 4, 5]]
+    assert groups[0]['reasons'] == ['epic_id', 'title_author']
+    assert groups[0]['rows'][0]['epic_id'] == '1'
+
+
+def test_deleted_rows_are_not_duplicates():
+    index = DuplicateIndex()
+    index.load([
+        {'Name': 'Frog Days', 'Author': 'Ann'},
+        {'Name': 'Frog Days', 'Author': 'Ann', 'Status': 'Deleted'},
+    ])
+
+    assert index.groups() == []
+
+
+def test_add_and_update_row_keep_groups_current():
+    index = DuplicateIndex()
+    index.load([{'Name': 'Frog Days', 'Author': 'Ann'}, {'Name': 'Owl Song', 'Author': 'Di'}])
+    assert index.groups() == []
+
+    index.add(2, [{'Name': 'Frog Days', 'Author': 'Ann'}, {'Name': 'Owl Song', 'Author': 'Di'}])
+    assert group_rows(index) == [[2, 4], [3, 5]]
+
+    # Renaming one row splits its group; a write to an unindexed column changes nothing
+    revision = index.revision
+    index.update_row(0, {'Name': 'Frog Mornings'})
+    index.update_row(1, {'Notes': 'checked'})
+    assert group_rows(index) == [[3, 5]]
+    assert index.revision == revision + 1
+    assert index.rows[0]['Author'] == 'Ann'
+
+
+def test_near_duplicates_report_typos_but_not_series_or_exact_matches():
+    index = DuplicateIndex()
+    index.load([
+        {'Name': 'The Hungry Caterpillar', 'Author': 'Eric'},
+        {'Name': 'The Hungry Caterpilar', 'Author': 'Eric'},  # typo
+        {'Name': 'Hungry Caterpillar', 'Author': 'Eric'},  # exact once the article is dropped
+        {'Name': 'Dino Facts Book 2', 'Author': 'Rex'},
+        {'Name': 'Dino Facts Book 3', 'Author': 'Rex'},  # a series
+        {'Name': 'The Hungry Caterpilar', 'Author': 'Someone Else'},  # different author
+    ])
+
+    pairs = index.near_duplicates()
+    assert sorted(tuple(row['row'] for row in pair['rows']) for pair in pairs) == [(2, 3), (3, 4)]
+    assert all(pair['similarity'] >= 0.9 for pair in pairs)
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+
+from database import Book
+from sheets_async import AsyncSheetsManager, SheetsBusy, SheetsExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = SheetsExecutor(workers=1, max_pending=0)
+    yield executor
+    executor.shutdown()
+
+
+def test_db_jobs_get_their_own_session_on_the_worker(executor):
+    sheets = AsyncSheetsManager(None, executor)
+    seen = {}
+
+    def job(db, title):
+        seen["thread"] = threading.current_thread().name
+        seen["session"] = db
+        return db.query(Book).filter(Book.title == title).count()
+
+    assert asyncio.run(sheets.run_db_job(job, "No Such Book")) == 0
+    assert seen["thread"].startswith("sheets")
+    assert not seen["session"].in_transaction()  # closed once the job returned
+
+
+def test_timed_out_job_keeps_using_its_own_session(executor):
+    sheets = AsyncSheetsManager(None, executor)
+    release, finished = threading.Event(), threading.Event()
+
+    def job(db):
+        release.wait(5)
+        db.query(Book).count()
+        finished.set()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(sheets.run_db_job(job), 0.05))
+    release.set()
+    assert finished.wait(5)
+
+
+def test_full_executor_rejects_new_calls(executor):
+    started, release = threading.Event(), threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(lambda: (started.set(), release.wait(5)), timeout=5))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        with pytest.raises(SheetsBusy):
+            await executor.run(lambda: None)
+        release.set()
+        await running
+
+    asyncio.run(scenario())
+    assert executor.get_stats()["rejected"] == 1
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database import Book, SheetSyncState
+from fake_sheets import create_fake_spreadsheet
+from google_sheets import GoogleSheetsManager
+from sheets_sync import DbToSheetsSync, SheetsToDbImport, book_to_sheet_row, row_hash
+
+
+@pytest.fixture
+def manager():
+    manager = GoogleSheetsManager("unused.json")
+    spreadsheet = create_fake_spreadsheet(manager.schema)
+    manager.attach(spreadsheet, spreadsheet.sheet1)
+    return manager
+
+
+def add_book(db, **fields):
+    book = Book(**{"title": "Frog Days", "author": "Ann Lee", "genre": "Animals",
+                   "file_path": "/books/frog.pdf", "file_type": "pdf", **fields})
+    db.add(book)
+    db.commit()
+    return book
+
+
+def edit_sheet(manager, row_index, **cells):
+    """Change cells of a data row by hand: no Date Modified stamp, only a new Drive revision"""
+    worksheet = manager.worksheet.unwrapped
+    header = worksheet.rows[0]
+    for column, value in cells.items():
+        worksheet.rows[row_index + 1][header.index(column.replace("_", " "))] = value
+    worksheet.spreadsheet._modified = datetime.now(timezone.utc) + timedelta(seconds=1)
+
+
+def sheet_time(moment: datetime) -> str:
+    """A naive UTC time in the server-local format GoogleSheetsManager writes"""
+    return moment.replace(tzinfo=timezone.utc).astimezone().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def test_notes_are_not_part_of_the_row_hash(db):
+    book = add_book(db)
+    before = row_hash(book_to_sheet_row(book))
+    book.notes = '{"manifest": {"generated_at": "now"}}'
+    assert "Notes" not in book_to_sheet_row(book)
+    assert row_hash(book_to_sheet_row(book)) == before
+
+
+def test_hand_edit_without_date_modified_is_imported(db, manager):
+    book = add_book(db)
+    DbToSheetsSync(db, manager).run()
+    edit_sheet(manager, 0, Category="Science")
+
+    summary = SheetsToDbImport(db, manager).run()
+
+    assert summary["updated"] == 1
+    db.refresh(book)
+    assert book.genre == "Science"
+
+
+def test_db_edit_since_last_push_is_kept(db, manager):
+    book = add_book(db)
+    DbToSheetsSync(db, manager).run()
+    book.genre = "Science"
+    db.commit()
+
+    summary = SheetsToDbImport(db, manager).run()
+
+    assert summary["kept_db"] == 1 and summary["updated"] == 0
+    db.refresh(book)
+    assert book.genre == "Science"
+
+
+@pytest.mark.parametrize("sheet_offset, expected", [(timedelta(hours=1), "Science"), (-timedelta(hours=1), "History")])
+def test_edits_on_both_sides_fall_back_to_timestamps(db, manager, sheet_offset, expected):
+    book = add_book(db)
+    DbToSheetsSync(db, manager).run()
+    book.genre = "History"
+    db.commit()
+    synced_at = db.query(SheetSyncState).one().synced_at
+    edit_sheet(manager, 0, Category="Science", Date_Modified=sheet_time(synced_at + sheet_offset))
+
+    SheetsToDbImport(db, manager).run()
+
+    db.refresh(book)
+    assert book.genre == expected
+
+
+def test_never_pushed_row_uses_timestamps(db, manager):
+    book = add_book(db, uploaded_at=datetime.utcnow() - timedelta(hours=1))
+    manager.append_records([{**book_to_sheet_row(book), "Category": "Science"}])  # stamped now
+
+    assert SheetsToDbImport(db, manager).run()["updated"] == 1
+    db.refresh(book)
+    assert book.genre == "Science"
+
+    manager.worksheet.unwrapped.rows[1][manager.schema.index("Date Modified")] = "2000-01-01"
+    manager.worksheet.unwrapped.rows[1][manager.schema.index("Category")] = "Poems"
+    assert SheetsToDbImport(db, manager).run()["kept_db"] == 1
+
+
+def test_merge_applies_field_rules(db, manager):
+    book = add_book(db, fiction_type="")
+    DbToSheetsSync(db, manager).run()
+    edit_sheet(manager, 0, Name="Frog Nights", Category="Science", Fiction_Type="Non-Fiction")
+
+    summary = SheetsToDbImport(db, manager, strategy="merge", rules={"fiction_type": "fill"}).run()
+
+    db.refresh(book)
+    assert (book.title, book.genre, book.fiction_type) == ("Frog Days", "Science", "Non-Fiction")
+    assert summary["updated"] == 1
+
+
+def test_dry_run_reports_without_writing(db, manager):
+    book = add_book(db)
+    DbToSheetsSync(db, manager).run()
+    edit_sheet(manager, 0, Category="Science")
+
+    summary = SheetsToDbImport(db, manager).run(dry_run=True)
+
+    assert summary["changes"] == [{"book_id": book.id, "fields": {"genre": {"db": "Animals", "sheet": "Science"}}}]
+    db.refresh(book)
+    assert book.genre == "Animals"
+
+
+@pytest.mark.parametrize("options", [{"strategy": "newest"}, {"rules": {"genre": "always"}}, {"rules": {"isbn": "db"}}])
+def test_invalid_strategy_or_rules_are_rejected(db, manager, options):
+    with pytest.raises(ValueError):
+        SheetsToDbImport(db, manager, **options)
+
+
+def test_sync_writes_to_the_row_that_moved(db, manager):
+    book = add_book(db)
+    DbToSheetsSync(db, manager).run()
+    manager.worksheet.unwrapped.rows.insert(1, ["Hand Added", "", "Book", "Fiction", "", "Someone"])
+    edit_sheet(manager, 0)
+    book.genre = "Science"
+    db.commit()
+
+    summary = DbToSheetsSync(db, manager).run()
+
+    rows = manager.worksheet.unwrapped.rows
+    category = manager.schema.index("Category")
+    assert summary["updated"] == 1
+    assert rows[1][category] == "" and rows[2][category] == "Science"
+
+
+def test_values_round_trip_unparsed_so_imports_see_no_change(db, manager):
+    book = add_book(db, author="=Ann Lee", reading_level="Grade 2")
+    DbToSheetsSync(db, manager).run()  # appended
+    book.genre = "Science"
+    db.commit()
+    DbToSheetsSync(db, manager).run()  # written in place
+
+    row = dict(zip(manager.schema, manager.worksheet.unwrapped.rows[1]))
+    assert (row["Author"], row["Age"], row["Category"]) == ("=Ann Lee", "4-7", "Science")
+
+    summary = SheetsToDbImport(db, manager).run()
+    assert summary["unchanged"] == 1 and summary["updated"] == 0
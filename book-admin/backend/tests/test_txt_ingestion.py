@@ -0,0 +1,82 @@
+from txt_ingestion import TxtMetadataParser
+
+
+def tokenize(content):
+    return TxtMetadataParser().tokenize(content)
+
+
+def test_key_value_pairs_map_aliases_and_last_one_wins():
+    metadata = tokenize("Publisher: First House\nGenre: Mystery\nPublished by: Second House\n")
+
+    assert metadata["publisher"] == "Second House"
+    assert metadata["genre"] == "Mystery"
+
+
+def test_labelled_text_overrides_pairs_by_precedence():
+    metadata = tokenize("By Someone Else\nAuthor: Jane Doe\nSummary: Short\nAbout: Shorter\n")
+
+    # "Author" (precedence 0) beats the earlier "By" line (precedence 1)
+    assert metadata["author"] == "Jane Doe"
+    # Same field, summary ranks above about
+    assert metadata["description"] == "Short"
+
+
+def test_label_without_value_takes_the_next_line():
+    metadata = tokenize("Title\n\nThe Long Walk\nWritten by\nAnn Other\n")
+
+    assert metadata["title"] == "The Long Walk"
+    assert metadata["author"] == "Ann Other"
+
+
+def test_first_plain_line_is_the_title_fallback():
+    metadata = tokenize("Genre: Poetry\nSongs of the Sea\nAnother line\n")
+
+    assert metadata["title"] == "Songs of the Sea"
+
+
+def test_isbn_and_year_are_found_once():
+    metadata = tokenize("Title: X\nISBN: 978-1-23-456789-0\nPublished 1999\nYear 2001\n")
+
+    assert metadata["isbn"] == "978-1-23-456789-0"
+    assert metadata["year"] == "1999"
+
+
+def test_multiline_json_is_decoded_in_place_and_its_lines_skipped():
+    content = (
+        "Title: From Text\n"
+        "{\n"
+        '  "title": "From JSON",\n'
+        '  "series": "Sea Tales"\n'
+        "}\n"
+        "Author: After Json\n"
+    )
+    metadata = tokenize(content)
+
+    assert metadata["title"] == "From JSON"  # objects override everything
+    assert metadata["series"] == "Sea Tales"
+    assert metadata["author"] == "After Json"
+    assert '"title"' not in metadata  # the object's lines weren't read as pairs
+
+
+def test_json_objects_nested_and_several_per_line():
+    metadata = tokenize('{"a": 1} {"b": {"c": "inner"}, "skipped": "outer"}\n')
+
+    assert metadata["a"] == 1
+    assert metadata["c"] == "inner"
+    assert "skipped" not in metadata  # an object with nested objects contributes those only
+
+
+def test_broken_json_falls_back_to_text():
+    metadata = tokenize("Notes: {not json\nAuthor: Kim {x} Lee\n")
+
+    assert metadata["notes"] == "{not json"
+    assert metadata["author"] == "Kim {x} Lee"
+
+
+def test_parse_txt_file_normalizes_whitespace(tmp_path):
+    path = tmp_path / "info.txt"
+    path.write_text("Title:   The   Spaced    Book \nReading Level: Grade 2\n")
+
+    metadata = TxtMetadataParser().parse_txt_file(str(path))
+    assert metadata["title"] == "The Spaced Book"
+    assert metadata["reading_level"] == "Grade 2"
@@ -7,6 +7,10 @@
 
 """
 Basic script to parse TXT files and upload to Google Sheets
+
+Books appended to `results` are uploaded when the script is run with
+"Upload to Google Sheets" ticked (and preview mode off); the server reports
+how many were added, skipped as duplicates, or failed
 """
 
 # Initialize the parser
@@ -28,15 +32,10 @@ for i, book in enumerate(metadata_list[:5]):
 # Convert to Google Sheets format
 sheets_data = parser.export_to_google_sheets_format(metadata_list)
 
-# Upload to Google Sheets if connected
-if sheets_manager:
-    results = sheets_manager.bulk_add_books(sheets_data)
-    print(f"\nUpload Results:")
-    print(f"  Successfully added: {results.get('success', 0)} books")
-    print(f"  Duplicates skipped: {results.get('duplicates', 0)} books")
-    print(f"  Errors: {results.get('errors', 0)} books")
-else:
-    print("\nGoogle Sheets not connected - showing preview only")
+# Hand the rows to the server for upload
+results.extend(sheets_data)
+preview_data.extend(sheets_data)
+print(f"\n{len(results)} books ready - tick 'Upload to Google Sheets' to upload them")
 
 # ============================================================================
 # SCRIPT 2: Filter and Process Specific Genres
@@ -66,9 +65,8 @@ print(f"Target genres: {', '.join(target_genres)}")
 # Convert and upload
 sheets_data = parser.export_to_google_sheets_format(filtered_books)
 
-if sheets_manager:
-    results = sheets_manager.bulk_add_books(sheets_data)
-    print(f"Uploaded {results.get('success', 0)} genre-specific books")
+results.extend(sheets_data)
+print(f"{len(sheets_data)} genre-specific books ready to upload")
 
 # ============================================================================
 # SCRIPT 3: Reading Level Classification
@@ -139,9 +137,8 @@ for level, count in level_counts.items():
 # Upload with reading levels
 sheets_data = parser.export_to_google_sheets_format(metadata_list)
 
-if sheets_manager:
-    results = sheets_manager.bulk_add_books(sheets_data)
-    print(f"Uploaded {results.get('success', 0)} books with reading level classification")
+results.extend(sheets_data)
+print(f"{len(sheets_data)} books with reading level classification ready to upload")
 
 # ============================================================================
 # SCRIPT 4: Duplicate Detection and Cleanup
@@ -191,9 +188,8 @@ print(f"\nAfter deduplication: {len(unique_books)} unique books")
 # Upload unique books only
 sheets_data = parser.export_to_google_sheets_format(unique_books)
 
-if sheets_manager:
-    results = sheets_manager.bulk_add_books(sheets_data)
-    print(f"Uploaded {results.get('success', 0)} unique books")
+results.extend(sheets_data)
+print(f"{len(sheets_data)} unique books ready to upload")
 
 # ============================================================================
 # SCRIPT 5: File Format Analysis and Book Type Assignment
@@ -274,9 +270,8 @@ for book_type, count in sorted(type_counts.items()):
 # Upload with book types
 sheets_data = parser.export_to_google_sheets_format(metadata_list)
 
-if sheets_manager:
-    results = sheets_manager.bulk_add_books(sheets_data)
-    print(f"\nUploaded {results.get('success', 0)} books with format analysis")
+results.extend(sheets_data)
+print(f"\n{len(sheets_data)} books with format analysis ready to upload")
 
 # ============================================================================
 # SCRIPT 6: Custom Metadata Enhancement
@@ -367,9 +362,8 @@ for i, book in enumerate(metadata_list[:3]):
 # Convert and upload enhanced data
 sheets_data = parser.export_to_google_sheets_format(metadata_list)
 
-if sheets_manager:
-    results = sheets_manager.bulk_add_books(sheets_data)
-    print(f"\nUploaded {results.get('success', 0)} enhanced books")
+results.extend(sheets_data)
+print(f"\n{len(sheets_data)} enhanced books ready to upload")
 
 # ============================================================================
 # SCRIPT 7: Quality Control and Validation
@@ -465,9 +459,8 @@ if invalid_books:
 if valid_books:
     sheets_data = parser.export_to_google_sheets_format(valid_books)
     
-    if sheets_manager:
-        results = sheets_manager.bulk_add_books(sheets_data)
-        print(f"\nUploaded {results.get('success', 0)} validated books")
+    results.extend(sheets_data)
+    print(f"\n{len(sheets_data)} validated books ready to upload")
 else:
     print("\nNo valid books to upload - please fix validation issues first")
 
@@ -7,6 +7,7 @@ interface ScriptResult {
   output: string;
   error: string;
   preview_data: any[];
+  preview_total?: number;
   processed_count: number;
   sheets_uploaded: boolean;
   database_uploaded: boolean;
@@ -50,7 +51,44 @@ const ScriptEditorSection: React.FC = () => {
     }
 
     setIsExecuting(true);
-    setResult(null);
+
+    // Output and preview rows stream in while the script runs; "done" fills in the rest
+    let current: ScriptResult = {
+      success: true,
+      output: '',
+      error: '',
+      preview_data: [],
+      preview_total: 0,
+      processed_count: 0,
+      sheets_uploaded: false,
+      database_uploaded: false
+    };
+    setResult(current);
+
+    const applyEvent = (event: string, data: any) => {
+      if (event === 'output') {
+        current = { ...current, output: current.output + data.text };
+      } else if (event === 'stderr') {
+        current = { ...current, error: current.error + data.text };
+      } else if (event === 'rows') {
+        current = {
+          ...current,
+          preview_data: data.rows.length ? [...current.preview_data, ...data.rows] : current.preview_data,
+          preview_total: data.total
+        };
+      } else if (event === 'done') {
+        current = {
+          ...current,
+          ...data,
+          output: current.output + (data.output || ''),
+          error: (data.error || '') + (current.error ? `Warnings: ${current.error}` : ''),
+          preview_data: current.preview_data
+        };
+      } else {
+        return;
+      }
+      setResult(current);
+    };
 
     try {
       const formData = new FormData();
@@ -59,22 +97,42 @@ const ScriptEditorSection: React.FC = () => {
       formData.append('upload_to_sheets', uploadToSheets.toString());
       formData.append('upload_to_database', uploadToDatabase.toString());
 
-      const response = await fetch(getApiUrl('txt-ingestion/execute-script'), {
+      const response = await fetch(getApiUrl('txt-ingestion/execute-script/stream'), {
         method: 'POST',
         body: formData,
       });
 
-      const data = await response.json();
-      setResult(data);
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || `HTTP ${response.status}`);
+      }
+
+      // Server-Sent Events: blocks of "event: <name>\ndata: <json>" separated by a blank line
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const block = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          let event = 'message';
+          let data = '';
+          block.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          });
+          if (data) applyEvent(event, JSON.parse(data));
+        }
+      }
     } catch (error) {
       setResult({
+        ...current,
         success: false,
-        output: '',
-        error: `Network error: ${error}`,
-        preview_data: [],
-        processed_count: 0,
-        sheets_uploaded: false,
-        database_uploaded: false
+        error: `Network error: ${error}`
       });
     } finally {
       setIsExecuting(false);
@@ -93,8 +151,7 @@ const ScriptEditorSection: React.FC = () => {
 
 Use these variables in your script:
 - \`root_directory\`: Upload directory path
-- \`sheets_manager\`: Google Sheets manager (if connected)
-- \`results\`: Array to store final book data
+- \`results\`: Array to store final book data (uploaded by the server when "Upload to Google Sheets" or "Upload to Database" is ticked)
 - \`preview_data\`: Array to store preview information
 - \`os, json, re, glob, pathlib\`: Available Python modules
 
@@ -237,7 +294,7 @@ preview_data.append({
             <h4>📊 Execution Results</h4>
             <div className="status-badges">
               <span className={`status-badge ${result.success ? 'success' : 'error'}`}>
-                {result.success ? '✅ Success' : '❌ Error'}
+                {isExecuting ? '⏳ Running' : result.success ? '✅ Success' : '❌ Error'}
               </span>
               <span className="count-badge">
                 📚 {result.processed_count} books found
@@ -249,7 +306,11 @@ preview_data.append({
 
           {result.preview_data.length > 0 && (
             <div className="preview-data">
-              <h5>🔍 Preview Data</h5>
+              <h5>
+                🔍 Preview Data
+                {(result.preview_total || 0) > result.preview_data.length &&
+                  ` (showing ${result.preview_data.length} of ${result.preview_total})`}
+              </h5>
               <div className="preview-table-container">
                 <table className="preview-table">
                   <thead>